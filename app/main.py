@@ -1,15 +1,22 @@
 # import app.utils.nltk_setup
+import asyncio
 from datetime import datetime, timedelta, timezone
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from app.routes import feedback, health, generate #, evaluate  
+from app.routes import feedback, health, generate, evaluate
 import os
 from slowapi.middleware import SlowAPIMiddleware
 from slowapi.errors import RateLimitExceeded
 # from slowapi.util import get_remote_address, get_retry_after
 from app.utils.logger import log_event
 from app.utils.rate_limiter import get_seconds_until_reset, limiter, format_seconds_to_human
+from app.services.jobs import start_generation_jobs, generation_jobs
+from app.utils.file_parser import parse_pool, MAX_FILE_SIZE_BYTES
+from app.utils.upload_limit import UploadSizeLimitMiddleware, FORM_OVERHEAD_BYTES
+from app.services.evaluate import eval_pool, refresh_similarity_idf
+from app.utils.quiz_store import quiz_store
+from app.utils.warmup import WARMUP_ENABLED, warm_up
 
 APP_NAME=os.getenv("APP_NAME")
 # Define limiter (used ONLY for routes that explicitly decorate with @limiter.limit)
@@ -68,6 +75,12 @@ app.add_middleware(
 
 app.state.limiter = limiter
 app.add_middleware(SlowAPIMiddleware)
+
+# Reject oversized multipart uploads before the form is parsed
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    max_body_bytes=generate.MAX_FILES_PER_REQUEST * MAX_FILE_SIZE_BYTES + FORM_OVERHEAD_BYTES,
+)
 # limiter.init_app(app)
 
 
@@ -75,7 +88,7 @@ app.add_middleware(SlowAPIMiddleware)
 
 app.include_router(health.router, tags=["Health"])
 app.include_router(generate.router, tags=["Generate"])
-# app.include_router(evaluate.router, tags=["Evaluate"])
+app.include_router(evaluate.router, tags=["Evaluate"])
 app.include_router(feedback.router, tags=["Feedback"])
 
 
@@ -83,7 +96,21 @@ app.include_router(feedback.router, tags=["Feedback"])
 @app.on_event("startup")
 async def startup_event():
     print(f"Starting {APP_NAME}...")
+    await start_generation_jobs()
+    purged = await asyncio.to_thread(quiz_store.purge_expired)
+    if purged:
+        print(f"Purged {purged} expired quiz(zes)")
+    fitted = await asyncio.to_thread(refresh_similarity_idf)
+    if fitted:
+        print(f"Fitted similarity IDF on {fitted} explanation(s)")
+    if WARMUP_ENABLED:
+        # Heavy imports and external clients load in the background;
+        # the app already answers requests meanwhile
+        app.state.warmup = asyncio.create_task(asyncio.to_thread(warm_up))
 
 @app.on_event("shutdown")
 async def shutdown_event():
     print("Shutting down gracefully...")
+    await generation_jobs.stop()
+    parse_pool.shutdown()
+    eval_pool.shutdown()
@@ -93,15 +93,45 @@ class QuizGenerationResponse(BaseModel):
     question_count: int
     attempt_number: int
     token_usage: Optional[Dict[str, Any]] = None
+    cached: bool = Field(False, description="True when served from the generation cache")
+    quiz_id: Optional[str] = Field(None, description="Pass with question_index to /evaluate instead of the question")
     quizzes: List[Quiz]
     model_config = {
       "extra": "forbid",  # you can also set "ignore" if you want to drop unknowns
     }
 
 
-class SubjectiveEvaluationRequest(BaseModel):
+class GenerationJobResponse(BaseModel):
+    job_id: str
+    request_id: str
+    status: Literal["queued", "running", "succeeded", "failed"]
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    queue_position: Optional[int] = Field(None, description="1-based position while the job is waiting")
+    result: Optional[QuizGenerationResponse] = None
+    error: Optional[Dict[str, Any]] = None
+
+
+class StoredQuestionRequest(BaseModel):
+    """Either the question itself, or the quiz_id of a generated quiz plus the item's index."""
+    question: Optional[Union[EssayQuiz, FITBKeywordQuiz]] = None
+    quiz_id: Optional[str] = None
+    question_index: Optional[int] = Field(None, ge=0, description="0-based index into the stored quiz")
+
+    @model_validator(mode="after")
+    def question_or_quiz_id(cls, values):
+        if values.question is not None and values.quiz_id is not None:
+            raise ValueError("Provide either `question` or `quiz_id`, not both")
+        if values.question is None and values.quiz_id is None:
+            raise ValueError("Provide `question`, or `quiz_id` with `question_index`")
+        if (values.quiz_id is None) != (values.question_index is None):
+            raise ValueError("`quiz_id` and `question_index` go together")
+        return values
+
+
+class SubjectiveEvaluationRequest(StoredQuestionRequest):
     requestId: str
-    question: Union[EssayQuiz, FITBKeywordQuiz]
     user_answer: str
 
 
@@ -118,6 +148,18 @@ class SubjectiveEvaluationResponse(BaseModel):
     character_count: Optional[int] = None
 
 
+class SubjectiveBatchEvaluationRequest(StoredQuestionRequest):
+    requestId: str
+    user_answers: List[str] = Field(..., min_length=1, description="Answers to grade against `question`")
+
+
+class SubjectiveBatchEvaluationResponse(BaseModel):
+    results: List[SubjectiveEvaluationResponse]  # same order as user_answers
+    answer_count: int
+    mean_final_score: float
+    time_taken: float  # whole batch, in seconds
+
+
 
 class FeedbackRequest(BaseModel):
     requestId: Optional[str] = Field(None, description="User ID (if logged in)")
@@ -1,19 +1,78 @@
+import os
+import asyncio
+from typing import Any, Dict, Tuple
 from fastapi import APIRouter, HTTPException
 
-from app.models.schema import SubjectiveEvaluationRequest, SubjectiveEvaluationResponse
-from app.services.evaluate import evaluate_subjective
+from app.models.schema import (
+    SubjectiveEvaluationRequest,
+    SubjectiveEvaluationResponse,
+    SubjectiveBatchEvaluationRequest,
+    SubjectiveBatchEvaluationResponse,
+    StoredQuestionRequest,
+)
+from app.services.evaluate import evaluate_subjective, evaluate_subjective_batch, run_evaluation
+from app.utils.quiz_store import quiz_store
  
 router = APIRouter()
 
+MAX_BATCH_ANSWERS = int(os.getenv("MAX_BATCH_ANSWERS", 500))
+
+
+async def _resolve_question(payload: StoredQuestionRequest) -> Tuple[Dict[str, Any], bool]:
+    """(question, prepared): the inline question, or the stored rubric for quiz_id + question_index."""
+    if payload.quiz_id is None:
+        return payload.question.model_dump(), False
+
+    stored = await asyncio.to_thread(quiz_store.get, payload.quiz_id)
+    if stored is None:
+        raise HTTPException(status_code=404, detail=f"Quiz '{payload.quiz_id}' not found or expired")
+    if payload.question_index >= len(stored["quizzes"]):
+        raise HTTPException(
+            status_code=422,
+            detail=f"question_index {payload.question_index} is out of range for a quiz of {len(stored['quizzes'])} items"
+        )
+    rubric = stored["rubrics"].get(payload.question_index)
+    if rubric is None:
+        raise HTTPException(status_code=422, detail="Only essay and fill-in-the-blank items can be evaluated")
+    return rubric, True
+
 
 @router.post("/evaluate", response_model=SubjectiveEvaluationResponse)
 async def evaluate_subjective_answer(payload: SubjectiveEvaluationRequest):
+    question, prepared = await _resolve_question(payload)
     try:
-        result = evaluate_subjective(
-            requestId=payload.requestId,
-            question=payload.question.model_dump(),
-            user_answer=payload.user_answer
+        result = await run_evaluation(
+            evaluate_subjective,
+            payload.requestId,
+            question,
+            payload.user_answer,
+            prepared,
         )
         return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Evaluation failed: {str(e)}")
+
+
+@router.post("/evaluate/batch", response_model=SubjectiveBatchEvaluationResponse)
+async def evaluate_subjective_answers(payload: SubjectiveBatchEvaluationRequest):
+    """Grade many answers to one question in a single call (e.g. a whole class)."""
+    if len(payload.user_answers) > MAX_BATCH_ANSWERS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Maximum allowed number of answers per batch is {MAX_BATCH_ANSWERS}"
+        )
+    question, prepared = await _resolve_question(payload)
+    try:
+        return await run_evaluation(
+            evaluate_subjective_batch,
+            payload.requestId,
+            question,
+            payload.user_answers,
+            prepared,
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Evaluation failed: {str(e)}")
@@ -1,20 +1,34 @@
 from fastapi import APIRouter, Request, UploadFile, File, Form, HTTPException
 from typing import List, Optional
 import os
+import json
 from app.utils.rate_limiter import limiter
 
 from app.utils.request_context import RequestContext
 from app.utils.logger import log_event
+from app.utils.disconnect import ClientDisconnected, ClosingStreamingResponse, run_until_disconnected
 
 
 
-from app.models.schema import QuizGenerationResponse
-from app.services.generate import generate_quizzes_from_text_or_file
+from app.models.schema import QuizGenerationResponse, GenerationJobResponse
+from app.services.generate import generate_quizzes_from_text_or_file, stream_quizzes_from_text_or_file
+from app.services.jobs import submit_generation_job, get_generation_job
+from app.utils.job_queue import QueueFull
 
 router = APIRouter()
 
 MAX_NUM_QUESTIONS = int(os.getenv("MAX_NUM_QUESTIONS", 30))
 MAX_REQUEST_PER_DAILY = os.getenv("MAX_REQUEST_PER_DAILY") or "5/day"
+MAX_FILES_PER_REQUEST = int(os.getenv("MAX_FILES_PER_REQUEST", 5))
+
+
+def _check_file_count(request_id: str, ctx: RequestContext, file, files) -> None:
+    count = (1 if file else 0) + len([f for f in files or [] if f])
+    ctx.set_log(file_count=count)
+    if count > MAX_FILES_PER_REQUEST:
+        message = f"Maximum allowed number of files is {MAX_FILES_PER_REQUEST}"
+        log_event(event_type="request_failed", request_id=request_id, message=message, file_count=count, **ctx.inputs)
+        raise HTTPException(status_code=400, detail=message)
 
 @router.post("/generate", response_model=QuizGenerationResponse)
 @limiter.limit(MAX_REQUEST_PER_DAILY)
@@ -29,7 +43,10 @@ async def generate_quiz(
     answer_required: bool = Form(True),
     explanation_required: bool = Form(True),
     file_intent: Optional[str] = Form(None),
+    chunked: bool = Form(False, description="Split large material into chunks generated concurrently on several models"),
+    relevance_filter: bool = Form(False, description="Keep only the passages most relevant to the topic/instructions when the material is too long"),
     file: Optional[UploadFile] = File(None, description="Optional uploaded file"),
+    files: Optional[List[UploadFile]] = File(None, description="Optional uploaded files, combined into one quiz"),
 ):
     
 
@@ -45,6 +62,8 @@ async def generate_quiz(
         answer_required=answer_required,
         explanation_required=explanation_required,
         file_intent=file_intent,
+        chunked=chunked,
+        relevance_filter=relevance_filter,
     )
 
     if num_questions is not None and num_questions > MAX_NUM_QUESTIONS:
@@ -53,22 +72,32 @@ async def generate_quiz(
             status_code=400,
             detail=f"Maximum allowed number of questions is {MAX_NUM_QUESTIONS}"
         )
+    _check_file_count(request_id, ctx, file, files)
 
     log_event(event_type="request_start", request_id=request_id, **ctx.inputs)
 
 
 
     try:
-        response = await generate_quizzes_from_text_or_file(
-            request_id=request_id,
-            prompt=user_additional_instructions,
-            file=file,
-            extra_data=ctx.inputs,
-            ctx=ctx,
+        response = await run_until_disconnected(
+            request,
+            generate_quizzes_from_text_or_file(
+                request_id=request_id,
+                prompt=user_additional_instructions,
+                file=file,
+                files=files,
+                extra_data=ctx.inputs,
+                ctx=ctx,
+            ),
         )
         log_event(event_type="request_success", request_id=request_id, **ctx.logs)
         return response
 
+    except ClientDisconnected:
+        # Client is gone; the generation task has already been cancelled.
+        log_event(event_type="request_cancelled", request_id=request_id, **ctx.logs)
+        raise HTTPException(status_code=499, detail="Client closed request")
+
     except HTTPException as he:
         log_event(
             event_type="request_error",
@@ -86,3 +115,157 @@ async def generate_quiz(
             **ctx.logs,
         )
         raise HTTPException(status_code=500, detail="Internal server error")
+
+
+
+@router.post("/generate/stream")
+@limiter.limit(MAX_REQUEST_PER_DAILY)
+async def generate_quiz_stream(
+    request: Request,
+    request_id: str = Form(..., description="Clients' unique request ID"),
+    user_additional_instructions: str = Form(..., description="Required prompt or extra guidance"),
+    topic: Optional[str] = Form(None),
+    quiz_type: Optional[List[str]] = Form(None),
+    num_questions: Optional[int] = Form(None),
+    options_per_question: Optional[int] = Form(None),
+    answer_required: bool = Form(True),
+    explanation_required: bool = Form(True),
+    file_intent: Optional[str] = Form(None),
+    relevance_filter: bool = Form(False, description="Keep only the passages most relevant to the topic/instructions when the material is too long"),
+    file: Optional[UploadFile] = File(None, description="Optional uploaded file"),
+    files: Optional[List[UploadFile]] = File(None, description="Optional uploaded files, combined into one quiz"),
+):
+    """
+    Streaming variant of /generate. Responds with NDJSON: one `quiz` event per
+    question as soon as the model has finished writing it, then a `done`
+    event carrying the usual response metadata.
+    """
+    request.state.request_id = request_id
+    ctx = RequestContext(request_id=request_id)
+    ctx.set_input(
+        user_additional_instructions=user_additional_instructions,
+        topic=topic,
+        quiz_type=quiz_type,
+        num_questions=num_questions,
+        options_per_question=options_per_question,
+        answer_required=answer_required,
+        explanation_required=explanation_required,
+        file_intent=file_intent,
+        relevance_filter=relevance_filter,
+    )
+
+    if num_questions is not None and num_questions > MAX_NUM_QUESTIONS:
+        log_event(event_type="request_failed", request_id=request_id, message=f"Maximum allowed number of questions is {MAX_NUM_QUESTIONS}", **ctx.inputs)
+        raise HTTPException(
+            status_code=400,
+            detail=f"Maximum allowed number of questions is {MAX_NUM_QUESTIONS}"
+        )
+    _check_file_count(request_id, ctx, file, files)
+
+    log_event(event_type="request_start", request_id=request_id, streaming=True, **ctx.inputs)
+
+    try:
+        events = await stream_quizzes_from_text_or_file(
+            request_id=request_id,
+            prompt=user_additional_instructions,
+            file=file,
+            files=files,
+            extra_data=ctx.inputs,
+            ctx=ctx,
+        )
+    except HTTPException as he:
+        log_event(event_type="request_error", request_id=request_id, error_message=str(he.detail), **ctx.logs)
+        raise
+    except Exception as e:
+        log_event(event_type="request_error", request_id=request_id, error_message=str(e), **ctx.logs)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+    async def ndjson():
+        # Closed by ClosingStreamingResponse on disconnect, which closes the LLM stream too
+        try:
+            async for event in events:
+                yield json.dumps(event, ensure_ascii=False) + "\n"
+            log_event(event_type="request_stream_complete", request_id=request_id, **ctx.logs)
+        finally:
+            await events.aclose()
+
+    return ClosingStreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+
+def _job_response(job: dict) -> GenerationJobResponse:
+    return GenerationJobResponse(
+        job_id=job["id"],
+        request_id=job["request_id"],
+        status=job["status"],
+        created_at=job["created_at"],
+        started_at=job["started_at"],
+        finished_at=job["finished_at"],
+        queue_position=job.get("queue_position"),
+        result=job["result"],
+        error=job["error"],
+    )
+
+
+@router.post("/generate/jobs", response_model=GenerationJobResponse, status_code=202)
+@limiter.limit(MAX_REQUEST_PER_DAILY)
+async def create_generation_job(
+    request: Request,
+    request_id: str = Form(..., description="Clients' unique request ID"),
+    user_additional_instructions: str = Form(..., description="Required prompt or extra guidance"),
+    topic: Optional[str] = Form(None),
+    quiz_type: Optional[List[str]] = Form(None),
+    num_questions: Optional[int] = Form(None),
+    options_per_question: Optional[int] = Form(None),
+    answer_required: bool = Form(True),
+    explanation_required: bool = Form(True),
+    file_intent: Optional[str] = Form(None),
+    chunked: bool = Form(False, description="Split large material into chunks generated concurrently on several models"),
+    relevance_filter: bool = Form(False, description="Keep only the passages most relevant to the topic/instructions when the material is too long"),
+    file: Optional[UploadFile] = File(None, description="Optional uploaded file"),
+    files: Optional[List[UploadFile]] = File(None, description="Optional uploaded files, combined into one quiz"),
+):
+    """
+    Queue a generation and return its job id right away. Poll
+    GET /generate/jobs/{job_id} for the status and, once it has
+    succeeded, the usual /generate response under `result`.
+    """
+    request.state.request_id = request_id
+    ctx = RequestContext(request_id=request_id)
+    ctx.set_input(
+        user_additional_instructions=user_additional_instructions,
+        topic=topic,
+        quiz_type=quiz_type,
+        num_questions=num_questions,
+        options_per_question=options_per_question,
+        answer_required=answer_required,
+        explanation_required=explanation_required,
+        file_intent=file_intent,
+        chunked=chunked,
+        relevance_filter=relevance_filter,
+    )
+
+    if num_questions is not None and num_questions > MAX_NUM_QUESTIONS:
+        log_event(event_type="request_failed", request_id=request_id, message=f"Maximum allowed number of questions is {MAX_NUM_QUESTIONS}", **ctx.inputs)
+        raise HTTPException(
+            status_code=400,
+            detail=f"Maximum allowed number of questions is {MAX_NUM_QUESTIONS}"
+        )
+    _check_file_count(request_id, ctx, file, files)
+
+    try:
+        job = await submit_generation_job(request_id, ctx.inputs, file, files)
+    except QueueFull as e:
+        log_event(event_type="request_error", request_id=request_id, error_message=str(e), **ctx.inputs)
+        raise HTTPException(status_code=503, detail=str(e))
+
+    log_event(event_type="job_queued", request_id=request_id, job_id=job["id"], **ctx.inputs)
+    return _job_response(await get_generation_job(job["id"]))
+
+
+@router.get("/generate/jobs/{job_id}", response_model=GenerationJobResponse, response_model_exclude_none=True)
+async def get_generation_job_status(job_id: str):
+    job = await get_generation_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _job_response(job)
@@ -1,9 +1,18 @@
 # app/routes/health.py
 import os
+import asyncio
 from fastapi import APIRouter
 from app.models.schema import HealthResponse
-from langchain_core.prompts import PromptTemplate
 from app.utils.config import get_config
+from app.utils.generation_cache import generation_cache
+from app.utils.extraction_cache import extraction_cache
+from app.utils.file_parser import parse_pool
+from app.services.evaluate import eval_pool
+from app.utils.quiz_engine import scheduler, latency_tracker, HEDGE_ENABLED, HEDGE_PERCENTILE
+from app.utils.prompt import prompt_token_report
+from app.services.generate import generation_flights
+from app.services.jobs import generation_jobs
+from app.utils.quiz_store import quiz_store
 
 router = APIRouter()
 
@@ -23,6 +32,7 @@ async def health_check():
 
     # 2) LangChain PromptTemplate
     try:
+        from langchain_core.prompts import PromptTemplate
         PromptTemplate.from_template("Q: {question}\nA:")
         results["langchain_check"] = True
     except Exception:
@@ -39,3 +49,28 @@ async def health_check():
     # print("Config: ", response)
 
     return HealthResponse(**response).model_dump(exclude_none=True)
+
+
+@router.get("/metrics")
+async def metrics():
+    """Runtime counters for capacity planning and debugging."""
+    # These two count rows in SQLite, so they run off the event loop
+    extraction_stats, quiz_store_stats = await asyncio.gather(
+        asyncio.to_thread(extraction_cache.stats),
+        asyncio.to_thread(quiz_store.stats),
+    )
+    return {
+        "generation_cache": generation_cache.stats(),
+        "extraction_cache": extraction_stats,
+        "parse_pool": parse_pool.stats(),
+        "evaluation_pool": eval_pool.stats(),
+        "model_scheduler": scheduler.snapshot(),
+        "system_prompt_tokens": prompt_token_report(),
+        "generation_coalescing": generation_flights.stats(),
+        "generation_jobs": generation_jobs.stats(),
+        "quiz_store": quiz_store_stats,
+        "model_latency": {
+            "hedging": {"enabled": HEDGE_ENABLED, "percentile": HEDGE_PERCENTILE},
+            "models": latency_tracker.snapshot(),
+        },
+    }
@@ -1,16 +1,32 @@
 # services/evaluator.py
 
+import os
 import time
 import re
-from typing import Dict, Any
-from app.utils.evaluation_logic import (
-    score_keywords,
-    score_similarity,
-    score_readability,
-    score_structure,
-)
+import asyncio
+from typing import Dict, Any, List, Callable
+from fastapi import HTTPException
 from app.utils.logger import log_event
 from app.utils.request_context import RequestContext
+from app.utils.answer_text import clean_text, normalize_keywords, tokenize_and_filter
+from app.utils.process_pool import BoundedProcessPool, PoolBusy, PoolTimeout
+
+# Scoring (rapidfuzz, textstat, tokenizing) is CPU-bound, so it runs in
+# worker processes and never holds the event loop; EVAL_WORKERS=0 uses a thread.
+# evaluation_logic is imported by the functions below, i.e. in the workers.
+EVAL_WORKERS             = int(os.getenv("EVAL_WORKERS", "2"))
+EVAL_MAX_TASKS_PER_CHILD = int(os.getenv("EVAL_MAX_TASKS_PER_CHILD", "1000"))
+EVAL_TIMEOUT_S           = float(os.getenv("EVAL_TIMEOUT_S", "10"))
+EVAL_MAX_CONCURRENT      = int(os.getenv("EVAL_MAX_CONCURRENT", str(max(1, EVAL_WORKERS))))
+EVAL_MAX_WAITING         = int(os.getenv("EVAL_MAX_WAITING", "64"))  # 0 = unbounded
+
+eval_pool = BoundedProcessPool(
+    max_workers=EVAL_WORKERS,
+    max_tasks_per_child=EVAL_MAX_TASKS_PER_CHILD,
+    timeout_s=EVAL_TIMEOUT_S,
+    max_concurrent=EVAL_MAX_CONCURRENT,
+    max_waiting=EVAL_MAX_WAITING,
+)
 
 _ALLOWED_TYPES = {"essay", "fitb"}
 
@@ -57,31 +73,32 @@ def _validate_and_prepare(question: Dict[str, Any], user_answer: Any) -> (Dict[s
 
     return q, answer
 
-def evaluate_subjective(requestId:str, question: Dict[str, Any], user_answer: str) -> Dict[str, Any]:
+def build_rubric(question: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Evaluate an essay or fill-in-the-blank response.
-
-    Returns a dict with:
-      - keyword, similarity, structure, readability (all 0–10)
-      - final_score (0–10)
-      - word_count, character_count, time_taken
+    Everything scoring needs from an essay/FITB question, computed once: the
+    validated question, the cleaned explanation and its tokens, and the
+    keywords normalized and split into single words and phrases (what the
+    keyword matcher compiles). Stored with the quiz, so evaluations by
+    quiz_id skip all of it. Raises ValueError for items that cannot be scored.
     """
-    # Clean & validate inputs
-    q, ans = _validate_and_prepare(question, user_answer)
-    q_type = q["type"]
-    is_essay = q_type == "essay"
-    is_fitb = q_type == "fitb"
+    q, _ = _validate_and_prepare(question, "")
+    q["explanation"] = clean_text(q["explanation"])
+    q["explanation_tokens"] = tokenize_and_filter(q["explanation"]) if q["explanation"] else []
+    q["keyword_words"], q["keyword_phrases"] = normalize_keywords(q["keywords"])
+    return q
 
-    start = time.time()
+# Derived rubric fields, kept out of the request logs
+_RUBRIC_ONLY = ("explanation_tokens", "keyword_words", "keyword_phrases")
 
-    ctx = RequestContext(request_id=requestId)
-    ctx.set_input(**question, **{"user_answer": user_answer})
-    log_event(event_type="evaluation_request", request_id=requestId, **question, **{"user_answer": user_answer})
+def _loggable(question: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in question.items() if k not in _RUBRIC_ONLY}
 
+def _compose_score(q_type: str, ans: str, keyword_score: float, similarity_score: float) -> Dict[str, Any]:
+    """Add the essay-only metrics and combine everything into the final score."""
+    from app.utils.evaluation_logic import score_readability, score_structure
 
-    # Shared metrics
-    keyword_score    = score_keywords(q, ans)
-    similarity_score = score_similarity(q, ans)
+    is_essay = q_type == "essay"
+    is_fitb = q_type == "fitb"
 
     # Essay-only metrics
     if is_essay:
@@ -110,8 +127,107 @@ def evaluate_subjective(requestId:str, question: Dict[str, Any], user_answer: st
         "final_score":   final,
         "word_count":    len(ans.split()),
         "character_count": len(ans),
-        "time_taken":    round(time.time() - start, 2),
     }
+    return score
+
+def evaluate_subjective(requestId:str, question: Dict[str, Any], user_answer: str, prepared: bool = False) -> Dict[str, Any]:
+    """
+    Evaluate an essay or fill-in-the-blank response. With `prepared`,
+    `question` is a rubric from build_rubric and is used as is.
+
+    Returns a dict with:
+      - keyword, similarity, structure, readability (all 0–10)
+      - final_score (0–10)
+      - word_count, character_count, time_taken
+    """
+    from app.utils.evaluation_logic import score_keywords, score_similarity
+
+    # Clean & validate inputs
+    q = question if prepared else build_rubric(question)
+    ans = _clean_text_field(user_answer)
+    q_type = q["type"]
+
+    start = time.time()
+
+    ctx = RequestContext(request_id=requestId)
+    ctx.set_input(**_loggable(question), **{"user_answer": user_answer})
+    log_event(event_type="evaluation_request", request_id=requestId, **_loggable(question), **{"user_answer": user_answer})
+
+
+    # Shared metrics
+    keyword_score    = score_keywords(q, ans)
+    similarity_score = score_similarity(q, ans)
+
+    score = _compose_score(q_type, ans, keyword_score, similarity_score)
+    score["time_taken"] = round(time.time() - start, 2)
     ctx.set_log(**score)
     log_event(event_type="evaluation_success", request_id=requestId, **score)
     return score
+
+
+def evaluate_subjective_batch(requestId: str, question: Dict[str, Any], user_answers: List[str], prepared: bool = False) -> Dict[str, Any]:
+    """
+    Evaluate many answers to one essay or fill-in-the-blank question.
+
+    Keyword and similarity scores for all answers are computed in bulk
+    (score_keywords_batch / score_similarity_batch); each result is the same
+    as evaluate_subjective would return for that answer, minus time_taken.
+    """
+    from app.utils.evaluation_logic import score_keywords_batch, score_similarity_batch
+
+    q = question if prepared else build_rubric(question)
+    answers = [_clean_text_field(a) for a in user_answers]
+
+    start = time.time()
+    log_event(event_type="evaluation_batch_request", request_id=requestId, **_loggable(question), answer_count=len(answers))
+
+    keyword_scores    = score_keywords_batch(q, answers)
+    similarity_scores = score_similarity_batch(q, answers)
+    results = [
+        _compose_score(q["type"], ans, k, sim)
+        for ans, k, sim in zip(answers, keyword_scores, similarity_scores)
+    ]
+
+    summary = {
+        "answer_count": len(results),
+        "mean_final_score": round(sum(r["final_score"] for r in results) / len(results), 2) if results else 0.0,
+        "time_taken": round(time.time() - start, 3),
+    }
+    log_event(event_type="evaluation_batch_success", request_id=requestId, **summary)
+    return {"results": results, **summary}
+
+
+async def run_evaluation(fn: Callable[..., Dict[str, Any]], *args: Any) -> Dict[str, Any]:
+    """Run an evaluate_* function in the evaluation pool (a thread with EVAL_WORKERS=0)."""
+    if EVAL_WORKERS <= 0:
+        return await asyncio.to_thread(fn, *args)
+    try:
+        return await eval_pool.run(fn, *args)
+    except PoolBusy:
+        raise HTTPException(503, "Too many answers are being scored, please retry shortly",
+                            headers={"Retry-After": "1"})
+    except PoolTimeout:
+        raise HTTPException(504, f"Scoring took longer than {EVAL_TIMEOUT_S:.0f}s")
+
+
+def refresh_similarity_idf() -> int:
+    """
+    With SIMILARITY_ENGINE=vector, refit the engine's IDF on the stored
+    explanations and write it for the evaluation processes to load. Runs at
+    startup, before any of them starts, so all of them score with the same
+    table. Returns the corpus size, or 0 when nothing was written (other
+    engine, or fewer than IDF_MIN_DOCUMENTS explanations; an earlier table
+    stays in use). Blocking; run it in a thread.
+    """
+    from app.utils.evaluation_logic import SIMILARITY_ENGINE
+    from app.utils.quiz_store import quiz_store
+    from app.utils.vector_similarity import IDF_MIN_DOCUMENTS, corpus_idf, fit_idf, save_idf
+
+    if SIMILARITY_ENGINE != "vector":
+        return 0
+    documents = quiz_store.explanation_tokens()
+    if len(documents) < IDF_MIN_DOCUMENTS:
+        return 0
+    save_idf(fit_idf(documents))
+    corpus_idf.cache_clear()
+    return len(documents)
@@ -1,28 +1,21 @@
-
 from fastapi import HTTPException
 from app.models.schema import FeedbackRequest
 from datetime import datetime, timezone
 import os
 import json
-import gspread
-from google.oauth2.service_account import Credentials
+import threading
 from dotenv import load_dotenv
 
 # Load .env file
 load_dotenv()
 
-service_account_info = json.loads(os.getenv("GOOGLE_SERVICE_ACCOUNT_INFO"))
 scopes = ["https://www.googleapis.com/auth/spreadsheets"]
-
-
-cred = Credentials.from_service_account_info(service_account_info, scopes=scopes)
-client = gspread.authorize(cred)
-
 sheet_id = os.getenv("FEEDBACK_SHEET_ID")
-sheet = client.open_by_key(sheet_id)
-
-
 
+# Authorized and initialized on first use (or by the startup warm-up), so the
+# app starts without network access or Google credentials
+_sheet = None
+_sheet_lock = threading.Lock()
 
 
 feedback_questions_raw = os.getenv("FEEDBACK_QUESTIONS", "[]")
@@ -93,8 +86,21 @@ def append_feedback_response(sheet, request_id: str, answers: list[str]):
 
 
 
+def get_feedback_sheet():
+    """Open (once) and initialize the feedback worksheet."""
+    global _sheet
+    with _sheet_lock:
+        if _sheet is None:
+            raw_info = os.getenv("GOOGLE_SERVICE_ACCOUNT_INFO")
+            if not raw_info or not sheet_id:
+                raise RuntimeError("GOOGLE_SERVICE_ACCOUNT_INFO and FEEDBACK_SHEET_ID must be set")
+            import gspread
+            from google.oauth2.service_account import Credentials
 
-sheet = initialize_feedback_sheet(sheet)
+            cred = Credentials.from_service_account_info(json.loads(raw_info), scopes=scopes)
+            client = gspread.authorize(cred)
+            _sheet = initialize_feedback_sheet(client.open_by_key(sheet_id))
+        return _sheet
 
 
 def process_feedback(feedback: FeedbackRequest):
@@ -104,7 +110,7 @@ def process_feedback(feedback: FeedbackRequest):
         print("User ID:", feedback.requestId)
         for i, ans in enumerate(feedback.answers, start=1):
             print(f"Q{i}: {ans}")
-        append_feedback_response(sheet, feedback.requestId, feedback.answers)
+        append_feedback_response(get_feedback_sheet(), feedback.requestId, feedback.answers)
         return {"message": "Thanks! Your feedback has been recorded."}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Could not process feedback: {str(e)}")
@@ -1,32 +1,250 @@
+import json
+import math
+import time
+import asyncio
+import hashlib
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from app.utils.file_validator import validate_file
-from app.utils.file_parser import get_text_from_file
-from app.utils.quiz_engine import generate_quiz
+from app.utils.file_parser import get_text_from_file, reject_too_long, MAX_TOKENS
+from app.utils.compaction import compact_text, COMPACTION_ENABLED, COMPACTION_HEADROOM
+from app.utils.tokenizer import count_tokens
+from app.utils.source_budget import combine_sources
+from app.utils.relevance import select_relevant, RELEVANCE_MAX_TOKENS
+from app.utils.prompt import system_prompt_tokens
+from app.utils.quiz_engine import (
+    generate_quiz, open_quiz_stream, scheduler, COMPLETION_TOKENS_PER_QUESTION, DEFAULT_QUESTION_ESTIMATE,
+)
+from app.utils.chunked_generation import generate_quiz_chunked, CHUNKED_MAX_TOKENS, TASK_OVERHEAD_TOKENS
 from app.utils.request_context import RequestContext
 from app.utils.logger        import log_event
+from app.utils.single_flight import SingleFlight
+from app.utils.quiz_store import quiz_store
+from app.services.evaluate import build_rubric
 
+# Identical concurrent /generate requests share one LLM call
+generation_flights = SingleFlight()
 
-async def generate_quizzes_from_text_or_file(request_id: str, prompt: str, file=None, extra_data={}, ctx=None):
-    ctx = RequestContext(request_id=request_id)
+# Inputs that make two generation requests "the same"
+_COALESCE_FIELDS = (
+    "topic",
+    "quiz_type",
+    "num_questions",
+    "options_per_question",
+    "answer_required",
+    "explanation_required",
+    "file_intent",
+)
+
+
+async def _prepare_input_data(request_id: str, prompt: str, file=None, extra_data={}, ctx=None, files=None):
+    ctx = ctx or RequestContext(request_id=request_id)
     ctx.set_input(**extra_data)
+    # `chunked` and `relevance_filter` select the pipeline; they are not prompt parameters
+    extra_data = {k: v for k, v in extra_data.items() if k not in ("chunked", "relevance_filter")}
+    chunked = bool(ctx.inputs.get("chunked"))
+    # Chunked mode already covers all of the material, so the filter only applies to single calls
+    relevance = bool(ctx.inputs.get("relevance_filter")) and not chunked
+    max_tokens = CHUNKED_MAX_TOKENS if chunked else MAX_TOKENS
+    # With the filter on, oversized material is ranked down to size instead of rejected
+    read_limit = max(RELEVANCE_MAX_TOKENS, max_tokens) if relevance else max_tokens
+    uploads = [f for f in [file, *(files or [])] if f]
     file_text = ""
-    
-    if file:
-        validate_file(file)
-        try:
-            file_text = await get_text_from_file(file, ctx)
-        except Exception as e:
-            # file‐level failure already logged inside get_text_from_file
-            raise
+
+    for upload in uploads:
+        validate_file(upload)
+
+    if len(uploads) == 1:
+        # file‐level failures are already logged inside get_text_from_file
+        file_text = await _read_source(uploads[0], ctx, read_limit)
+        if (ctx.logs.get("source_tokens_after") or 0) > read_limit:
+            reject_too_long(ctx, read_limit)
+    elif uploads:
+        file_text = await _read_sources(uploads, ctx, read_limit)
+
+    if relevance and file_text:
+        file_text = await _filter_relevant(file_text, prompt, extra_data, ctx, max_tokens)
 
     if not prompt.strip() and not file_text:
         raise ValueError("No content to generate from.")
-    
-    
+
+
     input_data = {
-        "user_additional_instructions": prompt.strip(),  
+        "user_additional_instructions": prompt.strip(),
         "source_material": file_text,
         **extra_data
     }
     print(input_data)
-    return generate_quiz(input_data, ctx)
+    return input_data, ctx
+
+
+async def _read_source(file, ctx: RequestContext, max_tokens: int) -> str:
+    """Extract one upload and compact it; logs tokens before/after compaction."""
+    # An existing quiz must keep every question, so it only gets whitespace normalized
+    existing_quiz = ctx.inputs.get("file_intent") == "existing_quiz"
+    # Compaction usually shrinks the text a lot, so let extraction read
+    # past the limit and enforce it on the compacted text instead
+    headroom = COMPACTION_ENABLED and not existing_quiz
+    extract_limit = int(max_tokens * COMPACTION_HEADROOM) if headroom else max_tokens
+    text = await get_text_from_file(file, ctx, max_tokens=extract_limit)
+    tokens_before = tokens_after = ctx.logs.get("tokens_extracted")
+    if COMPACTION_ENABLED and text:
+        text, stats = await asyncio.to_thread(compact_text, text, existing_quiz)
+        tokens_after = count_tokens(text)
+        ctx.set_log(**stats.as_log())
+    ctx.set_log(source_tokens_before=tokens_before, source_tokens_after=tokens_after)
+    return text
+
+
+async def _read_sources(files, ctx: RequestContext, max_tokens: int) -> str:
+    """
+    Read several uploads concurrently, then share `max_tokens` between them
+    (see combine_sources). Existing quizzes are never truncated: 413 if they
+    do not all fit. Per-file logs and timings go under `files`.
+    """
+    file_ctxs = [RequestContext(request_id=ctx.request_id, inputs=dict(ctx.inputs)) for _ in files]
+
+    async def read(file, file_ctx: RequestContext) -> str:
+        started = time.perf_counter()
+        try:
+            return await _read_source(file, file_ctx, max_tokens)
+        finally:
+            file_ctx.set_log(read_time_s=round(time.perf_counter() - started, 3))
+
+    results = await asyncio.gather(*(read(f, c) for f, c in zip(files, file_ctxs)), return_exceptions=True)
+    file_logs = [{"filename": f.filename, **c.logs} for f, c in zip(files, file_ctxs)]
+    ctx.set_log(files=file_logs)
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+
+    combined, kept = combine_sources([(f.filename, text) for f, text in zip(files, results)], max_tokens)
+    for entry, tokens in zip(file_logs, kept):
+        entry["tokens_kept"] = tokens
+    ctx.set_log(
+        tokens_extracted=sum(c.logs.get("tokens_extracted") or 0 for c in file_ctxs),
+        source_tokens_before=sum(c.logs.get("source_tokens_before") or 0 for c in file_ctxs),
+        source_tokens_after=count_tokens(combined),
+        files_truncated=sum(e["tokens_kept"] < (e["source_tokens_after"] or 0) for e in file_logs),
+    )
+    # Truncating an existing quiz would silently drop its last questions
+    if ctx.logs["files_truncated"] and ctx.inputs.get("file_intent") == "existing_quiz":
+        reject_too_long(ctx, max_tokens)
+    return combined
+
+
+def _relevance_budget(params: dict, max_tokens: int) -> Tuple[int, Optional[str]]:
+    """
+    Source tokens that fit next to the system prompt and the expected
+    completion in the model the scheduler would pick, capped at `max_tokens`.
+    """
+    overhead = system_prompt_tokens(params.get("file_intent")) + TASK_OVERHEAD_TOKENS
+    completion = math.ceil(1.5 * (params.get("num_questions") or DEFAULT_QUESTION_ESTIMATE)) * COMPLETION_TOKENS_PER_QUESTION
+    model = scheduler.pick(overhead + completion + max_tokens, num_questions=params.get("num_questions"))
+    if model is None:
+        return max_tokens, None
+    return max(0, min(max_tokens, scheduler.context_window(model) - overhead - completion)), model
+
+
+async def _filter_relevant(text: str, prompt: str, params: dict, ctx: RequestContext, max_tokens: int) -> str:
+    """Shrink `text` to the model's budget, keeping the passages that match topic + instructions."""
+    budget, model = _relevance_budget(params, max_tokens)
+    ctx.set_log(relevance_budget=budget, relevance_model=model)
+    if (ctx.logs.get("source_tokens_after") or count_tokens(text)) <= budget:
+        return text
+    query = " ".join(filter(None, [params.get("topic"), prompt]))
+    text, stats = await asyncio.to_thread(select_relevant, text, query, budget)
+    ctx.set_log(source_tokens_after=stats.tokens_kept, **stats.as_log())
+    return text
+
+
+def _normalize_text(text) -> str:
+    return " ".join(str(text or "").split()).lower()
+
+
+def _coalescing_key(input_data: dict, chunked: bool) -> str:
+    """Whitespace/case-insensitive fingerprint of a generation request."""
+    params = {k: input_data.get(k) for k in _COALESCE_FIELDS}
+    params["topic"] = _normalize_text(params["topic"])
+    params["quiz_type"] = sorted(params["quiz_type"] or [])
+    params["chunked"] = bool(chunked)
+    params["instructions"] = _normalize_text(input_data.get("user_additional_instructions"))
+    params["source_sha256"] = hashlib.sha256(
+        " ".join((input_data.get("source_material") or "").split()).encode("utf-8")
+    ).hexdigest()
+    return hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _rubrics(quizzes: List[Optional[Dict[str, Any]]]) -> Dict[int, Dict[str, Any]]:
+    """Evaluation rubric for every essay/FITB item that can be scored."""
+    rubrics = {}
+    for i, q in enumerate(quizzes):
+        if not q or q.get("type") not in ("essay", "fitb"):
+            continue
+        try:
+            rubrics[i] = build_rubric({**q, "keywords": q.get("keywords") or []})
+        except ValueError:
+            pass  # e.g. a FITB item with an answer but no keywords
+    return rubrics
+
+
+async def _store_quiz(request_id: str, quizzes: List[Optional[Dict[str, Any]]], ctx: RequestContext) -> Optional[str]:
+    """Persist a generated quiz for evaluation by quiz_id; a storage failure never fails generation."""
+    try:
+        quiz_id = await asyncio.to_thread(quiz_store.save, request_id, quizzes, _rubrics(quizzes))
+    except Exception as e:
+        log_event("quiz_store_failure", request_id=request_id, error=str(e))
+        return None
+    if quiz_id:
+        ctx.set_log(quiz_id=quiz_id)
+    return quiz_id
+
+
+async def generate_quizzes_from_text_or_file(request_id: str, prompt: str, file=None, extra_data={}, ctx=None, files=None):
+    input_data, ctx = await _prepare_input_data(request_id, prompt, file, extra_data, ctx, files=files)
+    chunked = bool(ctx.inputs.get("chunked"))
+
+    async def run():
+        if chunked:
+            resp = await generate_quiz_chunked(input_data, ctx)
+        else:
+            resp = await generate_quiz(input_data, ctx, preferred_model=ctx.logs.get("relevance_model"))
+        # Stored once per flight; coalesced requests get the owner's quiz_id
+        resp.quiz_id = await _store_quiz(request_id, [q.model_dump() for q in resp.quizzes], ctx)
+        return resp
+
+    key = _coalescing_key(input_data, chunked)
+    resp, shared, owner = await generation_flights.do(key, run, owner=request_id)
+    if shared:
+        # This request piggybacked on another one's LLM call
+        ctx.set_log(coalesced=True, coalesced_with=owner)
+        log_event("generation_coalesced", request_id=request_id, coalesced_with=owner)
+        return resp.model_copy(deep=True)
+    return resp
+
+
+async def stream_quizzes_from_text_or_file(request_id: str, prompt: str, file=None, extra_data={}, ctx=None, files=None):
+    """
+    Same inputs as generate_quizzes_from_text_or_file, but returns an async
+    iterator of quiz events (see quiz_engine.open_quiz_stream).
+    """
+    input_data, ctx = await _prepare_input_data(request_id, prompt, file, extra_data, ctx, files=files)
+    return _with_quiz_id(await open_quiz_stream(input_data, ctx), request_id, ctx)
+
 
+async def _with_quiz_id(events: AsyncIterator[Dict[str, Any]], request_id: str, ctx: RequestContext) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Store the streamed quiz when it completes and add its quiz_id to the done
+    event. Items are stored at their event index (invalid items as null), so
+    question_index is the index the client saw.
+    """
+    quizzes: Dict[int, Dict[str, Any]] = {}
+    try:
+        async for event in events:
+            if event.get("event") == "quiz":
+                quizzes[event["index"]] = event["quiz"]
+            elif event.get("event") == "done" and quizzes:
+                items = [quizzes.get(i) for i in range(max(quizzes) + 1)]
+                event = {**event, "quiz_id": await _store_quiz(request_id, items, ctx)}
+            yield event
+    finally:
+        await events.aclose()
@@ -0,0 +1,166 @@
+import os
+import shutil
+import asyncio
+import uuid
+from typing import Any, Dict, List, Optional
+from dotenv import load_dotenv
+from fastapi import HTTPException, UploadFile
+
+from app.services.generate import generate_quizzes_from_text_or_file
+from app.utils.file_validator import validate_file
+from app.utils.file_parser import MAX_FILE_SIZE_BYTES, MAX_FILE_SIZE_MB
+from app.utils.job_queue import JobQueue, JobStore
+from app.utils.request_context import RequestContext
+from app.utils.logger import log_event
+
+load_dotenv()
+
+JOB_WORKERS      = int(os.getenv("JOB_WORKERS", "2"))
+JOB_QUEUE_MAX    = int(os.getenv("JOB_QUEUE_MAX", "100"))  # 0 = unbounded
+JOB_DB_PATH      = os.getenv("JOB_DB_PATH", "data/jobs.sqlite3")
+JOB_SPOOL_DIR    = os.getenv("JOB_SPOOL_DIR", "data/job_uploads")
+JOB_RESULT_TTL_S = int(os.getenv("JOB_RESULT_TTL_S", str(24 * 3600)))
+
+
+def _spool_upload(file: UploadFile, name: str) -> str:
+    """Copy the upload to the spool dir so the job can run after the request ends."""
+    os.makedirs(JOB_SPOOL_DIR, exist_ok=True)
+    path = os.path.join(JOB_SPOOL_DIR, name + os.path.splitext(file.filename)[1])
+    file.file.seek(0)
+    with open(path, "wb") as out:
+        shutil.copyfileobj(file.file, out)
+    return path
+
+
+def _remove_spooled(path: Optional[str]) -> None:
+    if path:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _remove_job_uploads(job: Dict[str, Any]) -> None:
+    _remove_spooled(job.get("file_path"))
+    for spooled in job.get("files") or []:
+        _remove_spooled(spooled["path"])
+
+
+def _open_spooled(path: str, name: str) -> UploadFile:
+    if not os.path.exists(path):
+        raise HTTPException(410, "Uploaded file for this job is no longer available")
+    return UploadFile(file=open(path, "rb"), filename=name)
+
+
+def _job_error(e: BaseException) -> Dict[str, Any]:
+    if isinstance(e, HTTPException):
+        return {"status_code": e.status_code, "detail": e.detail}
+    if isinstance(e, ValueError):
+        return {"status_code": 400, "detail": str(e)}
+    return {"status_code": 500, "detail": "Internal server error"}
+
+
+async def _run_generation_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    ctx = RequestContext(request_id=job["request_id"])
+    ctx.set_input(**job["params"])
+    ctx.set_log(job_id=job["id"], queue_wait_s=job["queue_wait_s"])
+    log_event("job_start", request_id=ctx.request_id, **ctx.logs)
+
+    file = None
+    files: List[UploadFile] = []
+    try:
+        if job["file_path"]:
+            file = _open_spooled(job["file_path"], job["file_name"])
+        for spooled in job.get("files") or []:
+            files.append(_open_spooled(spooled["path"], spooled["name"]))
+        resp = await generate_quizzes_from_text_or_file(
+            request_id=ctx.request_id,
+            prompt=job["params"].get("user_additional_instructions", ""),
+            file=file,
+            files=files or None,
+            extra_data=ctx.inputs,
+            ctx=ctx,
+        )
+        log_event("job_success", request_id=ctx.request_id, **ctx.logs)
+        _remove_job_uploads(job)
+        return resp.model_dump()
+    except asyncio.CancelledError:
+        # Shutdown: keep the spooled uploads, the job is re-run on the next start
+        raise
+    except Exception as e:
+        log_event("job_failed", request_id=ctx.request_id, error_message=str(e), **ctx.logs)
+        _remove_job_uploads(job)
+        raise
+    finally:
+        for upload in [file, *files]:
+            if upload is not None:
+                upload.file.close()
+
+
+job_store = JobStore(JOB_DB_PATH)
+generation_jobs = JobQueue(
+    job_store,
+    _run_generation_job,
+    workers=JOB_WORKERS,
+    max_depth=JOB_QUEUE_MAX,
+    error_mapper=_job_error,
+)
+
+
+def _purge_expired_jobs() -> None:
+    for job in job_store.purge_finished(JOB_RESULT_TTL_S):
+        _remove_job_uploads(job)
+
+
+async def start_generation_jobs() -> None:
+    """Drop expired job records, then start the workers (re-enqueuing unfinished jobs)."""
+    await asyncio.to_thread(_purge_expired_jobs)
+    recovered = await generation_jobs.start()
+    if recovered:
+        print(f"Re-enqueued {recovered} unfinished generation job(s)")
+
+
+def _check_upload(file: UploadFile) -> None:
+    validate_file(file)
+    if file.size is not None and file.size > MAX_FILE_SIZE_BYTES:
+        raise HTTPException(413, f"File too large: {file.size / (1024 * 1024):.2f}MB (limit {MAX_FILE_SIZE_MB}MB)")
+
+
+async def submit_generation_job(request_id: str, params: Dict[str, Any], file: Optional[UploadFile] = None,
+                                files: Optional[List[UploadFile]] = None) -> Dict[str, Any]:
+    """Persist a generation job (spooling its uploads) and queue it; returns the job record."""
+    job_id = uuid.uuid4().hex
+    files = [f for f in files or [] if f]
+    for upload in [file, *files]:
+        if upload is not None:
+            _check_upload(upload)
+
+    file_path = None
+    spooled: List[Dict[str, str]] = []
+    try:
+        if file is not None:
+            file_path = await asyncio.to_thread(_spool_upload, file, job_id)
+        for i, upload in enumerate(files):
+            path = await asyncio.to_thread(_spool_upload, upload, f"{job_id}-{i}")
+            spooled.append({"path": path, "name": upload.filename})
+        job = await asyncio.to_thread(
+            job_store.create, request_id, params, file_path=file_path,
+            file_name=file.filename if file is not None else None, job_id=job_id, files=spooled,
+        )
+    except BaseException:
+        _remove_job_uploads({"file_path": file_path, "files": spooled})
+        raise
+    try:
+        generation_jobs.submit(job_id)
+    except Exception as e:
+        await asyncio.to_thread(job_store.mark_finished, job_id, error=_job_error(HTTPException(503, str(e))))
+        _remove_job_uploads(job)
+        raise
+    return job
+
+
+async def get_generation_job(job_id: str) -> Optional[Dict[str, Any]]:
+    job = await asyncio.to_thread(job_store.get, job_id)
+    if job is not None:
+        job["queue_position"] = generation_jobs.position(job_id)
+    return job
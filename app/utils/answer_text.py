@@ -0,0 +1,78 @@
+# app/utils/answer_text.py
+# Text normalization and tokenization for answer scoring. Only stdlib and the
+# bundled stopword list, so the API process can prepare rubrics without
+# loading the scoring libraries (rapidfuzz, textstat).
+import os
+import re
+import string
+from functools import lru_cache
+from typing import Iterable, List, Tuple
+
+from app.utils.stopwords_en import STOPWORDS_EN
+
+# "regex": compiled-regex tokenizer (default, no NLTK needed);
+# "nltk": nltk.word_tokenize (punkt), downloaded on first use
+EVAL_TOKENIZER = os.getenv("EVAL_TOKENIZER", "regex").lower()
+if EVAL_TOKENIZER not in ("regex", "nltk"):
+    raise ValueError(f"EVAL_TOKENIZER must be 'regex' or 'nltk', got {EVAL_TOKENIZER!r}")
+
+
+# Punctuation → space, so "light-dependent" and "light dependent" read the same
+_PUNCTUATION_TO_SPACE = str.maketrans({c: " " for c in string.punctuation + "–—‘’“”…"})
+
+
+def _phrase_text(text: str) -> str:
+    return " ".join(text.lower().translate(_PUNCTUATION_TO_SPACE).split())
+
+
+def normalize_keywords(keywords: Iterable[str]) -> Tuple[List[str], List[str]]:
+    """(single words, phrases): lowercased, punctuation read as spaces, deduplicated."""
+    normalized = dict.fromkeys(_phrase_text(kw) for kw in keywords)
+    normalized.pop("", None)
+    return [kw for kw in normalized if " " not in kw], [kw for kw in normalized if " " in kw]
+
+
+_STOPWORDS = STOPWORDS_EN
+
+# Mirrors what word_tokenize + isalnum() keeps: a run of letters/digits is a
+# token only when it stands alone between spaces or punctuation that punkt
+# splits off. Runs joined by hyphens, inner periods/apostrophes or digit
+# separators ("light-dependent", "e.g.", "o'clock", "1,000") form one
+# non-alphanumeric token there, so they are skipped here.
+_CONTRACTION_RE = re.compile(r"(n't|'(?:s|re|ve|ll|d|m))\b")
+_REGEX_TOKEN_RE = re.compile(
+    r"(?<![^\s(\[{<\"`@#$%&;?!*,'])(?<![^\W_]')(?<!\d,)"
+    r"[^\W_]+"
+    r"(?=$|[\s)\]}>\"@#$%&;?!*]|'(?![^\W_])|,(?!\d)|:(?!\d)|\.(?:$|[\s\"')\]]))"
+)
+
+
+def _regex_tokenize(text: str) -> list[str]:
+    # "don't" -> "do n't", "it's" -> "it 's", "a...b" -> "a ... b", as word_tokenize splits them
+    text = _CONTRACTION_RE.sub(r" \1", text).replace("...", " ... ")
+    return _REGEX_TOKEN_RE.findall(text)
+
+
+@lru_cache(maxsize=1)
+def _word_tokenize():
+    from nltk.tokenize import word_tokenize
+    from app.utils.nltk_setup import NLTK_DATA  # triggers the setup once
+
+    return word_tokenize
+
+
+def clean_text(text: str) -> str:
+    """
+    Lowercase, strip whitespace, collapse internal runs of whitespace.
+    """
+    return re.sub(r"\s+", " ", text.strip().lower())
+
+def tokenize_and_filter(text: str) -> list[str]:
+    """
+    Tokenize on words, keep only alphanumeric tokens not in stopwords.
+    """
+    txt = clean_text(text)
+    if EVAL_TOKENIZER == "regex":
+        return [t for t in _regex_tokenize(txt) if t not in _STOPWORDS]
+    tokens = _word_tokenize()(txt)
+    return [t for t in tokens if t.isalnum() and t not in _STOPWORDS]
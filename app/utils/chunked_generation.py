@@ -0,0 +1,195 @@
+# app/utils/chunked_generation.py
+import os
+import re
+import time
+import asyncio
+from typing import Any, Dict, List, Optional
+from fastapi import HTTPException
+from dotenv import load_dotenv
+
+from app.models.schema import QuizGenerationResponse
+from app.utils.chunking import split_into_chunks, allocate_questions
+from app.utils.tokenizer import count_tokens
+from app.utils.prompt import system_prompt_tokens
+from app.utils.quiz_engine import generate_quiz, scheduler, COMPLETION_TOKENS_PER_QUESTION, DEFAULT_QUESTION_ESTIMATE
+from app.utils.request_context import RequestContext
+from app.utils.logger import log_event
+
+load_dotenv()
+
+# Source tokens per chunk, and the hard cap on a whole document in chunked mode
+CHUNK_MAX_TOKENS   = int(os.getenv("CHUNK_MAX_TOKENS", "3000"))
+CHUNKED_MAX_TOKENS = int(os.getenv("CHUNKED_MAX_TOKENS", "100000"))
+
+# Rough size of the task parameters + user instructions around each chunk
+TASK_OVERHEAD_TOKENS = 300
+
+# Near-duplicate threshold (Jaccard over question words)
+DEDUP_SIMILARITY = 0.8
+
+_NON_WORD_RE = re.compile(r"[^a-z0-9]+")
+
+
+def _required_context(prompt_overhead: int, chunk_tokens: int, num_questions: Optional[int]) -> int:
+    # The prompt asks for ~1.5x the requested count
+    q = num_questions or DEFAULT_QUESTION_ESTIMATE
+    return prompt_overhead + chunk_tokens + int(1.5 * q * COMPLETION_TOKENS_PER_QUESTION)
+
+
+def _assign_models(requirements: List[int], question_counts: List[Optional[int]]) -> List[Optional[str]]:
+    """
+    Ask the scheduler for a model per chunk, excluding models already handed
+    out so the chunks draw on different quota windows. None means "no model
+    fits; let generate_quiz pick at call time".
+    """
+    assigned: List[Optional[str]] = []
+    used: set = set()
+    for need, q in zip(requirements, question_counts):
+        model = scheduler.pick(need, exclude=used, num_questions=q) or scheduler.pick(need, num_questions=q)
+        if model is not None and scheduler.context_window(model) < need:
+            model = None
+        assigned.append(model)
+        if model is not None:
+            used.add(model)
+    return assigned
+
+
+def _question_words(question: str) -> set:
+    return set(_NON_WORD_RE.sub(" ", question.lower()).split())
+
+
+def _is_duplicate(words: set, seen: List[set]) -> bool:
+    for other in seen:
+        union = len(words | other)
+        if union and len(words & other) / union >= DEDUP_SIMILARITY:
+            return True
+    return False
+
+
+def merge_responses(results: List[QuizGenerationResponse], num_questions: Optional[int], elapsed: float,
+                    existing_quiz: bool = False) -> QuizGenerationResponse:
+    """
+    Merge per-chunk responses (in document order), dropping duplicate and
+    near-duplicate questions. When a total was requested, questions are
+    picked round-robin across chunks so every part of the document stays
+    represented.
+
+    With `existing_quiz` every converted item is kept in document order:
+    similar-looking questions of an existing quiz are still different
+    questions, and none of them may be dropped.
+    """
+    seen: List[set] = []
+    per_chunk: List[list] = []
+    for res in results:
+        if existing_quiz:
+            per_chunk.append(list(res.quizzes))
+            continue
+        kept = []
+        for quiz in res.quizzes:
+            words = _question_words(quiz.question)
+            if not words or _is_duplicate(words, seen):
+                continue
+            seen.append(words)
+            kept.append(quiz)
+        per_chunk.append(kept)
+
+    if num_questions and not existing_quiz:
+        selected = [[] for _ in per_chunk]
+        remaining = num_questions
+        depth = 0
+        while remaining > 0 and any(depth < len(k) for k in per_chunk):
+            for i, kept in enumerate(per_chunk):
+                if remaining and depth < len(kept):
+                    selected[i].append(kept[depth])
+                    remaining -= 1
+            depth += 1
+        per_chunk = selected
+
+    quizzes = [q for kept in per_chunk for q in kept]
+
+    token_usage: Dict[str, Any] = {}
+    for res in results:
+        for key in ("prompt_tokens", "completion_tokens", "total_tokens"):
+            value = (res.token_usage or {}).get(key)
+            if isinstance(value, (int, float)):
+                token_usage[key] = token_usage.get(key, 0) + value
+
+    models = list(dict.fromkeys(r.model_used for r in results))
+    return QuizGenerationResponse(
+        model_used=", ".join(models),
+        inference_time=elapsed,
+        question_count=len(quizzes),
+        attempt_number=max(r.attempt_number for r in results),
+        token_usage=token_usage or None,
+        cached=all(r.cached for r in results),
+        quizzes=quizzes,
+    )
+
+
+async def generate_quiz_chunked(input_data: Dict[str, Any], ctx: RequestContext) -> QuizGenerationResponse:
+    """
+    Map-reduce generation for material larger than one context window:
+    split `source_material` into token-bounded chunks, spread the question
+    count over them, generate every chunk concurrently on different models
+    and merge the results into one response.
+    """
+    source = input_data.get("source_material") or ""
+    chunks = split_into_chunks(source, CHUNK_MAX_TOKENS)
+    if len(chunks) <= 1:
+        return await generate_quiz(input_data, ctx)
+
+    chunk_tokens = [count_tokens(c) for c in chunks]
+    existing_quiz = input_data.get("file_intent") == "existing_quiz"
+    if existing_quiz:
+        # Every chunk holds original questions, so every chunk is converted in full
+        counts = [None] * len(chunks)
+    else:
+        counts = allocate_questions(chunk_tokens, input_data.get("num_questions"))
+    # With fewer questions than chunks, some chunks get no questions at all
+    work = [(i, chunks[i], counts[i], chunk_tokens[i]) for i in range(len(chunks)) if counts[i] != 0]
+    overhead = system_prompt_tokens(input_data.get("file_intent")) + TASK_OVERHEAD_TOKENS
+    models = _assign_models([_required_context(overhead, t, q) for _, _, q, t in work], [q for _, _, q, _ in work])
+
+    ctx.set_log(
+        chunk_count=len(chunks),
+        chunks_used=len(work),
+        chunk_tokens=chunk_tokens,
+        chunk_models=models,
+    )
+    log_event("chunked_generation_start", request_id=ctx.request_id, **ctx.logs)
+
+    start = time.perf_counter()
+    tasks = []
+    for (i, chunk, q, _), model in zip(work, models):
+        chunk_input = {**input_data, "source_material": chunk, "num_questions": q}
+        chunk_ctx = RequestContext(request_id=f"{ctx.request_id}#chunk{i}")
+        tasks.append(generate_quiz(chunk_input, chunk_ctx, preferred_model=model))
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    elapsed = time.perf_counter() - start
+
+    successes: List[QuizGenerationResponse] = []
+    failures = []
+    for (i, *_), res in zip(work, results):
+        if isinstance(res, QuizGenerationResponse):
+            successes.append(res)
+        elif isinstance(res, Exception):
+            detail = res.detail if isinstance(res, HTTPException) else str(res)
+            failures.append({"chunk": i, "error": detail})
+        else:
+            raise res  # cancellation and other BaseExceptions
+
+    ctx.set_log(chunk_failures=failures)
+    # A failed chunk of an existing quiz would silently lose its questions
+    if not successes or (existing_quiz and failures):
+        first = next(r for r in results if isinstance(r, Exception))
+        raise first
+
+    resp = merge_responses(successes, input_data.get("num_questions"), elapsed, existing_quiz)
+    ctx.set_log(
+        model_used=resp.model_used,
+        inference_time_s=elapsed,
+        questions_generated=resp.question_count,
+        status="success" if not failures else "partial_success",
+    )
+    log_event("chunked_generation_success", request_id=ctx.request_id, **ctx.logs)
+    return resp
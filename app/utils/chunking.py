@@ -0,0 +1,61 @@
+# app/utils/chunking.py
+import re
+from typing import List, Optional
+
+from app.utils.tokenizer import get_encoder
+
+_PARAGRAPH_SPLIT_RE = re.compile(r"\n\s*\n")
+
+
+def split_into_chunks(text: str, max_tokens: int) -> List[str]:
+    """
+    Split `text` into chunks of at most `max_tokens` tokens.
+
+    Paragraphs are packed greedily so chunks break on paragraph boundaries;
+    a single paragraph larger than the budget is cut on token boundaries.
+    """
+    enc = get_encoder()
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+
+    def flush():
+        nonlocal current, current_tokens
+        if current:
+            chunks.append("\n\n".join(current))
+        current, current_tokens = [], 0
+
+    for para in _PARAGRAPH_SPLIT_RE.split(text):
+        para = para.strip()
+        if not para:
+            continue
+        ids = enc.encode_ordinary(para)
+        if len(ids) > max_tokens:
+            flush()
+            for i in range(0, len(ids), max_tokens):
+                chunks.append(enc.decode(ids[i:i + max_tokens]))
+            continue
+        if current_tokens + len(ids) > max_tokens:
+            flush()
+        current.append(para)
+        current_tokens += len(ids)
+
+    flush()
+    return chunks
+
+
+def allocate_questions(chunk_tokens: List[int], total: Optional[int]) -> List[Optional[int]]:
+    """
+    Spread `total` questions over chunks in proportion to their size
+    (largest-remainder method). With no total, every chunk gets None and the
+    model infers a count. Chunks may get 0 when total < number of chunks.
+    """
+    if not total:
+        return [None] * len(chunk_tokens)
+    weight = sum(chunk_tokens) or len(chunk_tokens)
+    shares = [total * (t or 1) / weight for t in chunk_tokens]
+    counts = [int(s) for s in shares]
+    by_remainder = sorted(range(len(shares)), key=lambda i: shares[i] - counts[i], reverse=True)
+    for i in by_remainder[: total - sum(counts)]:
+        counts[i] += 1
+    return counts
@@ -0,0 +1,171 @@
+# app/utils/compaction.py
+import os
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Set, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+COMPACTION_ENABLED      = os.getenv("COMPACTION_ENABLED", "true").lower() == "true"
+# Extraction may read this much more than MAX_TOKENS, since compaction trims it back
+COMPACTION_HEADROOM     = float(os.getenv("COMPACTION_HEADROOM", "1.5"))
+BOILERPLATE_MIN_REPEATS = int(os.getenv("BOILERPLATE_MIN_REPEATS", "3"))
+NEAR_DUP_SIMILARITY     = float(os.getenv("NEAR_DUP_SIMILARITY", "0.9"))
+
+# Lines longer than this are content, never header/footer boilerplate
+BOILERPLATE_MAX_CHARS = 120
+# Headers, footers and page numbers are only looked for in the first/last
+# this many lines of each page (extractors separate pages with a form feed)
+BOILERPLATE_EDGE_LINES = 1
+SHINGLE_SIZE = 3
+
+PAGE_BREAK = "\f"
+_PARAGRAPH_SPLIT_RE = re.compile(r"\n\s*\n")
+_INLINE_SPACE_RE = re.compile(r"[ \t\v\u00a0\u200b]+")
+_NON_WORD_RE = re.compile(r"[^a-z0-9]+")
+_PAGE_NUMBER_RE = re.compile(
+    r"^[\s\-–—|•·]*(?:(?:page|slide|p\.)\s*)?\d{1,4}(?:\s*(?:/|of)\s*\d{1,4})?[\s\-–—|•·]*$",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class CompactionStats:
+    chars_before: int
+    chars_after: int
+    page_numbers_removed: int
+    boilerplate_lines_removed: int
+    duplicate_paragraphs_removed: int
+
+    def as_log(self) -> Dict[str, int]:
+        return {f"compaction_{k}": v for k, v in self.__dict__.items()}
+
+
+def _normalize_whitespace(text: str) -> str:
+    lines = (_INLINE_SPACE_RE.sub(" ", line).strip() for line in text.replace("\r\n", "\n").replace("\r", "\n").split("\n"))
+    return "\n".join(lines)
+
+
+def _split_pages(text: str) -> List[List[List[str]]]:
+    """Pages (split on PAGE_BREAK) as paragraphs of non-blank, whitespace-normalized lines."""
+    pages = []
+    for page in text.split(PAGE_BREAK):
+        paragraphs = [
+            [line for line in p.split("\n") if line]
+            for p in _PARAGRAPH_SPLIT_RE.split(_normalize_whitespace(page))
+        ]
+        paragraphs = [p for p in paragraphs if p]
+        if paragraphs:
+            pages.append(paragraphs)
+    return pages
+
+
+def _line_key(line: str) -> str:
+    # Exact (case-insensitive): lines differing in a number, such as
+    # "Question 1" / "Question 2", are content, not a repeated header
+    return line.lower()
+
+
+def _edge_indexes(line_count: int) -> Set[int]:
+    """Header/footer positions of a page; a page too short to have a body has none."""
+    if line_count <= 2 * BOILERPLATE_EDGE_LINES:
+        return set()
+    edge = BOILERPLATE_EDGE_LINES
+    return set(range(edge)) | set(range(line_count - edge, line_count))
+
+
+def _shingles(paragraph: str) -> Set[Tuple[str, ...]]:
+    words = _NON_WORD_RE.sub(" ", paragraph.lower()).split()
+    if len(words) <= SHINGLE_SIZE:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def _drop_near_duplicates(paragraphs: List[str]) -> Tuple[List[str], int]:
+    """Keep the first of any group of paragraphs whose word shingles overlap >= NEAR_DUP_SIMILARITY."""
+    kept: List[str] = []
+    kept_shingles: List[Set[Tuple[str, ...]]] = []
+    index: Dict[Tuple[str, ...], List[int]] = defaultdict(list)
+    removed = 0
+    for para in paragraphs:
+        shingles = _shingles(para)
+        candidates = {i for s in shingles for i in index.get(s, ())}
+        if any(
+            len(shingles & kept_shingles[i]) / len(shingles | kept_shingles[i]) >= NEAR_DUP_SIMILARITY
+            for i in candidates
+        ):
+            removed += 1
+            continue
+        for s in shingles:
+            index[s].append(len(kept))
+        kept.append(para)
+        kept_shingles.append(shingles)
+    return kept, removed
+
+
+def compact_text(text: str, whitespace_only: bool = False) -> Tuple[str, CompactionStats]:
+    """
+    Shrink extracted source material without losing content:
+
+    1) normalize whitespace (runs of spaces/tabs, trailing blanks, CRLF);
+    2) drop page-number lines ("12", "Page 3 of 10", "- 4 -", "Slide 7")
+       at the top or bottom of a page;
+    3) drop repeated headers/footers: a line seen at page edges
+       BOILERPLATE_MIN_REPEATS+ times (ignoring case) is kept only where it
+       first appears; lines in the body of a page are never touched;
+    4) drop paragraphs that (nearly) repeat an earlier one, e.g. a slide
+       template or a definition pasted on every page.
+
+    Pages are the parts between PAGE_BREAK characters; text without any is
+    one page. The result has no page breaks: paragraphs are joined by a
+    blank line. With `whitespace_only` (an existing quiz, where every line
+    matters) only step 1 runs.
+    """
+    pages = _split_pages(text)
+    if whitespace_only:
+        compacted = "\n\n".join("\n".join(lines) for paragraphs in pages for lines in paragraphs)
+        return compacted, CompactionStats(len(text), len(compacted), 0, 0, 0)
+
+    line_counts: Counter = Counter()
+    for paragraphs in pages:
+        lines = [line for p in paragraphs for line in p]
+        line_counts.update(
+            _line_key(lines[i]) for i in _edge_indexes(len(lines)) if len(lines[i]) <= BOILERPLATE_MAX_CHARS
+        )
+    boilerplate = {k for k, n in line_counts.items() if n >= BOILERPLATE_MIN_REPEATS}
+
+    seen_boilerplate: Set[str] = set()
+    page_numbers = boilerplate_removed = 0
+    cleaned: List[str] = []
+    for paragraphs in pages:
+        edges = _edge_indexes(sum(map(len, paragraphs)))
+        i = -1
+        for lines in paragraphs:
+            kept_lines = []
+            for line in lines:
+                i += 1
+                if i in edges:
+                    if _PAGE_NUMBER_RE.match(line):
+                        page_numbers += 1
+                        continue
+                    key = _line_key(line)
+                    if key in boilerplate and len(line) <= BOILERPLATE_MAX_CHARS:
+                        if key in seen_boilerplate:
+                            boilerplate_removed += 1
+                            continue
+                        seen_boilerplate.add(key)
+                kept_lines.append(line)
+            if kept_lines:
+                cleaned.append("\n".join(kept_lines))
+
+    kept, duplicates = _drop_near_duplicates(cleaned)
+    compacted = "\n\n".join(kept)
+    return compacted, CompactionStats(
+        chars_before=len(text),
+        chars_after=len(compacted),
+        page_numbers_removed=page_numbers,
+        boilerplate_lines_removed=boilerplate_removed,
+        duplicate_paragraphs_removed=duplicates,
+    )
@@ -0,0 +1,57 @@
+# app/utils/disconnect.py
+import asyncio
+from contextlib import suppress
+from typing import Awaitable, TypeVar
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+T = TypeVar("T")
+
+DISCONNECT_POLL_INTERVAL_S = 0.5
+
+
+class ClientDisconnected(Exception):
+    """Raised when the client went away before the work finished."""
+
+
+async def run_until_disconnected(
+    request: Request,
+    awaitable: Awaitable[T],
+    poll_interval: float = DISCONNECT_POLL_INTERVAL_S,
+) -> T:
+    """
+    Await `awaitable` as a task, polling the connection in between.
+    If the client disconnects first, the task is cancelled (which aborts
+    any in-flight LLM call) and ClientDisconnected is raised.
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                with suppress(asyncio.CancelledError):
+                    await task
+                raise ClientDisconnected()
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+class ClosingStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that always closes its body iterator, also when the
+    client disconnects mid-stream. Starlette only stops iterating, which
+    leaves the generator (and whatever upstream stream it holds open) to
+    garbage collection.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            aclose = getattr(self.body_iterator, "aclose", None)
+            if aclose is not None:
+                await aclose()
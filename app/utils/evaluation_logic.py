@@ -1,12 +1,25 @@
 import os
-import re
-import nltk
-from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords
-from rapidfuzz import fuzz
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple
+import numpy as np
+from rapidfuzz import fuzz, process
 import textstat
 
-from app.utils.nltk_setup import NLTK_DATA  # triggers the setup once
+from app.utils.answer_text import (  # noqa: F401 (re-exported for callers of evaluation_logic)
+    EVAL_TOKENIZER, _STOPWORDS, _phrase_text, _regex_tokenize, _word_tokenize, clean_text, normalize_keywords,
+    tokenize_and_filter,
+)
+from app.utils.vector_similarity import cosine_scores
+
+# Explanation-vs-answer similarity: "fuzz" (rapidfuzz token_set_ratio) or
+# "vector" (char n-gram cosine, see vector_similarity)
+SIMILARITY_ENGINE = os.getenv("SIMILARITY_ENGINE", "fuzz").lower()
+if SIMILARITY_ENGINE not in ("fuzz", "vector"):
+    raise ValueError(f"SIMILARITY_ENGINE must be 'fuzz' or 'vector', got {SIMILARITY_ENGINE!r}")
+# Cores used by the batch scorers (rapidfuzz convention: -1 = all cores)
+EVAL_CDIST_WORKERS = int(os.getenv("EVAL_CDIST_WORKERS", "-1"))
+# A keyword counts as present when a token matches it above this partial_ratio
+KEYWORD_MATCH_THRESHOLD = 80
 
 
 
@@ -57,13 +70,14 @@ def score_readability(response: str) -> float:
 
 def score_similarity(question: dict, response: str) -> float:
     """
-    Compare 'explanation' vs. response via token_set_ratio.
-    Scale 0-100 into 0-10.
+    Compare 'explanation' vs. response via token_set_ratio (or the vector
+    engine's cosine, see SIMILARITY_ENGINE). Scale into 0-10.
     """
-    expl = question.get("explanation", "")
-    if not expl:
+    if not question.get("explanation"):
         return 0.0
-    sim = fuzz.token_set_ratio(clean_text(expl), clean_text(response))
+    if SIMILARITY_ENGINE == "vector":
+        return _vector_similarity(question, [response])[0]
+    sim = fuzz.token_set_ratio(_clean_explanation(question), clean_text(response))
     return round((sim / 100) * 10, 2)
 
 
@@ -73,36 +87,157 @@ def score_similarity(question: dict, response: str) -> float:
 
 def score_keywords(question: dict, response: str) -> float:
     """
-    For each keyword, if any response token fuzzily matches it >80%, count as matched.
-    Returns (matched / total_keywords) * 10, rounded to 2 decimals.
+    Share of the question's keywords found in the response, scaled to 0-10
+    and rounded to 2 decimals (see KeywordMatcher for what counts as found).
     """
-    keywords = [kw.lower() for kw in question.get("keywords", [])]
-    if not keywords:
-        return 0.0
-    tokens = tokenize_and_filter(response)
-    matched = 0
-    for kw in keywords:
-        if any(fuzz.partial_ratio(kw, tok) > 80 for tok in tokens):
-            matched += 1
-    return round((matched / len(keywords)) * 10, 2)
-
+    matcher = _matcher_for(question)
+    return matcher.score(response) if matcher else 0.0
 
 
 
 
-_STOPWORDS = set(stopwords.words("english"))
 
-def clean_text(text: str) -> str:
+def score_similarity_batch(question: dict, responses: list[str], workers: int = EVAL_CDIST_WORKERS) -> list[float]:
     """
-    Lowercase, strip whitespace, collapse internal runs of whitespace.
+    score_similarity for many responses at once: one 1×N token_set_ratio
+    matrix computed by rapidfuzz across `workers` cores, or with the vector
+    engine one sparse matrix-vector product.
     """
-    return re.sub(r"\s+", " ", text.strip().lower())
+    if not question.get("explanation") or not responses:
+        return [0.0] * len(responses)
+    if SIMILARITY_ENGINE == "vector":
+        return _vector_similarity(question, responses)
+    sims = process.cdist(
+        [_clean_explanation(question)], [clean_text(r) for r in responses],
+        scorer=fuzz.token_set_ratio, dtype=np.float64, workers=workers,
+    )[0]
+    return [round((sim / 100) * 10, 2) for sim in sims.tolist()]
+
+
+def _clean_explanation(question: dict) -> str:
+    # A stored rubric (see services.evaluate.build_rubric) has it cleaned already
+    if "explanation_tokens" in question:
+        return question["explanation"]
+    return clean_text(question.get("explanation", ""))
+
 
-def tokenize_and_filter(text: str) -> list[str]:
+def _vector_similarity(question: dict, responses: List[str]) -> List[float]:
+    reference = question.get("explanation_tokens")
+    if reference is None:
+        reference = tokenize_and_filter(question["explanation"])
+    sims = cosine_scores(reference, [tokenize_and_filter(r) for r in responses])
+    return [round(sim * 10, 2) for sim in sims.tolist()]
+
+
+def score_keywords_batch(question: dict, responses: list[str], workers: int = EVAL_CDIST_WORKERS) -> list[float]:
+    """
+    score_keywords for many responses at once. Every distinct token across
+    all responses is compared with every single-word keyword exactly once,
+    in one keywords × vocabulary partial_ratio matrix; each response then
+    only looks up its own columns. Phrases go through the matcher.
     """
-    Tokenize on words, keep only alphanumeric tokens not in stopwords.
+    matcher = _matcher_for(question)
+    if matcher is None or not matcher.keywords:
+        return [0.0] * len(responses)
+    token_lists = [tokenize_and_filter(r) for r in responses]
+    vocab = list(dict.fromkeys(tok for tokens in token_lists for tok in tokens))
+    column = {tok: i for i, tok in enumerate(vocab)}
+    matches = None
+    if matcher.words and vocab:
+        matches = process.cdist(
+            matcher.words, vocab, scorer=fuzz.partial_ratio, dtype=np.float64, workers=workers,
+        ) > matcher.threshold
+
+    scores = []
+    for response, tokens in zip(responses, token_lists):
+        matched = matcher.count_phrases(response)
+        if matches is not None and tokens:
+            matched += int(matches[:, [column[t] for t in set(tokens)]].any(axis=1).sum())
+        scores.append(matcher.scale(matched))
+    return scores
+
+
+class KeywordMatcher:
+    """
+    A question's keywords, normalized once and reused for every answer.
+
+    Single-word keywords are checked against the response tokens
+    (tokenize_and_filter): an exact hit in a hash set first, then the best
+    partial_ratio, found by rapidfuzz with `score_cutoff` so hopeless tokens
+    are skipped early. A keyword counts when it scores above `threshold`.
+
+    Multi-word keywords ("light-dependent reactions", "calvin cycle") are
+    matched as phrases against the response's words (stopwords kept,
+    punctuation ignored): as a substring first, then by the partial_ratio of
+    the best-aligned window.
     """
-    txt = clean_text(text)
-    tokens = word_tokenize(txt)
-    return [t for t in tokens if t.isalnum() and t not in _STOPWORDS]
 
+    def __init__(self, keywords: Iterable[str], threshold: float = KEYWORD_MATCH_THRESHOLD):
+        self.threshold = threshold
+        self._set_keywords(*normalize_keywords(keywords))
+
+    @classmethod
+    def from_rubric(cls, rubric: dict, threshold: float = KEYWORD_MATCH_THRESHOLD) -> "KeywordMatcher":
+        """Matcher over a stored rubric's keyword_words / keyword_phrases, already normalized."""
+        matcher = cls((), threshold)
+        matcher._set_keywords(list(rubric["keyword_words"]), list(rubric["keyword_phrases"]))
+        return matcher
+
+    def _set_keywords(self, words: List[str], phrases: List[str]) -> None:
+        self.words = words
+        self.phrases = phrases
+        self.keywords: List[str] = words + phrases
+        self._word_set = frozenset(words)
+
+    def _word_found(self, word: str, tokens: List[str]) -> bool:
+        best = process.extractOne(word, tokens, scorer=fuzz.partial_ratio, score_cutoff=self.threshold)
+        return best is not None and best[1] > self.threshold
+
+    def count_words(self, tokens: List[str]) -> int:
+        if not self.words or not tokens:
+            return 0
+        unique = list(dict.fromkeys(tokens))
+        present = self._word_set.intersection(unique)
+        return len(present) + sum(
+            self._word_found(w, unique) for w in self.words if w not in present
+        )
+
+    def count_phrases(self, response: str) -> int:
+        if not self.phrases:
+            return 0
+        text = _phrase_text(response)
+        padded = f" {text} "
+        found = 0
+        for phrase in self.phrases:
+            if f" {phrase} " in padded:
+                found += 1
+            else:
+                # Best-aligned window of the response, in one C call; a response
+                # shorter than the phrase is compared whole (partial_ratio would
+                # align it inside the phrase, so "calvin" would match "calvin cycle")
+                scorer = fuzz.partial_ratio if len(text) > len(phrase) else fuzz.ratio
+                found += scorer(phrase, text, score_cutoff=self.threshold) > self.threshold
+        return found
+
+    def scale(self, matched: int) -> float:
+        return round((matched / len(self.keywords)) * 10, 2) if self.keywords else 0.0
+
+    def score(self, response: str, tokens: Optional[List[str]] = None) -> float:
+        if not self.keywords:
+            return 0.0
+        if tokens is None:
+            tokens = tokenize_and_filter(response) if self.words else []
+        return self.scale(self.count_words(tokens) + self.count_phrases(response))
+
+
+@lru_cache(maxsize=1024)
+def keyword_matcher(keywords: Tuple[str, ...]) -> KeywordMatcher:
+    """One compiled matcher per distinct keyword list (i.e. per question)."""
+    return KeywordMatcher(keywords)
+
+
+def _matcher_for(question: dict) -> Optional[KeywordMatcher]:
+    if "keyword_words" in question:
+        return KeywordMatcher.from_rubric(question)
+    keywords = question.get("keywords", [])
+    return keyword_matcher(tuple(keywords)) if keywords else None
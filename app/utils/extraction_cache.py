@@ -0,0 +1,124 @@
+# app/utils/extraction_cache.py
+import os
+import time
+import sqlite3
+import threading
+from typing import Any, Dict, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+EXTRACT_CACHE_ENABLED = os.getenv("EXTRACT_CACHE_ENABLED", "true").lower() == "true"
+EXTRACT_CACHE_DB_PATH = os.getenv("EXTRACT_CACHE_DB_PATH", "data/extraction_cache.sqlite3")
+EXTRACT_CACHE_MAX_MB  = float(os.getenv("EXTRACT_CACHE_MAX_MB", "200"))
+
+# Bump when extraction output changes, so stale text is not served
+EXTRACTION_VERSION = "2"
+
+
+class ExtractionCache:
+    """
+    Extracted document text keyed by the SHA-256 of the uploaded bytes,
+    stored in SQLite so it survives restarts. When the stored text passes
+    `max_bytes`, the least recently used documents are evicted.
+    """
+
+    def __init__(self, db_path: str, max_bytes: int, enabled: bool = True):
+        self.enabled = enabled and bool(db_path)
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _get_db(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS extraction_cache ("
+                " key TEXT PRIMARY KEY, text TEXT NOT NULL, tokens INTEGER NOT NULL,"
+                " extractor TEXT, size_bytes INTEGER NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS extraction_cache_lru ON extraction_cache (last_used)")
+            self._db.commit()
+        return self._db
+
+    @staticmethod
+    def _key(sha256: str) -> str:
+        return f"{EXTRACTION_VERSION}:{sha256}"
+
+    def get(self, sha256: str) -> Optional[Dict[str, Any]]:
+        """{"text", "tokens", "extractor"} for a previously extracted upload, else None."""
+        if not self.enabled:
+            return None
+        key = self._key(sha256)
+        with self._lock:
+            db = self._get_db()
+            row = db.execute(
+                "SELECT text, tokens, extractor FROM extraction_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            db.execute("UPDATE extraction_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+            db.commit()
+            self.hits += 1
+        return {"text": row[0], "tokens": row[1], "extractor": row[2]}
+
+    def set(self, sha256: str, text: str, tokens: int, extractor: Optional[str] = None) -> None:
+        if not self.enabled:
+            return
+        size = len(text.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            db = self._get_db()
+            db.execute(
+                "INSERT OR REPLACE INTO extraction_cache (key, text, tokens, extractor, size_bytes, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (self._key(sha256), text, tokens, extractor, size, time.time()),
+            )
+            self._evict(db)
+            db.commit()
+
+    def _evict(self, db: sqlite3.Connection) -> None:
+        total = db.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM extraction_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in db.execute(
+            "SELECT key, size_bytes FROM extraction_cache ORDER BY last_used"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            db.execute("DELETE FROM extraction_cache WHERE key = ?", (key,))
+            total -= size
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        entries, stored = 0, 0
+        if self.enabled:
+            with self._lock:
+                entries, stored = self._get_db().execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM extraction_cache"
+                ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": entries,
+            "stored_mb": round(stored / (1024 * 1024), 2),
+            "max_mb": round(self.max_bytes / (1024 * 1024), 2),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+
+extraction_cache = ExtractionCache(
+    db_path=EXTRACT_CACHE_DB_PATH,
+    max_bytes=int(EXTRACT_CACHE_MAX_MB * 1024 * 1024),
+    enabled=EXTRACT_CACHE_ENABLED,
+)
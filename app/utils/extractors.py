@@ -0,0 +1,213 @@
+# app/utils/extractors.py
+import os
+import re
+import zipfile
+import posixpath
+import xml.etree.ElementTree as ET
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from app.models.schema import SupportedFileType
+from app.utils.logger import log_event
+
+# Between pages/slides; a form feed, so compaction can tell page edges from
+# the blank lines between paragraphs
+PAGE_SEPARATOR = "\n\f\n"
+PARAGRAPH_SEPARATOR = "\n\n"
+TEXT_BLOCK_CHARS = 64 * 1024
+
+# An extractor yields the document's pages/paragraphs in order
+Extractor = Callable[[str], Iterator[str]]
+
+# file type -> (extractor, separator placed between the pieces it yields)
+EXTRACTORS: Dict[SupportedFileType, Tuple[Extractor, str]] = {}
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_A = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+_P = "{http://schemas.openxmlformats.org/presentationml/2006/main}"
+_R = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_PKG_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+
+class ExtractorUnavailable(Exception):
+    """The fast extractor cannot run here (e.g. optional dependency missing)."""
+
+
+class FastExtractorFailed(Exception):
+    """
+    The fast extractor failed after it had already produced text (e.g. a
+    corrupt later page). Discard what was read and use open_fallback().
+    """
+
+
+def register(*file_types: SupportedFileType, separator: str = PAGE_SEPARATOR) -> Callable[[Extractor], Extractor]:
+    def decorator(fn: Extractor) -> Extractor:
+        for file_type in file_types:
+            EXTRACTORS[file_type] = (fn, separator)
+        return fn
+    return decorator
+
+
+# ---- plain text ----------------------------------------------------------
+
+@register(SupportedFileType.txt, SupportedFileType.md, separator="")
+def iter_text_blocks(path: str) -> Iterator[str]:
+    """Raw file contents in blocks; blocks concatenate without a separator."""
+    with open(path, encoding="utf-8") as f:
+        while True:
+            block = f.read(TEXT_BLOCK_CHARS)
+            if not block:
+                return
+            yield block
+
+
+# ---- Office Open XML (docx / pptx) --------------------------------------
+
+def _paragraph_text(p: ET.Element, text_tag: str) -> str:
+    parts = []
+    for node in p.iter():
+        if node.tag == text_tag:
+            parts.append(node.text or "")
+        elif node.tag == _W + "tab":
+            parts.append("\t")
+        elif node.tag in (_W + "br", _W + "cr", _A + "br"):
+            parts.append("\n")
+    return "".join(parts).strip()
+
+
+@register(SupportedFileType.docx, separator=PARAGRAPH_SEPARATOR)
+def extract_docx(path: str) -> Iterator[str]:
+    """Paragraphs (including table cells) of word/document.xml, in document order."""
+    with zipfile.ZipFile(path) as zf:
+        with zf.open("word/document.xml") as xml:
+            for _, elem in ET.iterparse(xml):
+                # Nested paragraphs (text boxes) end first and are cleared,
+                # so the enclosing paragraph does not repeat their text
+                if elem.tag == _W + "p":
+                    text = _paragraph_text(elem, _W + "t")
+                    elem.clear()
+                    if text:
+                        yield text
+
+
+def _slide_paths(zf: zipfile.ZipFile) -> List[str]:
+    """Slide part names in presentation order (numeric order as a fallback)."""
+    names = set(zf.namelist())
+    try:
+        rels = ET.fromstring(zf.read("ppt/_rels/presentation.xml.rels"))
+        targets = {
+            r.get("Id"): posixpath.normpath(posixpath.join("ppt", r.get("Target", "")))
+            for r in rels.iter(_PKG_REL + "Relationship")
+        }
+        pres = ET.fromstring(zf.read("ppt/presentation.xml"))
+        ordered = [targets.get(s.get(_R + "id")) for s in pres.iter(_P + "sldId")]
+        ordered = [p for p in ordered if p in names]
+        if ordered:
+            return ordered
+    except KeyError:
+        pass
+    slides = [n for n in names if re.fullmatch(r"ppt/slides/slide\d+\.xml", n)]
+    return sorted(slides, key=lambda n: int(re.search(r"(\d+)\.xml$", n).group(1)))
+
+
+@register(SupportedFileType.pptx)
+def extract_pptx(path: str) -> Iterator[str]:
+    """One piece per slide: its text paragraphs, one per line."""
+    with zipfile.ZipFile(path) as zf:
+        for slide in _slide_paths(zf):
+            root = ET.fromstring(zf.read(slide))
+            lines = [t for t in (_paragraph_text(p, _A + "t") for p in root.iter(_A + "p")) if t]
+            if lines:
+                yield "\n".join(lines)
+
+
+# ---- PDF -----------------------------------------------------------------
+
+@register(SupportedFileType.pdf)
+def extract_pdf(path: str) -> Iterator[str]:
+    """Text layer of each page; pages are only parsed as they are consumed."""
+    try:
+        import pypdf
+    except ImportError:  # optional: PDFs go straight to Unstructured without it
+        raise ExtractorUnavailable("pypdf is not installed")
+    reader = pypdf.PdfReader(path)
+    for page in reader.pages:
+        text = (page.extract_text() or "").strip()
+        if text:
+            yield text
+
+
+# ---- Unstructured fallback -----------------------------------------------
+
+def extract_unstructured(path: str) -> Iterator[str]:
+    """Slow path: Unstructured partitioning, page by page."""
+    from langchain_community.document_loaders import UnstructuredFileLoader
+
+    for doc in UnstructuredFileLoader(path, mode="paged").lazy_load():
+        yield doc.page_content
+
+
+def _start(pages: Iterator[str]) -> Tuple[Optional[str], Iterator[str]]:
+    """Run an extractor up to its first non-blank page (None if there is none)."""
+    for page in pages:
+        if page.strip():
+            return page, pages
+    return None, pages
+
+
+def _pieces(first: str, rest: Iterator[str], separator: str = PAGE_SEPARATOR) -> Iterator[str]:
+    """Pages as pieces that concatenate to the document text."""
+    try:
+        yield first
+        for page in rest:
+            yield separator + page
+    finally:
+        close = getattr(rest, "close", None)
+        if close is not None:
+            close()
+
+
+def _fast_pieces(name: str, pieces: Iterator[str]) -> Iterator[str]:
+    """`pieces`, with any failure while reading turned into FastExtractorFailed."""
+    try:
+        yield from pieces
+    except Exception as e:
+        log_event("extractor_fallback", request_id="Unknown", extractor=name, stage="mid_document", error=repr(e))
+        raise FastExtractorFailed(repr(e)) from e
+
+
+def open_document(path: str) -> Tuple[str, Iterator[str]]:
+    """
+    Pick an extractor for `path` by extension and return (name, pieces),
+    where the pieces concatenate to the document text.
+
+    The registered fast extractor is tried first. If it fails before
+    producing text, or finds no text at all (e.g. a scanned PDF), the
+    document goes through Unstructured. If it fails later (e.g. a corrupt
+    page deep in a PDF), iterating the pieces raises FastExtractorFailed:
+    the caller discards what it read and starts over with open_fallback().
+    Files that turn out not to be Office documents are read as plain text.
+    """
+    ext = os.path.splitext(path)[1][1:].lower()
+    fast = EXTRACTORS.get(SupportedFileType.__members__.get(ext))
+    if fast is not None:
+        extractor, separator = fast
+        try:
+            first, rest = _start(extractor(path))
+            if first is not None:
+                return extractor.__name__, _fast_pieces(extractor.__name__, _pieces(first, rest, separator))
+        except Exception as e:
+            log_event("extractor_fallback", request_id="Unknown", extractor=extractor.__name__, stage="start", error=repr(e))
+    return open_fallback(path)
+
+
+def open_fallback(path: str) -> Tuple[str, Iterator[str]]:
+    """(name, pieces) from Unstructured, or plain text for non-Office files."""
+    try:
+        first, rest = _start(extract_unstructured(path))
+    except ValueError as e:
+        if "not a ZIP archive" in str(e):
+            return iter_text_blocks.__name__, iter_text_blocks(path)
+        raise
+    if first is None:
+        return extract_unstructured.__name__, iter(())
+    return extract_unstructured.__name__, _pieces(first, rest)
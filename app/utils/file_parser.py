@@ -1,64 +1,168 @@
 import os
+import time
+import hashlib
+import asyncio
 import tempfile
+from typing import Tuple
 from fastapi import UploadFile, HTTPException
-from langchain_community.document_loaders import UnstructuredFileLoader
-from langchain_community.document_loaders import TextLoader
-import tiktoken
 from app.utils.request_context import RequestContext
 from app.utils.logger          import log_event, append_to_gsheets
+from app.utils.tokenizer       import TokenBudget, TokenBudgetExceeded
+from app.utils.extractors      import FastExtractorFailed, open_document, open_fallback
+from app.utils.extraction_cache import extraction_cache
+from app.utils.process_pool    import BoundedProcessPool, PoolBusy, PoolTimeout
 
 MAX_FILE_SIZE_MB = int(os.getenv("MAX_FILE_SIZE_MB", "2"))
 MAX_TOKENS      = int(os.getenv("MAX_TOKENS", "10000"))
 
-def estimate_tokens(text: str) -> int:
-    enc = tiktoken.get_encoding("cl100k_base") 
+MAX_FILE_SIZE_BYTES = MAX_FILE_SIZE_MB * 1024 * 1024
+UPLOAD_CHUNK_BYTES = 256 * 1024
+
+# Extraction runs in worker processes so parsing never holds the event loop
+# (or the GIL) that LLM-bound requests need; PARSE_WORKERS=0 uses a thread
+PARSE_WORKERS             = int(os.getenv("PARSE_WORKERS", "2"))
+PARSE_MAX_TASKS_PER_CHILD = int(os.getenv("PARSE_MAX_TASKS_PER_CHILD", "50"))
+PARSE_TIMEOUT_S           = float(os.getenv("PARSE_TIMEOUT_S", "60"))
+PARSE_MAX_CONCURRENT      = int(os.getenv("PARSE_MAX_CONCURRENT", str(max(1, PARSE_WORKERS))))
+PARSE_MAX_WAITING         = int(os.getenv("PARSE_MAX_WAITING", "16"))  # 0 = unbounded
+
+parse_pool = BoundedProcessPool(
+    max_workers=PARSE_WORKERS,
+    max_tasks_per_child=PARSE_MAX_TASKS_PER_CHILD,
+    timeout_s=PARSE_TIMEOUT_S,
+    max_concurrent=PARSE_MAX_CONCURRENT,
+    max_waiting=PARSE_MAX_WAITING,
+    # Over-long documents are normal input rejections, not worker failures
+    expected_errors=(TokenBudgetExceeded,),
+)
+
+
+def _read_pieces(extractor: str, pieces, max_tokens: int) -> Tuple[str, TokenBudget, str]:
+    budget = TokenBudget(max_tokens)
+    parts = []
     try:
-        enc = tiktoken.encoding_for_model("deepseek-llm")
-    except Exception:
-        pass
-    print(len(enc.encode(text)))
-    return len(enc.encode(text))
-    return 0
-
-async def get_text_from_file(file: UploadFile, ctx: RequestContext) -> str:
-    # 1) Read upload into memory, enforce size limit
-    file_bytes = await file.read()
-    size_mb = len(file_bytes) / (1024 * 1024)
-    ctx.set_log(file_size_kb=size_mb*1024)
-    if size_mb > MAX_FILE_SIZE_MB:
-        msg = f"File too large: {size_mb:.2f}MB"
-        log_event("file_parse_error", request_id=ctx.request_id, error_message=msg, **ctx.logs)
-        append_to_gsheets("generation", {**ctx.inputs, **ctx.logs, "status":"failure", "error_message":msg})
-        raise HTTPException(413, msg)
-
-    # 2) Dump to a real temp file, so Unstructured can operate on it
+        for piece in pieces:
+            budget.add(piece)
+            parts.append(piece)
+    finally:
+        close = getattr(pieces, "close", None)
+        if close is not None:
+            close()
+    return "".join(parts), budget, extractor
+
+
+def _extract_text(path: str, max_tokens: int) -> Tuple[str, TokenBudget, str]:
+    """
+    Blocking extraction with the token limit enforced as pages arrive;
+    raises TokenBudgetExceeded as soon as the budget is blown, without
+    reading the rest of the document. Run it off the event loop.
+    Returns (text, budget, extractor name).
+    """
+    try:
+        return _read_pieces(*open_document(path), max_tokens)
+    except FastExtractorFailed:
+        # The fast extractor broke part-way through: start over with Unstructured
+        return _read_pieces(*open_fallback(path), max_tokens)
+
+async def _run_extraction(path: str, max_tokens: int) -> Tuple[str, TokenBudget, str]:
+    if PARSE_WORKERS <= 0:
+        return await asyncio.to_thread(_extract_text, path, max_tokens)
+    try:
+        return await parse_pool.run(_extract_text, path, max_tokens)
+    except PoolBusy:
+        raise HTTPException(503, "Too many documents are being processed, please retry shortly",
+                            headers={"Retry-After": "5"})
+    except PoolTimeout:
+        raise HTTPException(422, f"Document took longer than {PARSE_TIMEOUT_S:.0f}s to parse")
+
+
+def _reject_too_large(ctx: RequestContext, size_bytes: int) -> None:
+    ctx.set_log(file_size_kb=size_bytes / 1024)
+    msg = f"File too large: {size_bytes / (1024 * 1024):.2f}MB (limit {MAX_FILE_SIZE_MB}MB)"
+    log_event("file_parse_error", request_id=ctx.request_id, error_message=msg, **ctx.logs)
+    append_to_gsheets("generation", {**ctx.inputs, **ctx.logs, "status":"failure", "error_message":msg})
+    raise HTTPException(413, msg)
+
+
+def reject_too_long(ctx: RequestContext, max_tokens: int) -> None:
+    msg = f"Extracted text too long: more than {max_tokens} tokens"
+    log_event("file_parse_error", request_id=ctx.request_id, error_message=msg, **ctx.logs)
+    append_to_gsheets("generation", {**ctx.inputs, **ctx.logs, "status":"failure", "error_message":msg})
+    raise HTTPException(413, msg)
+
+
+async def _hash_upload(file: UploadFile, ctx: RequestContext) -> str:
+    """
+    SHA-256 of the upload, read one chunk at a time, with 413 once the
+    running size passes MAX_FILE_SIZE_MB. Rewinds the upload.
+
+    By now Starlette has already received and spooled the whole body; the
+    early cut-off for oversized requests is UploadSizeLimitMiddleware. This
+    enforces the per-file limit without holding the file in memory.
+    """
+    # Multipart parsing usually knows the size already: reject without reading
+    if file.size is not None and file.size > MAX_FILE_SIZE_BYTES:
+        _reject_too_large(ctx, file.size)
+
+    digest = hashlib.sha256()
+    size = 0
+    while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+        size += len(chunk)
+        if size > MAX_FILE_SIZE_BYTES:
+            _reject_too_large(ctx, size)
+        digest.update(chunk)
+    ctx.set_log(file_size_kb=size / 1024)
+    await file.seek(0)
+    return digest.hexdigest()
+
+
+async def _spool_upload(file: UploadFile) -> str:
+    """Stream the (size-checked) upload to a temp file one chunk at a time. Returns the path."""
     suffix = os.path.splitext(file.filename)[1]
     with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-        tmp.write(file_bytes)
-        tmp_path = tmp.name
+        try:
+            while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+                tmp.write(chunk)
+        except BaseException:
+            tmp.close()
+            os.remove(tmp.name)
+            raise
+    return tmp.name
+
+
+async def get_text_from_file(file: UploadFile, ctx: RequestContext, max_tokens: int = MAX_TOKENS) -> str:
+    # 1) Hash the upload (enforcing the size limit as the bytes arrive);
+    #    a document seen before is served from the extraction cache
+    sha256 = await _hash_upload(file, ctx)
+    cached = await asyncio.to_thread(extraction_cache.get, sha256)
+    ctx.set_log(extraction_cache_hit=cached is not None)
+    if cached is not None:
+        ctx.set_log(extractor=cached["extractor"], tokens_extracted=cached["tokens"])
+        if cached["tokens"] > max_tokens:
+            reject_too_long(ctx, max_tokens)
+        return cached["text"]
+
+    # 2) Stream the upload to a real temp file, so the extractors can operate on it
+    tmp_path = await _spool_upload(file)
 
     try:
-        # 3) Attempt Unstructured partition
+        # 3) Extract page by page (in a worker process, so the loop keeps
+        #    serving), stopping as soon as the token limit is exceeded
+        started = time.perf_counter()
         try:
-            loader = UnstructuredFileLoader(tmp_path)
-            docs   = loader.load()
-        except ValueError as e:
-            if "not a ZIP archive" in str(e):
-                # fall back to plain-text loader
-                text_loader = TextLoader(tmp_path, encoding="utf-8")
-                docs = text_loader.load()
-            else:
-                raise
-
-        # 4) Concatenate pages and enforce token limit
-        text = "\n\n".join(doc.page_content for doc in docs)
-        token_count = estimate_tokens(text)
-        ctx.set_log(tokens_extracted=token_count)
-        if token_count > MAX_TOKENS:
-            msg = f"Extracted text too long: {token_count} tokens"
-            log_event("file_parse_error", request_id=ctx.request_id, error_message=msg, **ctx.logs)
-            append_to_gsheets("generation", {**ctx.inputs, **ctx.logs, "status":"failure", "error_message":msg})
-            raise HTTPException(413, msg)
+            text, budget, extractor = await _run_extraction(tmp_path, max_tokens)
+        except TokenBudgetExceeded as e:
+            ctx.set_log(tokens_extracted=e.used, extraction_time_s=time.perf_counter() - started)
+            reject_too_long(ctx, max_tokens)
+
+        # 4) Token count was accumulated during extraction
+        ctx.set_log(
+            extractor=extractor,
+            tokens_extracted=budget.used,
+            extraction_pieces=budget.pieces,
+            extraction_time_s=time.perf_counter() - started,
+        )
+        await asyncio.to_thread(extraction_cache.set, sha256, text, budget.used, extractor)
         # print("\n\nSource Material.\n", text, "\n\n")
         return text
 
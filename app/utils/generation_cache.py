@@ -0,0 +1,172 @@
+# app/utils/generation_cache.py
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+GEN_CACHE_ENABLED     = os.getenv("GEN_CACHE_ENABLED", "true").lower() == "true"
+GEN_CACHE_MAX_ENTRIES = int(os.getenv("GEN_CACHE_MAX_ENTRIES", "256"))
+GEN_CACHE_TTL_S       = int(os.getenv("GEN_CACHE_TTL_S", str(24 * 3600)))
+GEN_CACHE_DB_PATH     = os.getenv("GEN_CACHE_DB_PATH", "")  # empty -> memory tier only
+
+# Inputs that change the generated quiz, on top of the rendered messages.
+CACHE_KEY_PARAMS = (
+    "quiz_type",
+    "num_questions",
+    "options_per_question",
+    "answer_required",
+    "explanation_required",
+    "file_intent",
+)
+
+
+def make_cache_key(messages: Iterable[Any], params: Dict[str, Any]) -> str:
+    """
+    Content address for a generation: SHA-256 over the rendered prompt
+    messages plus the generation parameters.
+    """
+    h = hashlib.sha256()
+    for msg in messages:
+        h.update(getattr(msg, "type", "").encode("utf-8"))
+        h.update(b"\x00")
+        h.update(str(getattr(msg, "content", msg)).encode("utf-8"))
+        h.update(b"\x00")
+    relevant = {k: params.get(k) for k in CACHE_KEY_PARAMS}
+    h.update(json.dumps(relevant, sort_keys=True, default=str).encode("utf-8"))
+    return h.hexdigest()
+
+
+class GenerationCache:
+    """
+    Two-tier cache for generated quizzes.
+
+    - Memory tier: bounded LRU (OrderedDict), checked first.
+    - Disk tier:   optional SQLite table that survives restarts; hits are
+                   promoted back into memory.
+    Entries expire after `ttl_s` seconds in both tiers.
+    """
+
+    def __init__(self, max_entries: int, ttl_s: int, db_path: str = "", enabled: bool = True):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.db_path = db_path
+        self._mem: "OrderedDict[str, tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    # ---- disk tier -------------------------------------------------------
+    def _get_db(self) -> Optional[sqlite3.Connection]:
+        if not self.db_path:
+            return None
+        if self._db is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS generation_cache ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.commit()
+        return self._db
+
+    def _disk_get(self, key: str, now: float) -> Optional[tuple[float, Dict[str, Any]]]:
+        db = self._get_db()
+        if db is None:
+            return None
+        row = db.execute(
+            "SELECT value, expires_at FROM generation_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        if row[1] <= now:
+            db.execute("DELETE FROM generation_cache WHERE key = ?", (key,))
+            db.commit()
+            self.expirations += 1
+            return None
+        return row[1], json.loads(row[0])
+
+    def _disk_set(self, key: str, value: Dict[str, Any], expires_at: float) -> None:
+        db = self._get_db()
+        if db is None:
+            return
+        db.execute(
+            "INSERT OR REPLACE INTO generation_cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value), expires_at),
+        )
+        db.commit()
+
+    # ---- public API ------------------------------------------------------
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._mem.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._mem.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._mem[key]
+                self.expirations += 1
+
+            entry = self._disk_get(key, now)
+            if entry is not None:
+                self._mem_put(key, entry)
+                self.hits += 1
+                self.disk_hits += 1
+                return entry[1]
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        if not self.enabled:
+            return
+        expires_at = time.time() + self.ttl_s
+        with self._lock:
+            self._mem_put(key, (expires_at, value))
+            self._disk_set(key, value, expires_at)
+
+    def _mem_put(self, key: str, entry: tuple[float, Dict[str, Any]]) -> None:
+        self._mem[key] = entry
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "memory_entries": len(self._mem),
+            "max_entries": self.max_entries,
+            "ttl_s": self.ttl_s,
+            "disk_tier": bool(self.db_path),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+generation_cache = GenerationCache(
+    max_entries=GEN_CACHE_MAX_ENTRIES,
+    ttl_s=GEN_CACHE_TTL_S,
+    db_path=GEN_CACHE_DB_PATH,
+    enabled=GEN_CACHE_ENABLED,
+)
@@ -1,14 +1,20 @@
 import os
-import gspread
-from google.oauth2.service_account import Credentials
+from functools import lru_cache
 from typing import Dict, Any
 
-# 1. Initialize client once
+# 1. Initialize client once (on first use)
 SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
-CREDS = Credentials.from_service_account_file(
-    os.environ["GOOGLE_APPLICATION_CREDENTIALS"], scopes=SCOPES
-)
-GS_CLIENT = gspread.authorize(CREDS)
+
+
+@lru_cache(maxsize=1)
+def _gs_client():
+    import gspread
+    from google.oauth2.service_account import Credentials
+
+    creds = Credentials.from_service_account_file(
+        os.environ["GOOGLE_APPLICATION_CREDENTIALS"], scopes=SCOPES
+    )
+    return gspread.authorize(creds)
 
 # 2. Open your spreadsheet (by name or ID)
 SPREADSHEET_ID = os.getenv("LOG_SPREADSHEET_ID")  # set this in env
@@ -20,7 +26,7 @@ def append_generation_log(row: Dict[str, Any]) -> int:
     Appends a new row to the GenerationLogs sheet.
     Returns the 1-based index of the new row in the sheet.
     """
-    sheet = GS_CLIENT.open_by_key(SPREADSHEET_ID).worksheet(SHEET_GEN)
+    sheet = _gs_client().open_by_key(SPREADSHEET_ID).worksheet(SHEET_GEN)
     # Ensure header exists only once; then append
     sheet.append_row(list(row.values()), value_input_option="USER_ENTERED")
     return sheet.row_count  # or use len(sheet.get_all_values())
@@ -30,7 +36,7 @@ def update_generation_log_feedback_row(request_id: str, feedback_row_id: int):
     Finds the row with given request_id in GenerationLogs
     and sets its 'feedback_row_id' column to the provided value.
     """
-    sheet = GS_CLIENT.open_by_key(SPREADSHEET_ID).worksheet(SHEET_GEN)
+    sheet = _gs_client().open_by_key(SPREADSHEET_ID).worksheet(SHEET_GEN)
     # Assuming 'request_id' is in column A and 'feedback_row_id' is in the last column
     col_request_id = sheet.row_values(1).index("request_id") + 1
     col_feedback   = sheet.row_values(1).index("feedback_row_id") + 1
@@ -0,0 +1,270 @@
+# app/utils/job_queue.py
+import os
+import json
+import time
+import uuid
+import asyncio
+import sqlite3
+import threading
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from app.utils.latency import percentile
+from app.utils.logger import log_event
+
+# Job lifecycle
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+UNFINISHED_STATUSES = (JOB_QUEUED, JOB_RUNNING)
+
+_JSON_COLUMNS = ("params", "files", "result", "error")
+
+
+class QueueFull(Exception):
+    """Raised when the job queue is at capacity."""
+
+
+class JobStore:
+    """
+    SQLite-backed job records, so queued and finished jobs survive restarts.
+    Params, files, result and error are stored as JSON text; `file_path` /
+    `file_name` hold the single `file` upload, `files` a list of
+    {"path", "name"} for multi-file uploads.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+    def _get_db(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.row_factory = sqlite3.Row
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY, request_id TEXT NOT NULL, status TEXT NOT NULL,"
+                " params TEXT NOT NULL, file_path TEXT, file_name TEXT, files TEXT,"
+                " result TEXT, error TEXT,"
+                " created_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+            )
+            # Databases created before multi-file jobs lack the `files` column
+            columns = {row["name"] for row in self._db.execute("PRAGMA table_info(jobs)")}
+            if "files" not in columns:
+                self._db.execute("ALTER TABLE jobs ADD COLUMN files TEXT")
+            self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status)")
+            self._db.commit()
+        return self._db
+
+    @staticmethod
+    def _row_to_job(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        for col in _JSON_COLUMNS:
+            if job.get(col) is not None:
+                job[col] = json.loads(job[col])
+        return job
+
+    def create(self, request_id: str, params: Dict[str, Any], file_path: Optional[str] = None,
+               file_name: Optional[str] = None, job_id: Optional[str] = None,
+               files: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
+        job_id = job_id or uuid.uuid4().hex
+        with self._lock:
+            db = self._get_db()
+            db.execute(
+                "INSERT INTO jobs (id, request_id, status, params, file_path, file_name, files, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, request_id, JOB_QUEUED, json.dumps(params, default=str), file_path, file_name,
+                 json.dumps(files) if files else None, time.time()),
+            )
+            db.commit()
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._get_db().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row is not None else None
+
+    def mark_running(self, job_id: str) -> None:
+        with self._lock:
+            db = self._get_db()
+            db.execute("UPDATE jobs SET status = ?, started_at = ? WHERE id = ?", (JOB_RUNNING, time.time(), job_id))
+            db.commit()
+
+    def mark_finished(self, job_id: str, result: Optional[Dict[str, Any]] = None, error: Optional[Dict[str, Any]] = None) -> None:
+        status = JOB_FAILED if error is not None else JOB_SUCCEEDED
+        with self._lock:
+            db = self._get_db()
+            db.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                (
+                    status,
+                    json.dumps(result, default=str) if result is not None else None,
+                    json.dumps(error, default=str) if error is not None else None,
+                    time.time(),
+                    job_id,
+                ),
+            )
+            db.commit()
+
+    def requeue_unfinished(self) -> List[Dict[str, Any]]:
+        """Jobs interrupted by a restart go back to `queued`, oldest first."""
+        with self._lock:
+            db = self._get_db()
+            db.execute(
+                "UPDATE jobs SET status = ?, started_at = NULL WHERE status = ?",
+                (JOB_QUEUED, JOB_RUNNING),
+            )
+            db.commit()
+            rows = db.execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY created_at", (JOB_QUEUED,)
+            ).fetchall()
+        return [self._row_to_job(r) for r in rows]
+
+    def purge_finished(self, older_than_s: float) -> List[Dict[str, Any]]:
+        """Delete finished jobs older than `older_than_s`; returns the deleted records."""
+        cutoff = time.time() - older_than_s
+        with self._lock:
+            db = self._get_db()
+            rows = db.execute(
+                "SELECT * FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                (JOB_SUCCEEDED, JOB_FAILED, cutoff),
+            ).fetchall()
+            db.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                (JOB_SUCCEEDED, JOB_FAILED, cutoff),
+            )
+            db.commit()
+        return [self._row_to_job(r) for r in rows]
+
+
+class JobQueue:
+    """
+    Bounded pool of asyncio workers draining an in-process queue of job ids.
+
+    `handler(job)` does the work and returns the JSON-able result; any
+    exception is turned into the job's error by `error_mapper`. The store
+    is the source of truth, so `start()` re-enqueues jobs a previous
+    process left unfinished. Store calls are blocking SQLite, so they run
+    in a thread.
+    """
+
+    def __init__(self, store: JobStore, handler: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+                 workers: int, max_depth: int,
+                 error_mapper: Callable[[BaseException], Dict[str, Any]] = lambda e: {"detail": str(e)}):
+        self.store = store
+        self.handler = handler
+        self.error_mapper = error_mapper
+        self.workers = max(1, workers)
+        self.max_depth = max_depth
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._enqueued_at: Dict[str, float] = {}
+        self._busy = 0
+        self._busy_s = 0.0
+        self._started_at: Optional[float] = None
+        self._waits: Deque[float] = deque(maxlen=200)
+        self.submitted = 0
+        self.succeeded = 0
+        self.failed = 0
+
+    async def start(self) -> int:
+        """Start the workers and re-enqueue unfinished jobs; returns how many were recovered."""
+        if self._tasks:
+            return 0
+        self._queue = asyncio.Queue()
+        self._started_at = time.perf_counter()
+        recovered = await asyncio.to_thread(self.store.requeue_unfinished)
+        for job in recovered:
+            self._put(job["id"])
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        return len(recovered)
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, job_id: str) -> None:
+        if self._queue is None:
+            raise RuntimeError("Job queue is not running")
+        if self.max_depth and self._queue.qsize() >= self.max_depth:
+            raise QueueFull(f"Job queue is full ({self.max_depth} jobs waiting)")
+        self.submitted += 1
+        self._put(job_id)
+
+    def _put(self, job_id: str) -> None:
+        self._enqueued_at[job_id] = time.perf_counter()
+        self._queue.put_nowait(job_id)
+
+    def position(self, job_id: str) -> Optional[int]:
+        """1-based position of a waiting job, or None if it is not waiting."""
+        if self._queue is None:
+            return None
+        for i, queued_id in enumerate(list(self._queue._queue)):
+            if queued_id == job_id:
+                return i + 1
+        return None
+
+    async def _worker(self, worker_id: int) -> None:
+        while True:
+            job_id = await self._queue.get()
+            wait = time.perf_counter() - self._enqueued_at.pop(job_id, time.perf_counter())
+            self._waits.append(wait)
+            started = time.perf_counter()
+            self._busy += 1
+            try:
+                await self._run(job_id, wait)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # E.g. the store failed: the job stays as recorded (a `running`
+                # job is re-run after a restart), the worker moves on
+                self.failed += 1
+                log_event("job_worker_error", request_id="Unknown", job_id=job_id, error=repr(e))
+            finally:
+                self._busy -= 1
+                self._busy_s += time.perf_counter() - started
+                self._queue.task_done()
+
+    async def _run(self, job_id: str, wait: float) -> None:
+        job = await asyncio.to_thread(self.store.get, job_id)
+        if job is None or job["status"] not in UNFINISHED_STATUSES:
+            return
+        await asyncio.to_thread(self.store.mark_running, job_id)
+        try:
+            result = await self.handler({**job, "queue_wait_s": wait})
+        except asyncio.CancelledError:
+            # Shutdown: leave the job `running` so the next start re-enqueues it
+            raise
+        except Exception as e:
+            await asyncio.to_thread(self.store.mark_finished, job_id, error=self.error_mapper(e))
+            self.failed += 1
+            return
+        await asyncio.to_thread(self.store.mark_finished, job_id, result=result)
+        self.succeeded += 1
+
+    def stats(self) -> Dict[str, Any]:
+        uptime = time.perf_counter() - self._started_at if self._started_at else 0.0
+        capacity = uptime * self.workers
+        waits = list(self._waits)
+        return {
+            "running": bool(self._tasks),
+            "workers": self.workers,
+            "busy_workers": self._busy,
+            "utilisation": round(self._busy_s / capacity, 4) if capacity else 0.0,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_depth": self.max_depth,
+            "wait_p50_s": _round(percentile(waits, 50)),
+            "wait_p95_s": _round(percentile(waits, 95)),
+            "submitted": self.submitted,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+        }
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 3) if value is not None else None
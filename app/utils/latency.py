@@ -0,0 +1,76 @@
+# app/utils/latency.py
+import math
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+SAMPLE_WINDOW = 200  # most recent latencies kept per model
+
+
+def percentile(samples, p: float) -> Optional[float]:
+    """Nearest-rank percentile of an iterable of numbers."""
+    ordered = sorted(samples)
+    if not ordered:
+        return None
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class LatencyTracker:
+    """Rolling per-model LLM latency and hedging counters."""
+
+    def __init__(self, window: int = SAMPLE_WINDOW):
+        self._window = window
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Deque[float]] = {}
+        self._attempts: Dict[str, int] = {}   # generation calls started, failed ones included
+        self._hedged: Dict[str, int] = {}      # primary calls that triggered a hedge
+        self._hedge_wins: Dict[str, int] = {}  # hedges on this model that won the race
+
+    def record_attempt(self, model: str) -> None:
+        with self._lock:
+            self._attempts[model] = self._attempts.get(model, 0) + 1
+
+    def record(self, model: str, seconds: float) -> None:
+        """Latency of a completed generation call."""
+        with self._lock:
+            self._samples.setdefault(model, deque(maxlen=self._window)).append(seconds)
+
+    def record_hedge(self, primary_model: str) -> None:
+        with self._lock:
+            self._hedged[primary_model] = self._hedged.get(primary_model, 0) + 1
+
+    def record_hedge_win(self, hedge_model: str) -> None:
+        with self._lock:
+            self._hedge_wins[hedge_model] = self._hedge_wins.get(hedge_model, 0) + 1
+
+    def percentile(self, model: str, p: float, min_samples: int = 1) -> Optional[float]:
+        with self._lock:
+            samples = list(self._samples.get(model, ()))
+        if len(samples) < min_samples:
+            return None
+        return percentile(samples, p)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            models = set(self._samples) | set(self._attempts) | set(self._hedged) | set(self._hedge_wins)
+            out = {}
+            for model in sorted(models):
+                samples = list(self._samples.get(model, ()))
+                attempts = self._attempts.get(model, 0)
+                hedged = self._hedged.get(model, 0)
+                out[model] = {
+                    "attempts": attempts,
+                    "samples": len(samples),
+                    "p50_s": _round(percentile(samples, 50)),
+                    "p95_s": _round(percentile(samples, 95)),
+                    "p99_s": _round(percentile(samples, 99)),
+                    "hedged": hedged,
+                    "hedge_rate": round(hedged / attempts, 4) if attempts else 0.0,
+                    "hedge_wins": self._hedge_wins.get(model, 0),
+                }
+            return out
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 3) if value is not None else None
@@ -0,0 +1,212 @@
+# app/utils/model_scheduler.py
+import time
+import threading
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Deque, Dict, Iterable, Optional, Set, Tuple
+
+# Cooldown applied when Groq rate-limits a model without saying for how long
+DEFAULT_COOLDOWN_S = 60.0
+WINDOW_S = 60.0
+
+
+@dataclass(frozen=True)
+class ModelLimits:
+    context_window: int
+    tokens_per_minute: int
+    tokens_per_day: Optional[int]  # None = unlimited
+    max_questions: int
+
+
+class ModelScheduler:
+    """
+    Quota-aware model picker.
+
+    Tracks, per model, the tokens spent in the last minute (sliding window)
+    and today (UTC), plus tokens reserved by calls still in flight. Before
+    each call `pick()` returns the model with the most headroom for the
+    estimated prompt + completion size; models that were rate-limited sit
+    out their cooldown, decommissioned ones are skipped for good.
+    """
+
+    def __init__(self, limits: Dict[str, ModelLimits], preference: Iterable[str], clock: Callable[[], float] = time.time):
+        self.limits = limits
+        self.preference = list(preference)  # tie-break order
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._minute: Dict[str, Deque[Tuple[float, int]]] = {m: deque() for m in self.preference}
+        self._day_tokens: Dict[str, int] = {m: 0 for m in self.preference}
+        self._day_key = self._today()
+        self._reserved: Dict[str, int] = {m: 0 for m in self.preference}
+        self._cooldown_until: Dict[str, float] = {}
+        self._disabled: Set[str] = set()
+        self._calls: Dict[str, int] = {m: 0 for m in self.preference}
+        self._rate_limited: Dict[str, int] = {m: 0 for m in self.preference}
+
+    def _today(self, now: Optional[float] = None) -> str:
+        now = self._clock() if now is None else now
+        return datetime.fromtimestamp(now, timezone.utc).strftime("%Y-%m-%d")
+
+    def _roll(self, now: float) -> None:
+        today = self._today(now)
+        if today != self._day_key:
+            self._day_key = today
+            self._day_tokens = {m: 0 for m in self.preference}
+        for window in self._minute.values():
+            while window and now - window[0][0] >= WINDOW_S:
+                window.popleft()
+
+    def _headroom(self, model: str) -> Tuple[int, Optional[int]]:
+        lim = self.limits[model]
+        used_minute = sum(t for _, t in self._minute[model]) + self._reserved[model]
+        tpm_left = lim.tokens_per_minute - used_minute
+        if lim.tokens_per_day is None:
+            return tpm_left, None
+        return tpm_left, lim.tokens_per_day - self._day_tokens[model] - self._reserved[model]
+
+    def _available(self, model: str, now: float) -> bool:
+        return model not in self._disabled and self._cooldown_until.get(model, 0.0) <= now
+
+    def _room_fraction(self, model: str, tpm_left: int, tpd_left: Optional[int]) -> float:
+        # Headroom relative to the model's own limits, so a model with a huge
+        # quota isn't preferred just because its raw numbers are bigger
+        lim = self.limits[model]
+        room = tpm_left / lim.tokens_per_minute
+        if tpd_left is not None:
+            room = min(room, tpd_left / lim.tokens_per_day)
+        return room
+
+    def pick(self, estimated_tokens: int, exclude: Iterable[str] = (), num_questions: Optional[int] = None) -> Optional[str]:
+        """
+        Best model for a call of `estimated_tokens` (prompt + completion), or
+        None when every model is cooling down, disabled or out of quota.
+
+        Models are ranked by the fraction of their minute/day quota still
+        free; the preference order breaks ties, so an idle scheduler starts
+        at the top of the list. Models whose context window cannot hold the
+        call, or whose `max_questions` is below `num_questions`, are only
+        used when nothing else is left (context window first).
+        """
+        excluded = set(exclude)
+        with self._lock:
+            now = self._clock()
+            self._roll(now)
+            fits, too_many, too_small = [], [], []
+            for rank, model in enumerate(self.preference):
+                if model in excluded or not self._available(model, now):
+                    continue
+                tpm_left, tpd_left = self._headroom(model)
+                if tpm_left < estimated_tokens or (tpd_left is not None and tpd_left < estimated_tokens):
+                    continue
+                lim = self.limits[model]
+                if lim.context_window < estimated_tokens:
+                    too_small.append((lim.context_window, -rank, model))
+                elif num_questions and lim.max_questions < num_questions:
+                    too_many.append((lim.max_questions, -rank, model))
+                else:
+                    fits.append((self._room_fraction(model, tpm_left, tpd_left), -rank, model))
+            for tier in (fits, too_many, too_small):
+                if tier:
+                    return max(tier)[2]
+            return None
+
+    def has_headroom(self, model: str, estimated_tokens: int) -> bool:
+        with self._lock:
+            now = self._clock()
+            self._roll(now)
+            if model not in self.limits or not self._available(model, now):
+                return False
+            tpm_left, tpd_left = self._headroom(model)
+            return tpm_left >= estimated_tokens and (tpd_left is None or tpd_left >= estimated_tokens)
+
+    def reserve(self, model: str, tokens: int) -> None:
+        """Hold `tokens` of headroom for an in-flight call."""
+        with self._lock:
+            self._reserved[model] = self._reserved.get(model, 0) + tokens
+            self._calls[model] = self._calls.get(model, 0) + 1
+
+    def release(self, model: str, reserved: int, used_tokens: Optional[int] = None) -> None:
+        """Drop a reservation and, if the call went through, book the actual usage."""
+        with self._lock:
+            now = self._clock()
+            self._roll(now)
+            self._reserved[model] = max(0, self._reserved.get(model, 0) - reserved)
+            if used_tokens:
+                self._minute.setdefault(model, deque()).append((now, used_tokens))
+                self._day_tokens[model] = self._day_tokens.get(model, 0) + used_tokens
+
+    def mark_rate_limited(self, model: str, retry_after_s: Optional[float] = None) -> None:
+        with self._lock:
+            self._cooldown_until[model] = self._clock() + (retry_after_s or DEFAULT_COOLDOWN_S)
+            self._rate_limited[model] = self._rate_limited.get(model, 0) + 1
+
+    def mark_unavailable(self, model: str) -> None:
+        """Decommissioned / unknown model: never pick it again in this process."""
+        with self._lock:
+            self._disabled.add(model)
+
+    def context_window(self, model: str) -> int:
+        return self.limits[model].context_window
+
+    def _wait_for(self, model: str, tokens: int, now: float) -> Optional[float]:
+        """Seconds until `model` could take a call of `tokens`; None if it never can."""
+        lim = self.limits[model]
+        if tokens > lim.tokens_per_minute or (lim.tokens_per_day is not None and tokens > lim.tokens_per_day):
+            return None
+        wait = max(0.0, self._cooldown_until.get(model, 0.0) - now)
+        tpm_left, tpd_left = self._headroom(model)
+        if tpm_left < tokens:
+            # Usage leaves the window oldest first; if that is not enough,
+            # in-flight reservations must finish and age out too
+            minute_wait = WINDOW_S
+            for at, used in self._minute[model]:
+                tpm_left += used
+                if tpm_left >= tokens:
+                    minute_wait = at + WINDOW_S - now
+                    break
+            wait = max(wait, minute_wait)
+        if tpd_left is not None and tpd_left < tokens:
+            wait = max(wait, 86400.0 - now % 86400.0)  # next UTC midnight
+        return wait
+
+    def seconds_until_available(self, estimated_tokens: int = 1) -> Optional[int]:
+        """
+        Seconds until some model could take a call of `estimated_tokens`:
+        its cooldown is over, enough minute usage has aged out and, if its
+        day budget is spent, the UTC day has rolled over. None if no model
+        ever can.
+        """
+        with self._lock:
+            now = self._clock()
+            self._roll(now)
+            waits = [
+                w for w in (self._wait_for(m, estimated_tokens, now) for m in self.preference if m not in self._disabled)
+                if w is not None
+            ]
+            return int(min(waits)) + 1 if waits else None
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            now = self._clock()
+            self._roll(now)
+            models: Dict[str, Any] = {}
+            for model in self.preference:
+                lim = self.limits[model]
+                tpm_left, tpd_left = self._headroom(model)
+                cooldown = self._cooldown_until.get(model, 0.0) - now
+                models[model] = {
+                    "context_window": lim.context_window,
+                    "tokens_per_minute": lim.tokens_per_minute,
+                    "tokens_per_day": lim.tokens_per_day,
+                    "minute_tokens_used": sum(t for _, t in self._minute[model]),
+                    "day_tokens_used": self._day_tokens[model],
+                    "reserved_tokens": self._reserved[model],
+                    "tpm_headroom": tpm_left,
+                    "tpd_headroom": tpd_left,
+                    "cooldown_remaining_s": round(cooldown, 1) if cooldown > 0 else 0,
+                    "disabled": model in self._disabled,
+                    "calls": self._calls[model],
+                    "rate_limited": self._rate_limited[model],
+                }
+            return {"day": self._day_key, "models": models}
@@ -0,0 +1,169 @@
+# app/utils/process_pool.py
+import sys
+import time
+import asyncio
+import weakref
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+
+
+class PoolBusy(Exception):
+    """Too many jobs are already waiting for a worker."""
+
+
+class PoolTimeout(Exception):
+    """A job ran past its timeout; its worker was killed."""
+
+
+class BoundedProcessPool:
+    """
+    ProcessPoolExecutor for CPU-bound work, with:
+
+    - admission control: at most `max_concurrent` jobs run at once and at
+      most `max_waiting` more wait for a slot (PoolBusy beyond that);
+    - a per-job timeout, after which the stuck worker is killed
+      (PoolTimeout). ProcessPoolExecutor cannot lose a single worker, so
+      this tears down the whole executor; jobs that were running alongside
+      the stuck one are resubmitted once to a fresh executor, with a fresh
+      timeout, instead of failing because of someone else's document;
+    - worker recycling after `max_tasks_per_child` jobs to cap memory growth.
+
+    Exceptions listed in `expected_errors` (e.g. input rejections such as
+    TokenBudgetExceeded) are re-raised without counting as failures.
+
+    The executor is created on first use, with the spawn start method so
+    workers do not inherit the server's threads and sockets.
+    """
+
+    def __init__(self, max_workers: int, max_tasks_per_child: int, timeout_s: float,
+                 max_concurrent: Optional[int] = None, max_waiting: int = 0,
+                 expected_errors: Tuple[Type[BaseException], ...] = ()):
+        self.max_workers = max(1, max_workers)
+        self.max_tasks_per_child = max_tasks_per_child
+        self.timeout_s = timeout_s
+        self.max_concurrent = max_concurrent or self.max_workers
+        self.max_waiting = max_waiting
+        self.expected_errors = expected_errors
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Executors torn down because one of their jobs timed out
+        self._timed_out: "weakref.WeakSet[ProcessPoolExecutor]" = weakref.WeakSet()
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._tasks_on_executor = 0
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.expected = 0
+        self.timeouts = 0
+        self.resubmitted = 0
+        self.rejected = 0
+        self.recycles = 0
+        self._busy_s = 0.0
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        kwargs: Dict[str, Any] = {"mp_context": multiprocessing.get_context("spawn")}
+        if self.max_tasks_per_child and sys.version_info >= (3, 11):
+            kwargs["max_tasks_per_child"] = self.max_tasks_per_child
+        self._tasks_on_executor = 0
+        return ProcessPoolExecutor(max_workers=self.max_workers, **kwargs)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = self._new_executor()
+        elif (self.max_tasks_per_child and sys.version_info < (3, 11)
+              and self._tasks_on_executor >= self.max_tasks_per_child * self.max_workers):
+            # No per-child limit before 3.11: swap in a fresh pool instead;
+            # the old one finishes its running jobs and exits
+            self._executor.shutdown(wait=False)
+            self._executor = self._new_executor()
+            self.recycles += 1
+        return self._executor
+
+    def _kill(self, executor: ProcessPoolExecutor) -> None:
+        """Tear `executor` down without waiting for its (possibly stuck) workers."""
+        if self._executor is not executor:
+            return  # already replaced after another job's failure
+        self._executor = None
+        for process in list((getattr(executor, "_processes", None) or {}).values()):
+            process.terminate()
+        # Jobs still pending fail with BrokenProcessPool (and are resubmitted
+        # after a timeout); cancelling them would look like task cancellation
+        executor.shutdown(wait=False)
+        self.recycles += 1
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run `fn(*args)` in a worker process; `fn` and its arguments must be picklable."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+        if self._slots.locked() and self.max_waiting and self.waiting >= self.max_waiting:
+            self.rejected += 1
+            raise PoolBusy(f"{self.waiting} jobs already waiting for a worker")
+
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.running += 1
+        started = time.perf_counter()
+        try:
+            for attempt in range(2):
+                executor = self._get_executor()
+                future = asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+                self._tasks_on_executor += 1
+                try:
+                    result = await asyncio.wait_for(future, timeout=self.timeout_s)
+                except asyncio.TimeoutError:
+                    self.timeouts += 1
+                    self._timed_out.add(executor)
+                    self._kill(executor)
+                    raise PoolTimeout(f"Job exceeded {self.timeout_s:.0f}s")
+                except BrokenProcessPool:
+                    if attempt == 0 and executor in self._timed_out:
+                        # Collateral of another job's timeout: run it again
+                        self.resubmitted += 1
+                        continue
+                    # A worker died (e.g. OOM-killed); start over with a fresh pool
+                    self.failed += 1
+                    self._kill(executor)
+                    raise
+                self.completed += 1
+                return result
+        except (PoolTimeout, BrokenProcessPool):
+            raise
+        except self.expected_errors:
+            self.expected += 1
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.running -= 1
+            self._busy_s += time.perf_counter() - started
+            self._slots.release()
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.max_workers,
+            "max_concurrent": self.max_concurrent,
+            "max_waiting": self.max_waiting,
+            "max_tasks_per_child": self.max_tasks_per_child,
+            "timeout_s": self.timeout_s,
+            "running": self.running,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "failed": self.failed,
+            "expected_errors": self.expected,
+            "timeouts": self.timeouts,
+            "resubmitted": self.resubmitted,
+            "rejected": self.rejected,
+            "recycles": self.recycles,
+            "busy_s": round(self._busy_s, 3),
+        }
@@ -3,21 +3,33 @@ import ast
 import re
 import json
 import time
+import math
+import asyncio
+import weakref
 import threading
-from typing import Any, Dict, Tuple
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
 from fastapi import HTTPException
 from groq import GroqError
-from langchain_groq import ChatGroq
-from langchain_core.prompts import ChatPromptTemplate
 from pydantic import ValidationError
 from app.models.schema import QuizGenerationResponse
-from app.utils.prompt import get_system_prompt, get_dynamic_prompt
+from app.utils.prompt import get_system_prompt, get_dynamic_prompt, system_prompt_tokens, DYNAMIC_PROMPT_FIELDS
 import os
 from dotenv import load_dotenv
 from langchain_core.exceptions import OutputParserException
 
 from app.utils.logger     import log_event, append_to_gsheets
 from app.utils.request_context import RequestContext
+from app.utils.generation_cache import generation_cache, make_cache_key
+from app.utils.stream_parser import QuizStreamParser, normalize_sata_item
+from app.utils.model_scheduler import ModelLimits, ModelScheduler
+from app.utils.tokenizer import count_tokens
+from app.utils.quiz_repair import QUIZ_ADAPTER, ItemFailure, validate_item, validate_items, build_repair_prompts, extract_repaired_items
+from app.utils.latency import LatencyTracker
+
+if TYPE_CHECKING:  # langchain_groq is imported on first use; it is slow to import
+    from langchain_groq import ChatGroq
 
 
 load_dotenv()
@@ -106,24 +118,65 @@ SUPPORTED_GROQ_MODELS = [
 
 
 
-# Thread-safe globals for model rotation
+# Limits from the table above, used by the quota-aware scheduler
+MODEL_LIMITS: Dict[str, ModelLimits] = {
+    "meta-llama/llama-4-maverick-17b-128e-instruct": ModelLimits(16_384, 15_000, 500_000, 35),
+    "meta-llama/llama-4-scout-17b-16e-instruct":     ModelLimits(16_384, 30_000, 500_000, 35),
+    "qwen/qwen3-32b":                                ModelLimits(32_768,  6_000, 500_000, 30),
+    "llama3-8b-8192":                                ModelLimits( 8_192,  6_000, 500_000, 25),
+    "llama3-70b-8192":                               ModelLimits( 8_192,  6_000, 500_000, 25),
+    "llama-3.1-8b-instant":                          ModelLimits( 4_096,  6_000, 500_000, 20),
+    "meta-llama/llama-guard-4-12b":                  ModelLimits( 4_096, 15_000, 500_000, 20),
+    "gemma2-9b-it":                                  ModelLimits( 4_096, 15_000, 500_000, 15),
+    "deepseek-r1-distill-llama-70b":                 ModelLimits( 4_096,  6_000, 100_000, 15),
+    "compound-beta":                                 ModelLimits( 4_096, 70_000, None,    25),
+    "compound-beta-mini":                            ModelLimits( 4_096, 70_000, None,    25),
+}
+
+# Picks the model with the most quota headroom before every call
+scheduler = ModelScheduler(MODEL_LIMITS, SUPPORTED_GROQ_MODELS)
+
+# Completion size estimate (the system prompt asks for ~1.5x num_questions)
+COMPLETION_TOKENS_PER_QUESTION = 150
+DEFAULT_QUESTION_ESTIMATE = 10
+
+# Thread-safe pool of one client per model
 _groq_lock = threading.Lock()
-_current_llm: ChatGroq | None = None
-_current_model: str = SUPPORTED_GROQ_MODELS[8]
+_llm_pool: Dict[str, "ChatGroq"] = {}
 
 # Schema retry count
 MAX_RETRIES = int(os.getenv("MAX_RETRIES", "1"))
 
-# API key
+# API key (checked when the first client is created, so the app can start without it)
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 if not GROQ_API_KEY:
-    raise RuntimeError("Please set GROQ_API_KEY in your environment")
-
-# Build prompt template
-prompt_template = ChatPromptTemplate.from_messages([
-    ("system", "{system_prompt}"),
-    ("human",  "{user_prompt}"),
-])
+    print("Warning: GROQ_API_KEY is not set; quiz generation will fail until it is")
+
+# Targeted repair rounds for invalid items before falling back to a full regeneration
+MAX_REPAIR_ROUNDS = int(os.getenv("MAX_REPAIR_ROUNDS", "1"))
+REPAIR_TOKENS_PER_ITEM = 250
+
+# Hedged requests: if the primary model hasn't answered by its HEDGE_PERCENTILE
+# latency, send the same prompt to the next model with headroom and keep the
+# first schema-valid answer
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "false").lower() in ("1", "true", "yes")
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+HEDGE_DEFAULT_DELAY_S = float(os.getenv("HEDGE_DEFAULT_DELAY_S", "15"))  # until enough samples exist
+HEDGE_MIN_DELAY_S = float(os.getenv("HEDGE_MIN_DELAY_S", "1"))
+
+# Observed per-model latency (p50/p95/p99) and hedge counters
+latency_tracker = LatencyTracker()
+
+# Build prompt template (on first use)
+@lru_cache(maxsize=1)
+def _prompt_template():
+    from langchain_core.prompts import ChatPromptTemplate
+
+    return ChatPromptTemplate.from_messages([
+        ("system", "{system_prompt}"),
+        ("human",  "{user_prompt}"),
+    ])
 
 # Utility: strip markdown fences
 def _strip_md_fences(text: str) -> str:
@@ -156,17 +209,6 @@ def _normalize_sata_answers(payload: dict) -> dict:
     return payload
 
 
-# Rotate to next model
-def _rotate_model_if_needed(err: Dict[str, Any]) -> None:
-    global _current_llm, _current_model
-    with _groq_lock:
-        SUPPORTED_GROQ_MODELS.append(SUPPORTED_GROQ_MODELS.pop(0))
-        _current_model = SUPPORTED_GROQ_MODELS[0]
-        _current_llm = None  # force re-init on next call
-
-
-
-
 def clean_groq_error(raw_msg: str) -> dict:
     """
     Extracts a structured error object from a Groq error string,
@@ -183,12 +225,13 @@ def clean_groq_error(raw_msg: str) -> dict:
         data = ast.literal_eval(raw_json)
         error_obj = data.get("error", data)
 
-        # Try to extract retry time in seconds from the message
-        m = re.search(r"Please try again in (\d+)m([\d.]+)s", error_obj.get("message", ""))
+        # Try to extract retry time in seconds from the message ("1h2m3.4s", "2m3.4s", "7.5s")
+        m = re.search(r"Please try again in (?:(\d+)h)?(?:(\d+)m)?([\d.]+)s", error_obj.get("message", ""))
         if m:
-            minutes = int(m.group(1))
-            seconds = float(m.group(2))
-            retry_after_sec = int(minutes * 60 + seconds)
+            hours = int(m.group(1) or 0)
+            minutes = int(m.group(2) or 0)
+            seconds = float(m.group(3))
+            retry_after_sec = int(hours * 3600 + minutes * 60 + seconds)
             error_obj["retry_after_sec"] = retry_after_sec
 
         return error_obj
@@ -198,152 +241,199 @@ def clean_groq_error(raw_msg: str) -> dict:
 
 
 
-# Get or initialize current LLM
-def _get_llm() -> Tuple[ChatGroq, str]:
-    global _current_llm, _current_model
-    with _groq_lock:
-        if _current_llm is None:
-            _current_llm = ChatGroq(
-                api_key=GROQ_API_KEY,
-                model=_current_model,
-                temperature=0.0,
-                max_tokens=None,
-                model_kwargs={"top_p": 0.95},
-            )
-        return _current_llm, _current_model
+def _new_llm(model: str) -> "ChatGroq":
+    if not GROQ_API_KEY:
+        raise HTTPException(503, "Quiz generation is unavailable: GROQ_API_KEY is not configured")
+    from langchain_groq import ChatGroq
 
-# Main generate function
-def generate_quiz(input_data: Dict[str, Any], ctx: RequestContext) -> QuizGenerationResponse:
-    # build prompts
-    ctx.set_input(**input_data)
-    system_prompt = get_system_prompt(
-        num_questions=input_data.get("num_questions"),
-        num_choices=input_data.get("options_per_question"),
-        quiz_type=input_data.get("quiz_type"),
-        file_intent=input_data.get("file_intent"),
-        answer_required=input_data.get("answer_required"),
-        explanation_required=input_data.get("explanation_required"),
+    return ChatGroq(
+        api_key=GROQ_API_KEY,
+        model=model,
+        temperature=0.0,
+        max_tokens=None,
+        model_kwargs={"top_p": 0.95},
     )
-    user_prompt = get_dynamic_prompt(input_data)
-    rendered = prompt_template.invoke({
+
+# Get or initialize the client for `model`
+def _get_llm(model: str) -> Tuple["ChatGroq", str]:
+    with _groq_lock:
+        llm = _llm_pool.get(model)
+        if llm is None:
+            llm = _llm_pool[model] = _new_llm(model)
+        return llm, model
+
+
+def estimate_call_tokens(messages: list, num_questions: Optional[int], ctx: Optional[RequestContext] = None) -> int:
+    """Prompt tokens plus expected completion tokens for one generation call."""
+    if ctx is not None and "user_prompt_tokens" in ctx.logs:
+        prompt_tokens = ctx.logs["system_prompt_tokens"] + ctx.logs["user_prompt_tokens"]
+    else:
+        prompt_tokens = sum(count_tokens(str(m.content)) for m in messages)
+    completion = math.ceil(1.5 * (num_questions or DEFAULT_QUESTION_ESTIMATE)) * COMPLETION_TOKENS_PER_QUESTION
+    return prompt_tokens + completion
+
+
+def _choose_model(estimate: int, tried: set, preferred_model: Optional[str] = None, num_questions: Optional[int] = None) -> Optional[str]:
+    if preferred_model and preferred_model not in tried and scheduler.has_headroom(preferred_model, estimate):
+        return preferred_model
+    return scheduler.pick(estimate, exclude=tried, num_questions=num_questions)
+
+
+def _used_tokens(meta: Dict[str, Any], estimate: int) -> int:
+    usage = meta.get("token_usage") or {}
+    return usage.get("total_tokens") or estimate
+
+# Build the [system, human] message pair for a generation request
+def _build_messages(input_data: Dict[str, Any], ctx: Optional[RequestContext] = None) -> list:
+    # Static, memoized prefix; everything request-specific goes in the user message
+    system_prompt = get_system_prompt(input_data.get("file_intent"))
+    user_prompt = get_dynamic_prompt(**{k: input_data.get(k) for k in DYNAMIC_PROMPT_FIELDS if k in input_data})
+    rendered = _prompt_template().invoke({
         "system_prompt": system_prompt,
         "user_prompt":   user_prompt,
     })
+    if ctx is not None:
+        ctx.set_log(
+            system_prompt_tokens=system_prompt_tokens(input_data.get("file_intent")),
+            user_prompt_tokens=count_tokens(user_prompt),
+        )
+    return rendered.messages
+
+
+async def _get_cached_response(cache_key: str, ctx: RequestContext) -> QuizGenerationResponse | None:
+    # The disk tier is SQLite; keep its reads off the event loop
+    cached = await asyncio.to_thread(generation_cache.get, cache_key)
+    if cached is None:
+        ctx.set_log(cache_hit=False)
+        return None
+    resp = QuizGenerationResponse(**{**cached, "cached": True})
+    ctx.set_log(
+        cache_hit=True,
+        model_used=resp.model_used,
+        questions_generated=resp.question_count,
+        status="success",
+    )
+    entry = {**ctx.inputs, **ctx.logs}
+    log_event("generation_cache_hit", request_id=ctx.request_id, **entry)
+    append_to_gsheets("generation", {"request_id":ctx.request_id, **entry})
+    return resp
 
-    last_error = {}
-    rotation_count = 0
-    ai_msg = None
-    used_model = None
 
-    # Outer loop: regeneration attempts
-    for regen_attempt in range(MAX_RETRIES + 1):
-        # Inner loop: model cycling
-        for _ in range(len(SUPPORTED_GROQ_MODELS)):
-            llm, used_model = _get_llm()
-            try:
-                start = time.perf_counter()
-                ai_msg = llm.invoke(rendered.messages)
-                elapsed = time.perf_counter() - start
-                # groq_meta = getattr(ai_msg, "response_metadata", {}) or ai_msg.token_usage or {}
-                print(f"[Attempt {regen_attempt}] Model {used_model} responded in {elapsed:.2f}s")
-                meta = getattr(ai_msg, "response_metadata", {}) or ai_msg.token_usage or {}
-                ctx.set_log(
-                    model_used=used_model,
-                    inference_time_s=elapsed,
-                    rotation_count=rotation_count,
-                    regen_attempts=regen_attempt
-                )
-                break  
-            except GroqError as e:
-                raw = e.args[0]
-                err_obj = clean_groq_error(str(raw))
-                code    = err_obj.get("code")
-                msg     = err_obj.get("message", "").lower()
-                rotation_count += 1
-                ctx.set_log(rotation_reason=err_obj.get("message","")) 
-                # Rotate if rate limit exceeded
-                if code == "rate_limit_exceeded" or "Rate limit reached" in raw:
-                    last_error = err_obj or {}
-                    _rotate_model_if_needed(err_obj)
-                    continue
+def _handle_groq_error(e: GroqError, used_model: str, ctx: RequestContext) -> Dict[str, Any]:
+    """
+    Tell the scheduler about rate-limited or retired models and return the
+    cleaned error; anything else is a client-facing 400.
+    """
+    raw = str(e.args[0]) if e.args else str(e)
+    err_obj = clean_groq_error(raw)
+    code    = err_obj.get("code")
+    ctx.set_log(rotation_reason=err_obj.get("message",""))
+
+    # Rate limited: bench the model until Groq says it can be retried
+    if code == "rate_limit_exceeded" or "Rate limit reached" in raw:
+        scheduler.mark_rate_limited(used_model, err_obj.get("retry_after_sec"))
+        return err_obj or {}
+
+    # Skip permanently decommissioned models
+    if code in ["model_decommissioned", "model_not_found"]:
+        print(f"Skipping decommissioned or non-existent model: {used_model}")
+        scheduler.mark_unavailable(used_model)
+        return err_obj or {}
 
-                # Skip permanently decommissioned models
-                if code in ["model_decommissioned", "model_not_found"]:
-                    print(f"Skipping decommissioned or non-existent model: {used_model}")
-                    last_error = err_obj or {}
-                    _rotate_model_if_needed(err_obj)
-                    continue
+    raise HTTPException(
+        status_code=400,
+        detail={
+            "error":err_obj
+        },
+    )
 
-                raise HTTPException(
-                    status_code=400,
-                    detail={
-                        "error":err_obj
-                    },
-                )
-            except OutputParserException as e:
-                raise HTTPException(502, f"Groq output parse error: {e}")
-            except Exception as e:
-                raise HTTPException(502, f"Unexpected Groq failure: {e}")
-        else:
-            # All models exhausted for this regen attempt
-            raise HTTPException(
-                status_code=503,
-                detail={
-                    "message": "All models have exhausted their daily quotas",
-                    "last_model": SUPPORTED_GROQ_MODELS[-1],
-                    "retry_after": last_error.get("reset_after_sec"),
-                },
-            )
-
-        # cleanup and parse JSON
-        content = ai_msg.content or ""
-        cleaned = _strip_think_tags(content)
-        cleaned = _strip_md_fences(cleaned)
-        try:
-            payload = json.loads(cleaned)
-            payload = _normalize_sata_answers(payload)
-        except json.JSONDecodeError:
-            repaired = _repair_json(cleaned)
-            try:
-                payload = json.loads(repaired)
-                payload = _normalize_sata_answers(payload)
-            except json.JSONDecodeError as e2:
-                print(f"[Attempt {regen_attempt}] JSON parse failed after repair.")
-                continue  # try regenerating again
-
-        # validate schema
-        try:
-            resp = QuizGenerationResponse(
-                model_used=used_model,
-                inference_time=elapsed,
-                question_count=len(payload.get("quizzes", [])),
-                attempt_number=regen_attempt+1,
-                token_usage=meta.get("token_usage"),
-                quizzes=payload["quizzes"]
-            )
-            ctx.set_log(
-                validation_passed=True,
-                questions_generated=resp.question_count,
-                status="success",
-                completion_tokens = resp.token_usage.get("completion_tokens"),
-                prompt_tokens = resp.token_usage.get("prompt_tokens"),
-                total_tokens = resp.token_usage.get("total_tokens"),
-                completion_time = resp.token_usage.get("completion_time"),
-                prompt_time = resp.token_usage.get("prompt_time"),
-                queue_time = resp.token_usage.get("queue_time"),
-                total_time = resp.token_usage.get("total_time")
-            )
-            entry = {**ctx.inputs, **ctx.logs}
-            log_event("generation_success", request_id=ctx.request_id, **entry)
-            append_to_gsheets("generation", {"request_id":ctx.request_id, **entry})
-            return resp
-        except ValidationError as ve:
-            print(f"[Attempt {regen_attempt}] Validation failed: {ve}")
+
+def _raise_models_exhausted(last_error: Dict[str, Any], estimate: int) -> None:
+    raise HTTPException(
+        status_code=503,
+        detail={
+            "message": "All models have exhausted their quotas",
+            "last_error": last_error.get("message"),
+            "retry_after": scheduler.seconds_until_available(estimate) or last_error.get("retry_after_sec"),
+        },
+    )
+
+
+# Main generate function
+async def generate_quiz(input_data: Dict[str, Any], ctx: RequestContext, preferred_model: Optional[str] = None) -> QuizGenerationResponse:
+    """
+    Generate (or convert) a quiz without blocking the event loop.
+
+    The LLM call goes through `ChatGroq.ainvoke`, so cancelling the awaiting
+    task (e.g. when the client disconnects) aborts the in-flight request.
+    The model is chosen by the quota-aware scheduler; `preferred_model` is
+    used instead when it still has headroom.
+    """
+    # build prompts
+    ctx.set_input(**input_data)
+    messages = _build_messages(input_data, ctx)
+
+    # Serve identical requests (same prompt + parameters) from the cache
+    cache_key = make_cache_key(messages, input_data)
+    resp = await _get_cached_response(cache_key, ctx)
+    if resp is not None:
+        return resp
+
+    cleaned = ""
+    estimate = estimate_call_tokens(messages, input_data.get("num_questions"), ctx)
+    ctx.set_log(estimated_tokens=estimate)
+
+    # Outer loop: regeneration attempts
+    for regen_attempt in range(MAX_RETRIES + 1):
+        attempt = await _hedged_attempt(messages, estimate, ctx, preferred_model, input_data.get("num_questions"))
+        used_model, elapsed, meta, cleaned = attempt.model, attempt.elapsed, attempt.meta, attempt.cleaned
+        print(f"[Attempt {regen_attempt}] Model {used_model} responded in {elapsed:.2f}s")
+        ctx.set_log(
+            model_used=used_model,
+            inference_time_s=elapsed,
+            regen_attempts=regen_attempt
+        )
+
+        if attempt.validated is None:
+            print(f"[Attempt {regen_attempt}] JSON parse failed after repair.")
+            continue  # try regenerating again
+
+        # validate item by item; only the failing items go back to the model
+        quizzes = await _validate_and_repair(attempt.payload["quizzes"], input_data, ctx, preferred_model, attempt.validated)
+        if quizzes is None:
+            print(f"[Attempt {regen_attempt}] Validation failed after targeted repair.")
             ctx.set_log(validation_passed=False)
             continue  # regenerate on next outer loop
 
+        token_usage = meta.get("token_usage") or {}
+        resp = QuizGenerationResponse(
+            model_used=used_model,
+            inference_time=elapsed,
+            question_count=len(quizzes),
+            attempt_number=regen_attempt+1,
+            token_usage=meta.get("token_usage"),
+            quizzes=quizzes
+        )
+        ctx.set_log(
+            validation_passed=True,
+            questions_generated=resp.question_count,
+            status="success",
+            completion_tokens = token_usage.get("completion_tokens"),
+            prompt_tokens = token_usage.get("prompt_tokens"),
+            total_tokens = token_usage.get("total_tokens"),
+            completion_time = token_usage.get("completion_time"),
+            prompt_time = token_usage.get("prompt_time"),
+            queue_time = token_usage.get("queue_time"),
+            total_time = token_usage.get("total_time")
+        )
+        entry = {**ctx.inputs, **ctx.logs}
+        log_event("generation_success", request_id=ctx.request_id, **entry)
+        append_to_gsheets("generation", {"request_id":ctx.request_id, **entry})
+        await asyncio.to_thread(generation_cache.set, cache_key, resp.model_dump())
+        return resp
+
     # If we get here, all retries failed
-    ctx.set_log(status="failure", error_message=last_error.get("message","unknown"))
+    ctx.set_log(status="failure", error_message=ctx.logs.get("rotation_reason", "unknown"))
     entry = {**ctx.inputs, **ctx.logs}
     log_event("generation_failure", request_id=ctx.request_id, **entry)
     append_to_gsheets("generation", {"request_id":ctx.request_id, **entry})
@@ -355,3 +445,399 @@ def generate_quiz(input_data: Dict[str, Any], ctx: RequestContext) -> QuizGenera
             "raw_payload": cleaned,
         },
     )
+
+
+async def _invoke(messages: list, estimate: int, ctx: RequestContext, preferred_model: Optional[str] = None, exclude: Iterable[str] = (),
+                  track_latency: bool = False, num_questions: Optional[int] = None):
+    """
+    One LLM call on the best available model for `num_questions`.
+    Rate-limited / retired models are reported to the scheduler and the next
+    best model is tried; models in `exclude` are never used. With `track_latency` (full generations
+    only; short repair calls would skew the hedging percentile) the call is
+    counted in latency_tracker.
+    Returns (ai_msg, model, elapsed_s, response_metadata).
+    """
+    last_error = {}
+    tried: set = set(exclude)
+    while True:
+        model = _choose_model(estimate, tried, preferred_model, num_questions)
+        if model is None:
+            # Every model is cooling down or out of quota
+            _raise_models_exhausted(last_error, estimate)
+        tried.add(model)
+        llm, used_model = _get_llm(model)
+        if track_latency:
+            latency_tracker.record_attempt(used_model)
+        scheduler.reserve(model, estimate)
+        used_tokens = None
+        try:
+            start = time.perf_counter()
+            ai_msg = await llm.ainvoke(messages)
+            elapsed = time.perf_counter() - start
+            if track_latency:
+                latency_tracker.record(used_model, elapsed)
+            meta = getattr(ai_msg, "response_metadata", {}) or ai_msg.token_usage or {}
+            used_tokens = _used_tokens(meta, estimate)
+            return ai_msg, used_model, elapsed, meta
+        except GroqError as e:
+            ctx.set_log(rotation_count=ctx.logs.get("rotation_count", 0) + 1)
+            last_error = _handle_groq_error(e, model, ctx)
+        except OutputParserException as e:
+            raise HTTPException(502, f"Groq output parse error: {e}")
+        except Exception as e:
+            raise HTTPException(502, f"Unexpected Groq failure: {e}")
+        finally:
+            scheduler.release(model, estimate, used_tokens)
+
+
+@dataclass
+class _Attempt:
+    model: str
+    elapsed: float
+    meta: Dict[str, Any]
+    cleaned: str
+    payload: Any
+    # (valid, failures) from validate_items, None when the payload has no quizzes array
+    validated: Optional[Tuple[Dict[int, Any], List[ItemFailure]]]
+
+    @property
+    def schema_valid(self) -> bool:
+        return self.validated is not None and bool(self.validated[0]) and not self.validated[1]
+
+
+async def _attempt(messages: list, estimate: int, ctx: RequestContext, preferred_model: Optional[str] = None, exclude: Iterable[str] = (),
+                   num_questions: Optional[int] = None) -> _Attempt:
+    """One generation call, parsed and validated (no repair)."""
+    ai_msg, used_model, elapsed, meta = await _invoke(messages, estimate, ctx, preferred_model, exclude, track_latency=True,
+                                                      num_questions=num_questions)
+    cleaned = _clean_content(ai_msg.content or "")
+    payload = _parse_payload(cleaned)
+    validated = None
+    if isinstance(payload, dict) and isinstance(payload.get("quizzes"), list):
+        validated = validate_items(payload["quizzes"])
+    return _Attempt(used_model, elapsed, meta, cleaned, payload, validated)
+
+
+def _hedge_delay(model: str) -> float:
+    observed = latency_tracker.percentile(model, HEDGE_PERCENTILE, min_samples=HEDGE_MIN_SAMPLES)
+    if observed is None:
+        return HEDGE_DEFAULT_DELAY_S
+    return max(HEDGE_MIN_DELAY_S, observed)
+
+
+async def _hedged_attempt(messages: list, estimate: int, ctx: RequestContext, preferred_model: Optional[str] = None,
+                          num_questions: Optional[int] = None) -> _Attempt:
+    """
+    Run `_attempt` on the primary model; if it is still running after the
+    model's HEDGE_PERCENTILE latency, race a duplicate on the next model
+    with headroom. The first schema-valid answer wins and the other call
+    is cancelled and awaited, so its quota reservation is released before
+    this returns. If neither answer is fully valid, the first one to arrive
+    is returned so the usual repair path can handle it.
+    """
+    primary_model = _choose_model(estimate, set(), preferred_model, num_questions) if HEDGE_ENABLED else None
+    if primary_model is None:
+        return await _attempt(messages, estimate, ctx, preferred_model, num_questions=num_questions)
+
+    delay = _hedge_delay(primary_model)
+    primary = asyncio.ensure_future(_attempt(messages, estimate, ctx, primary_model, num_questions=num_questions))
+    hedge = None
+    try:
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return primary.result()
+
+        hedge_model = _choose_model(estimate, {primary_model}, num_questions=num_questions)
+        if hedge_model is None:
+            return await primary
+        latency_tracker.record_hedge(primary_model)
+        ctx.set_log(hedged=True, hedge_model=hedge_model, hedge_delay_s=round(delay, 3))
+        print(f"Primary model {primary_model} slower than {delay:.2f}s; hedging on {hedge_model}")
+        hedge = asyncio.ensure_future(_attempt(messages, estimate, ctx, hedge_model, exclude={primary_model}, num_questions=num_questions))
+
+        pending = {primary, hedge}
+        fallback: Optional[_Attempt] = None
+        first_error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    first_error = first_error or task.exception()
+                    continue
+                result = task.result()
+                if result.schema_valid:
+                    ctx.set_log(hedge_won=task is hedge)
+                    if task is hedge:
+                        latency_tracker.record_hedge_win(result.model)
+                    return result
+                fallback = fallback or result
+        if fallback is not None:
+            ctx.set_log(hedge_won=fallback.model != primary_model)
+            return fallback
+        raise first_error
+    finally:
+        losers = [task for task in (primary, hedge) if task is not None and not task.done()]
+        for task in losers:
+            task.cancel()
+        # Wait for the cancelled calls so their reservations are released before we return
+        await asyncio.gather(*losers, return_exceptions=True)
+
+
+def _clean_content(content: str) -> str:
+    return _strip_md_fences(_strip_think_tags(content))
+
+
+def _parse_payload(cleaned: str) -> Any:
+    """json.loads with one light repair pass; None if still unparseable."""
+    try:
+        payload = json.loads(cleaned)
+    except json.JSONDecodeError:
+        try:
+            payload = json.loads(_repair_json(cleaned))
+        except json.JSONDecodeError:
+            return None
+    if isinstance(payload, dict):
+        payload = _normalize_sata_answers(payload)
+    return payload
+
+
+async def _validate_and_repair(items: list, input_data: Dict[str, Any], ctx: RequestContext, preferred_model: Optional[str] = None,
+                               validated: Optional[Tuple[Dict[int, Any], List[ItemFailure]]] = None) -> Optional[list]:
+    """
+    Keep every valid item; send only the invalid ones (with their errors)
+    back to the model in a small repair prompt and merge the fixes back in
+    place. Returns the final list, or None when a full regeneration is
+    needed (nothing valid, too few questions left after dropping items
+    that could not be repaired, or any unrepaired item when converting an
+    existing quiz, where every question must be kept).
+    """
+    valid, failures = validated if validated is not None else validate_items(items)
+    ctx.set_log(items_returned=len(items), items_invalid=len(failures))
+    if failures:
+        print(f"{len(failures)}/{len(items)} items failed validation; repairing only those")
+
+    repair_round = 0
+    while failures and valid and repair_round < MAX_REPAIR_ROUNDS:
+        repair_round += 1
+        system_prompt, user_prompt = build_repair_prompts(failures, input_data)
+        messages = _prompt_template().invoke({
+            "system_prompt": system_prompt,
+            "user_prompt":   user_prompt,
+        }).messages
+        estimate = count_tokens(system_prompt) + count_tokens(user_prompt) + len(failures) * REPAIR_TOKENS_PER_ITEM
+        ai_msg, used_model, elapsed, meta = await _invoke(messages, estimate, ctx, preferred_model)
+        ctx.set_log(
+            repair_rounds=repair_round,
+            repair_time_s=ctx.logs.get("repair_time_s", 0) + elapsed,
+            repair_tokens=ctx.logs.get("repair_tokens", 0) + _used_tokens(meta, estimate),
+        )
+
+        repaired = dict(extract_repaired_items(_parse_payload(_clean_content(ai_msg.content or ""))))
+        still_failing = []
+        for i, item, error in failures:
+            quiz, new_error = validate_item(repaired[i]) if i in repaired else (None, error)
+            if quiz is not None:
+                valid[i] = quiz
+            else:
+                still_failing.append((i, repaired.get(i, item), new_error))
+        failures = still_failing
+
+    if failures:
+        if input_data.get("file_intent") == "existing_quiz":
+            # Dropping items would silently lose questions of the original quiz
+            ctx.set_log(items_unrepaired=len(failures))
+            return None
+        # The prompt asks for extra questions, so unrepairable items can be dropped
+        wanted = input_data.get("num_questions") or 1
+        if len(valid) < wanted:
+            return None
+        ctx.set_log(items_dropped=len(failures))
+
+    ctx.set_log(items_repaired=len(valid) - (len(items) - ctx.logs["items_invalid"]))
+    return [valid[i] for i in sorted(valid)]
+
+
+# ---------------------------------------------------------------------------
+# Streaming generation
+# ---------------------------------------------------------------------------
+
+def _usage_from_metadata(usage: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Map LangChain `usage_metadata` onto the Groq-style token_usage keys."""
+    if not usage:
+        return None
+    return {
+        "prompt_tokens": usage.get("input_tokens"),
+        "completion_tokens": usage.get("output_tokens"),
+        "total_tokens": usage.get("total_tokens"),
+    }
+
+
+async def _chain_chunks(first_chunk, stream):
+    try:
+        if first_chunk is not None:
+            yield first_chunk
+        async for chunk in stream:
+            yield chunk
+    finally:
+        # Ends the Groq stream now rather than whenever it is garbage collected
+        await stream.aclose()
+
+
+class _StreamReservation:
+    """Scheduler quota held by a streamed call; released exactly once."""
+
+    def __init__(self, model: str, estimate: int):
+        self.model = model
+        self.estimate = estimate
+        self._released = False
+        scheduler.reserve(model, estimate)
+
+    def release(self, used_tokens: Optional[int] = None) -> None:
+        if not self._released:
+            self._released = True
+            scheduler.release(self.model, self.estimate, used_tokens)
+
+
+async def open_quiz_stream(input_data: Dict[str, Any], ctx: RequestContext) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Start a streamed generation and return an async iterator of events:
+
+      {"event": "quiz",    "index": i, "quiz": {...}}     validated item
+      {"event": "invalid", "index": i, "error": "..."}   item that failed validation
+      {"event": "done",    ...response metadata...}
+      {"event": "error",   "message": "..."}             stream ended without a complete payload
+
+    Model selection/rotation happens here, before the first token, so quota
+    and auth errors still surface as regular HTTP errors.
+    """
+    ctx.set_input(**input_data)
+    messages = _build_messages(input_data, ctx)
+    cache_key = make_cache_key(messages, input_data)
+
+    resp = await _get_cached_response(cache_key, ctx)
+    if resp is not None:
+        return _replay_cached(resp)
+
+    last_error = {}
+    rotation_count = 0
+    estimate = estimate_call_tokens(messages, input_data.get("num_questions"), ctx)
+    tried: set = set()
+    while True:
+        model = _choose_model(estimate, tried, num_questions=input_data.get("num_questions"))
+        if model is None:
+            _raise_models_exhausted(last_error, estimate)
+        tried.add(model)
+        llm, used_model = _get_llm(model)
+        # Reserve before opening the stream (as _invoke does), so concurrent
+        # streams see each other's quota instead of piling onto one model
+        reservation = _StreamReservation(model, estimate)
+        start = time.perf_counter()
+        stream = llm.astream(messages)
+        try:
+            first_chunk = await stream.__anext__()
+        except StopAsyncIteration:
+            first_chunk = None
+        except GroqError as e:
+            reservation.release()
+            rotation_count += 1
+            await stream.aclose()
+            last_error = _handle_groq_error(e, model, ctx)
+            continue
+        except BaseException as e:
+            reservation.release()
+            await stream.aclose()
+            if isinstance(e, Exception):
+                raise HTTPException(502, f"Unexpected Groq failure: {e}")
+            raise
+        break
+
+    ctx.set_log(
+        model_used=used_model,
+        rotation_count=rotation_count,
+        time_to_first_token_s=time.perf_counter() - start,
+    )
+    events = _stream_events(_chain_chunks(first_chunk, stream), used_model, start, cache_key, ctx, reservation, estimate)
+    # A response that never starts iterating (client gone first) still frees the quota
+    weakref.finalize(events, reservation.release)
+    return events
+
+
+async def _replay_cached(resp: QuizGenerationResponse) -> AsyncIterator[Dict[str, Any]]:
+    for i, quiz in enumerate(resp.quizzes):
+        yield {"event": "quiz", "index": i, "quiz": quiz.model_dump()}
+    yield {"event": "done", **resp.model_dump(exclude={"quizzes"})}
+
+
+async def _stream_events(chunks, used_model: str, start: float, cache_key: str, ctx: RequestContext,
+                         reservation: _StreamReservation, estimate: int) -> AsyncIterator[Dict[str, Any]]:
+    parser = QuizStreamParser()
+    quizzes = []
+    invalid_count = 0
+    usage = None
+    first_quiz_at = None
+    index = 0
+
+    # The reservation is held until the stream finishes, then replaced by the actual usage
+    stream_error = None
+    try:
+        async for chunk in chunks:
+            usage = getattr(chunk, "usage_metadata", None) or usage
+            for kind, obj in parser.feed(chunk.content or ""):
+                if kind == "item":
+                    try:
+                        quiz = QUIZ_ADAPTER.validate_python(normalize_sata_item(obj))
+                        quizzes.append(quiz)
+                        if first_quiz_at is None:
+                            first_quiz_at = time.perf_counter() - start
+                        yield {"event": "quiz", "index": index, "quiz": quiz.model_dump()}
+                    except ValidationError as ve:
+                        invalid_count += 1
+                        yield {"event": "invalid", "index": index, "error": str(ve)}
+                else:
+                    invalid_count += 1
+                    yield {"event": "invalid", "index": index, "error": "Item is not valid JSON"}
+                index += 1
+    except Exception as e:
+        # Headers are already sent, so mid-stream failures become an error event
+        stream_error = f"Unexpected Groq failure: {e}"
+    finally:
+        # Also runs when the consumer stops early (client disconnect): close
+        # the upstream explicitly instead of leaving it to garbage collection
+        await chunks.aclose()
+        token_usage = _usage_from_metadata(usage)
+        reservation.release((token_usage or {}).get("total_tokens") or estimate)
+
+    elapsed = time.perf_counter() - start
+    ctx.set_log(
+        inference_time_s=elapsed,
+        time_to_first_quiz_s=first_quiz_at,
+        questions_generated=len(quizzes),
+        invalid_items=invalid_count,
+    )
+
+    if stream_error or not parser.done or not quizzes:
+        message = stream_error or "Model output ended without a complete quizzes array"
+        ctx.set_log(status="failure", error_message=message)
+        entry = {**ctx.inputs, **ctx.logs}
+        log_event("generation_failure", request_id=ctx.request_id, **entry)
+        append_to_gsheets("generation", {"request_id":ctx.request_id, **entry})
+        yield {"event": "error", "message": message}
+        return
+
+    resp = QuizGenerationResponse(
+        model_used=used_model,
+        inference_time=elapsed,
+        question_count=len(quizzes),
+        attempt_number=1,
+        token_usage=token_usage,
+        quizzes=quizzes,
+    )
+    ctx.set_log(status="success", validation_passed=invalid_count == 0)
+    entry = {**ctx.inputs, **ctx.logs}
+    log_event("generation_success", request_id=ctx.request_id, **entry)
+    append_to_gsheets("generation", {"request_id":ctx.request_id, **entry})
+    # Only fully valid generations are worth replaying to other users
+    if invalid_count == 0:
+        await asyncio.to_thread(generation_cache.set, cache_key, resp.model_dump())
+
+    yield {"event": "done", **resp.model_dump(exclude={"quizzes"}), "invalid_count": invalid_count}
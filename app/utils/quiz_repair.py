@@ -0,0 +1,85 @@
+# app/utils/quiz_repair.py
+import json
+from typing import Any, Dict, List, Optional, Tuple
+from pydantic import TypeAdapter, ValidationError
+
+from app.models.schema import Quiz
+from app.utils.prompt import render_compact_schema
+from app.utils.stream_parser import normalize_sata_item
+
+# Validator for a single quiz item
+QUIZ_ADAPTER = TypeAdapter(Quiz)
+
+# Shape of a failed item: (position in the quizzes array, raw item, error text)
+ItemFailure = Tuple[int, Any, str]
+
+
+def _format_errors(ve: ValidationError) -> str:
+    """Short, model-readable summary of a union validation error."""
+    lines = []
+    for err in ve.errors()[:6]:
+        loc = ".".join(str(p) for p in err.get("loc", ()))
+        lines.append(f"{loc}: {err.get('msg')}" if loc else err.get("msg", ""))
+    return "; ".join(lines)
+
+
+def validate_item(item: Any) -> Tuple[Optional[Any], Optional[str]]:
+    """Returns (quiz, None) when the item is valid, else (None, error)."""
+    if not isinstance(item, dict):
+        return None, f"Item must be a JSON object, got {type(item).__name__}"
+    try:
+        return QUIZ_ADAPTER.validate_python(normalize_sata_item(item)), None
+    except ValidationError as ve:
+        return None, _format_errors(ve)
+
+
+def validate_items(items: List[Any]) -> Tuple[Dict[int, Any], List[ItemFailure]]:
+    """Validate every item on its own, so one bad question doesn't sink the rest."""
+    valid: Dict[int, Any] = {}
+    failures: List[ItemFailure] = []
+    for i, item in enumerate(items):
+        quiz, error = validate_item(item)
+        if quiz is not None:
+            valid[i] = quiz
+        else:
+            failures.append((i, item, error))
+    return valid, failures
+
+
+def build_repair_prompts(failures: List[ItemFailure], input_data: Dict[str, Any]) -> Tuple[str, str]:
+    """System and user prompt asking the model to fix only the failing items."""
+    system_prompt = f"""
+You repair quiz items that failed schema validation. Output ONLY a JSON object (no markdown or commentary):
+{{"items": [{{"index": int, "item": Item}}, ...]}}
+with one entry per input item, keeping its index. Item must match:
+{render_compact_schema()}
+
+Fix exactly what each error describes and keep the question's intent, type and wording otherwise.
+mcq/sata answers must appear verbatim in `choices`; a sata `answer` is always an array.
+""".strip()
+
+    params = {
+        "options_per_question": input_data.get("options_per_question"),
+        "answer_required": input_data.get("answer_required"),
+        "explanation_required": input_data.get("explanation_required"),
+    }
+    broken = [{"index": i, "item": item, "errors": error} for i, item, error in failures]
+    user_prompt = (
+        "PARAMETERS: " + json.dumps(params) + "\n"
+        "ITEMS TO REPAIR:\n" + json.dumps(broken, ensure_ascii=False)
+    )
+    return system_prompt, user_prompt
+
+
+def extract_repaired_items(payload: Any) -> List[Tuple[int, Any]]:
+    """Pull (index, item) pairs out of the repair response; malformed entries are skipped."""
+    entries = payload.get("items", []) if isinstance(payload, dict) else payload
+    repaired = []
+    for entry in entries if isinstance(entries, list) else []:
+        if not isinstance(entry, dict) or "item" not in entry:
+            continue
+        index = entry.get("index")
+        # JSON true/false would otherwise pass as 1/0
+        if isinstance(index, int) and not isinstance(index, bool):
+            repaired.append((index, entry["item"]))
+    return repaired
@@ -0,0 +1,125 @@
+# app/utils/quiz_store.py
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+QUIZ_STORE_ENABLED = os.getenv("QUIZ_STORE_ENABLED", "true").lower() == "true"
+QUIZ_DB_PATH       = os.getenv("QUIZ_DB_PATH", "data/quizzes.sqlite3")
+QUIZ_TTL_DAYS      = float(os.getenv("QUIZ_TTL_DAYS", "30"))
+
+
+class QuizStore:
+    """
+    Generated quizzes, stored under a quiz id together with the evaluation
+    rubric of each essay/FITB item (see services.evaluate.build_rubric), so
+    /evaluate can take `quiz_id` + `question_index` instead of the whole
+    question. Quizzes older than `ttl_s` are purged on startup.
+    """
+
+    def __init__(self, db_path: str, ttl_s: float, enabled: bool = True):
+        self.enabled = enabled and bool(db_path)
+        self.db_path = db_path
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self.saved = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _get_db(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS quizzes ("
+                " id TEXT PRIMARY KEY, request_id TEXT, created_at REAL NOT NULL,"
+                " quizzes TEXT NOT NULL, rubrics TEXT NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS quizzes_created ON quizzes (created_at)")
+            self._db.commit()
+        return self._db
+
+    def save(self, request_id: str, quizzes: List[Dict[str, Any]], rubrics: Dict[int, Dict[str, Any]]) -> Optional[str]:
+        """Store a generated quiz; `rubrics` maps item index -> rubric. Returns the quiz id."""
+        if not self.enabled:
+            return None
+        quiz_id = uuid.uuid4().hex
+        with self._lock:
+            db = self._get_db()
+            db.execute(
+                "INSERT INTO quizzes (id, request_id, created_at, quizzes, rubrics) VALUES (?, ?, ?, ?, ?)",
+                (quiz_id, request_id, time.time(), json.dumps(quizzes, ensure_ascii=False),
+                 json.dumps({str(i): r for i, r in rubrics.items()}, ensure_ascii=False)),
+            )
+            db.commit()
+            self.saved += 1
+        return quiz_id
+
+    def get(self, quiz_id: str) -> Optional[Dict[str, Any]]:
+        """{"id", "request_id", "created_at", "quizzes", "rubrics"} or None; rubrics are keyed by int index."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            row = self._get_db().execute(
+                "SELECT id, request_id, created_at, quizzes, rubrics FROM quizzes WHERE id = ?", (quiz_id,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return {
+            "id": row[0],
+            "request_id": row[1],
+            "created_at": row[2],
+            "quizzes": json.loads(row[3]),
+            "rubrics": {int(i): r for i, r in json.loads(row[4]).items()},
+        }
+
+    def explanation_tokens(self) -> List[List[str]]:
+        """Tokenized explanations of every stored rubric (the similarity engine's IDF corpus)."""
+        if not self.enabled:
+            return []
+        with self._lock:
+            rows = self._get_db().execute("SELECT rubrics FROM quizzes").fetchall()
+        return [
+            rubric["explanation_tokens"]
+            for (rubrics,) in rows
+            for rubric in json.loads(rubrics).values()
+            if rubric.get("explanation_tokens")
+        ]
+
+    def purge_expired(self) -> int:
+        if not self.enabled or self.ttl_s <= 0:
+            return 0
+        with self._lock:
+            db = self._get_db()
+            cur = db.execute("DELETE FROM quizzes WHERE created_at < ?", (time.time() - self.ttl_s,))
+            db.commit()
+        return cur.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        stored = 0
+        if self.enabled:
+            with self._lock:
+                stored = self._get_db().execute("SELECT COUNT(*) FROM quizzes").fetchone()[0]
+        return {
+            "enabled": self.enabled,
+            "stored": stored,
+            "saved": self.saved,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+quiz_store = QuizStore(
+    db_path=QUIZ_DB_PATH,
+    ttl_s=QUIZ_TTL_DAYS * 24 * 3600,
+    enabled=QUIZ_STORE_ENABLED,
+)
@@ -0,0 +1,94 @@
+# app/utils/relevance.py
+import os
+import re
+import math
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Sequence, Tuple
+from dotenv import load_dotenv
+
+from app.utils.chunking import split_into_chunks
+from app.utils.tokenizer import count_tokens
+
+load_dotenv()
+
+# Passage size used for ranking; smaller passages select more precisely
+RELEVANCE_PASSAGE_TOKENS = int(os.getenv("RELEVANCE_PASSAGE_TOKENS", "300"))
+# With the filter on, extraction reads up to this much before ranking
+RELEVANCE_MAX_TOKENS     = int(os.getenv("RELEVANCE_MAX_TOKENS", "100000"))
+
+# Okapi BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_TERM_RE = re.compile(r"[a-z0-9]+")
+# Words that say nothing about what the teacher wants covered
+_STOPWORDS = frozenset("""
+a an and are as at be by for from has have how in into is it its of on or that the their this to was were
+what when where which who why will with about quiz quizzes question questions generate create make please
+focus mainly only include students student based material notes lecture chapter
+""".split())
+
+
+@dataclass
+class RelevanceStats:
+    passages_total: int
+    passages_kept: int
+    query_terms: int
+    tokens_kept: int
+
+    def as_log(self) -> Dict[str, int]:
+        return {f"relevance_{k}": v for k, v in self.__dict__.items()}
+
+
+def terms(text: str) -> List[str]:
+    return [t for t in _TERM_RE.findall(text.lower()) if len(t) > 1 and t not in _STOPWORDS]
+
+
+def bm25_scores(passages: Sequence[List[str]], query: Sequence[str]) -> List[float]:
+    """Okapi BM25 score of every (tokenized) passage for the query terms."""
+    n = len(passages)
+    if not n or not query:
+        return [0.0] * n
+    avg_len = sum(len(p) for p in passages) / n or 1.0
+    df = Counter(t for p in passages for t in set(p))
+    idf = {t: math.log(1 + (n - df[t] + 0.5) / (df[t] + 0.5)) for t in set(query)}
+
+    scores = []
+    for p in passages:
+        tf = Counter(p)
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * len(p) / avg_len)
+        scores.append(sum(idf[t] * tf[t] * (BM25_K1 + 1) / (tf[t] + norm) for t in idf if tf[t]))
+    return scores
+
+
+def select_relevant(text: str, query: str, max_tokens: int) -> Tuple[str, RelevanceStats]:
+    """
+    Keep the passages of `text` that best match `query` (topic + instructions)
+    and fit in `max_tokens`:
+
+    1) split into ~RELEVANCE_PASSAGE_TOKENS passages on paragraph boundaries;
+    2) rank them with BM25 (no query terms: every passage scores 0 and the
+       document order wins, i.e. the beginning of the material is kept);
+    3) pack greedily from the top, skipping passages that no longer fit;
+    4) return the chosen passages in their original order.
+    """
+    passages = split_into_chunks(text, RELEVANCE_PASSAGE_TOKENS)
+    query_terms = terms(query)
+    scores = bm25_scores([terms(p) for p in passages], query_terms)
+    ranked = sorted(range(len(passages)), key=lambda i: (-scores[i], i))
+
+    kept, used = [], 0
+    for i in ranked:
+        n = count_tokens(passages[i])
+        if used + n <= max_tokens:
+            kept.append(i)
+            used += n
+
+    selected = "\n\n".join(passages[i] for i in sorted(kept))
+    return selected, RelevanceStats(
+        passages_total=len(passages),
+        passages_kept=len(kept),
+        query_terms=len(set(query_terms)),
+        tokens_kept=used,
+    )
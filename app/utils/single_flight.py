@@ -0,0 +1,69 @@
+# app/utils/single_flight.py
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Generic, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class _Call(Generic[T]):
+    task: "asyncio.Task[T]"
+    owner: Optional[str]
+    waiters: int = 0
+
+
+class SingleFlight:
+    """
+    Request coalescing: concurrent callers with the same key share one
+    in-flight execution and all receive its result (or its exception).
+
+    The shared work runs in its own task; a caller that goes away (client
+    disconnect) only stops waiting. The work is cancelled once nobody is
+    waiting for it any more.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, _Call] = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.max_waiters = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]], owner: Optional[str] = None) -> Tuple[T, bool, Optional[str]]:
+        """
+        Run `fn()` unless an identical call is already in flight.
+        Returns (result, shared, owner_of_the_call).
+        """
+        call = self._inflight.get(key)
+        shared = call is not None
+        if call is None:
+            call = _Call(task=asyncio.ensure_future(fn()), owner=owner)
+            self._inflight[key] = call
+            self.leaders += 1
+            call.task.add_done_callback(lambda _t, k=key, c=call: self._forget(k, c))
+        else:
+            self.coalesced += 1
+
+        call.waiters += 1
+        self.max_waiters = max(self.max_waiters, call.waiters)
+        try:
+            result = await asyncio.shield(call.task)
+            return result, shared, call.owner
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                call.task.cancel()
+
+    def _forget(self, key: str, call: _Call) -> None:
+        if self._inflight.get(key) is call:
+            del self._inflight[key]
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.leaders + self.coalesced
+        return {
+            "in_flight": len(self._inflight),
+            "executions": self.leaders,
+            "coalesced": self.coalesced,
+            "coalesced_ratio": round(self.coalesced / total, 4) if total else 0.0,
+            "max_waiters": self.max_waiters,
+        }
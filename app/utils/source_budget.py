@@ -0,0 +1,41 @@
+# app/utils/source_budget.py
+from typing import List, Sequence, Tuple
+
+from app.utils.tokenizer import count_tokens, truncate_to_tokens
+
+SOURCE_SEPARATOR = "\n\n"
+
+
+def fair_shares(sizes: Sequence[int], budget: int) -> List[int]:
+    """
+    Split `budget` tokens between documents of the given sizes by water-filling:
+    documents smaller than an equal share keep everything, and whatever they
+    leave over is split equally between the larger ones.
+    """
+    shares = [0] * len(sizes)
+    remaining = max(0, budget)
+    order = sorted(range(len(sizes)), key=lambda i: sizes[i])
+    for left, i in zip(range(len(sizes), 0, -1), order):
+        shares[i] = min(sizes[i], remaining // left)
+        remaining -= shares[i]
+    return shares
+
+
+def combine_sources(docs: Sequence[Tuple[str, str]], max_tokens: int) -> Tuple[str, List[int]]:
+    """
+    Join (filename, text) documents under a "### filename" heading each,
+    truncating the largest ones so the result fits in `max_tokens`.
+    Returns the combined text and the tokens kept from each document.
+    """
+    headings = [f"### {name}" for name, _ in docs]
+    overhead = count_tokens(SOURCE_SEPARATOR.join(h + SOURCE_SEPARATOR for h in headings))
+    sizes = [count_tokens(text) for _, text in docs]
+    shares = fair_shares(sizes, max_tokens - overhead)
+
+    parts = []
+    for heading, (_, text), size, share in zip(headings, docs, sizes, shares):
+        if share < size:
+            text = truncate_to_tokens(text, share)
+        if text:
+            parts.append(heading + SOURCE_SEPARATOR + text)
+    return SOURCE_SEPARATOR.join(parts), shares
@@ -0,0 +1,113 @@
+# app/utils/stream_parser.py
+import re
+import json
+from typing import Any, Dict, List, Tuple
+
+_QUIZZES_ARRAY_RE = re.compile(r'"quizzes"\s*:\s*\[')
+_THINK_BLOCK_RE   = re.compile(r"<think>[\s\S]*?</think>")
+
+
+class QuizStreamParser:
+    """
+    Incremental parser for a streamed `{"quizzes": [ {...}, {...} ]}` payload.
+
+    Feed it raw token text as it arrives; every time an object inside the
+    `quizzes` array is closed, it is returned from `feed()` straight away,
+    without waiting for the rest of the document.
+
+    - Reasoning blocks (`<think>...</think>`) and markdown fences before the
+      array are skipped.
+    - Braces inside JSON strings (and escaped quotes) are handled.
+    - Items that are not valid JSON are reported as errors, not raised.
+    """
+
+    def __init__(self):
+        self._prefix = ""        # text seen before the quizzes array opened
+        self._in_array = False
+        self.done = False        # closing `]` of the quizzes array seen
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._item: List[str] = []
+        self.items_seen = 0
+
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        """
+        Consume a chunk. Returns a list of ("item", dict) for every completed
+        quiz object and ("error", raw_text) for objects that failed to parse.
+        """
+        if self.done or not text:
+            return []
+
+        if not self._in_array:
+            self._prefix += text
+            visible = _THINK_BLOCK_RE.sub("", self._prefix)
+            if "<think>" in visible:
+                return []  # still inside an unterminated reasoning block
+            m = _QUIZZES_ARRAY_RE.search(visible)
+            if not m:
+                return []
+            self._in_array = True
+            text = visible[m.end():]
+            self._prefix = ""
+
+        return self._scan(text)
+
+    def _scan(self, text: str) -> List[Tuple[str, Any]]:
+        out: List[Tuple[str, Any]] = []
+        item = self._item
+        for c in text:
+            if self._in_string:
+                if self._depth > 0:
+                    item.append(c)
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                continue
+
+            if c == '"':
+                if self._depth > 0:
+                    item.append(c)
+                self._in_string = True
+                continue
+
+            if c in "{[":
+                self._depth += 1
+                item.append(c)
+            elif c in "}]":
+                if self._depth == 0:
+                    # closing bracket of the quizzes array itself
+                    if c == "]":
+                        self.done = True
+                        break
+                    continue
+                self._depth -= 1
+                item.append(c)
+                if self._depth == 0:
+                    out.append(self._finish_item("".join(item)))
+                    item.clear()
+            elif self._depth > 0:
+                item.append(c)
+            # separators/whitespace between items are dropped
+
+        return out
+
+    def _finish_item(self, raw: str) -> Tuple[str, Any]:
+        self.items_seen += 1
+        try:
+            obj = json.loads(raw)
+        except json.JSONDecodeError:
+            return ("error", raw)
+        if not isinstance(obj, dict):
+            return ("error", raw)
+        return ("item", obj)
+
+
+def normalize_sata_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Single-item version of quiz_engine._normalize_sata_answers."""
+    if item.get("type") == "sata" and isinstance(item.get("answer"), str):
+        item["answer"] = [item["answer"]]
+    return item
@@ -0,0 +1,74 @@
+# app/utils/tokenizer.py
+from functools import lru_cache
+from typing import TYPE_CHECKING, List
+
+if TYPE_CHECKING:
+    import tiktoken
+
+DEFAULT_ENCODING = "cl100k_base"
+
+
+@lru_cache(maxsize=None)
+def get_encoder(encoding: str = DEFAULT_ENCODING) -> "tiktoken.Encoding":
+    """Encoders are expensive to build; build each one once per process (on first use)."""
+    import tiktoken
+
+    return tiktoken.get_encoding(encoding)
+
+
+def encode(text: str, encoding: str = DEFAULT_ENCODING) -> List[int]:
+    # encode_ordinary: user text may contain strings like "<|endoftext|>",
+    # which plain encode() rejects
+    return get_encoder(encoding).encode_ordinary(text)
+
+
+def count_tokens(text: str, encoding: str = DEFAULT_ENCODING) -> int:
+    return len(encode(text, encoding)) if text else 0
+
+
+class TokenBudgetExceeded(Exception):
+    def __init__(self, used: int, limit: int):
+        # args must be the constructor arguments so the error pickles
+        # across process boundaries
+        super().__init__(used, limit)
+        self.used = used
+        self.limit = limit
+
+    def __str__(self) -> str:
+        return f"Token budget exceeded: {self.used} > {self.limit}"
+
+
+class TokenBudget:
+    """
+    Running token count for text that arrives piece by piece (e.g. pages
+    during extraction). `add()` raises TokenBudgetExceeded as soon as the
+    total goes over `max_tokens`, so the caller can stop reading.
+    """
+
+    def __init__(self, max_tokens: int, encoding: str = DEFAULT_ENCODING):
+        self.max_tokens = max_tokens
+        self.encoding = encoding
+        self.used = 0
+        self.pieces = 0
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.max_tokens - self.used)
+
+    def add(self, text: str) -> int:
+        n = count_tokens(text, self.encoding)
+        self.used += n
+        self.pieces += 1
+        if self.used > self.max_tokens:
+            raise TokenBudgetExceeded(self.used, self.max_tokens)
+        return n
+
+
+def truncate_to_tokens(text: str, max_tokens: int, encoding: str = DEFAULT_ENCODING) -> str:
+    """Cut `text` to at most `max_tokens`, preferring to end on a line break."""
+    tokens = encode(text, encoding)
+    if len(tokens) <= max_tokens:
+        return text
+    head = get_encoder(encoding).decode(tokens[:max(0, max_tokens)])
+    cut = head.rfind("\n")
+    return head[:cut].rstrip() if cut > len(head) // 2 else head.rstrip()
@@ -0,0 +1,57 @@
+# app/utils/upload_limit.py
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+
+from app.utils.logger import log_event
+
+# Room for the non-file form fields and multipart boundaries/headers
+FORM_OVERHEAD_BYTES = 256 * 1024
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Caps the size of multipart request bodies before form parsing starts.
+
+    Starlette's multipart parser reads (and spools) the whole body before a
+    route sees any UploadFile, so per-file checks in the route cannot stop
+    an oversized upload early. Here a `Content-Length` over the limit is
+    answered with 413 without reading the body at all; otherwise the bytes
+    are counted as they arrive and parsing is aborted with 413 as soon as
+    the running total passes `max_body_bytes`.
+    """
+
+    def __init__(self, app, max_body_bytes: int):
+        self.app = app
+        self.max_body_bytes = max_body_bytes
+
+    def _message(self) -> str:
+        return f"Request too large: uploads may total at most {self.max_body_bytes / (1024 * 1024):.2f}MB"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope.get("headers", [])}
+        if not headers.get("content-type", "").startswith("multipart/form-data"):
+            return await self.app(scope, receive, send)
+
+        declared = headers.get("content-length")
+        if declared is not None and declared.isdigit() and int(declared) > self.max_body_bytes:
+            message = self._message()
+            log_event("upload_rejected", request_id="Unknown", path=scope.get("path"), content_length=int(declared))
+            response = JSONResponse(status_code=413, content={"detail": message}, headers={"Connection": "close"})
+            return await response(scope, receive, send)
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_bytes:
+                    # FastAPI re-raises HTTPExceptions from body parsing as-is
+                    log_event("upload_rejected", request_id="Unknown", path=scope.get("path"), bytes_received=received)
+                    raise HTTPException(413, self._message())
+            return message
+
+        await self.app(scope, limited_receive, send)
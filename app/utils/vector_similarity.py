@@ -0,0 +1,162 @@
+# app/utils/vector_similarity.py
+"""
+Offline explanation-vs-answer similarity (SIMILARITY_ENGINE=vector): the
+cosine of (1 + log(tf)) * idf weighted vectors of the 3-5 character n-grams
+of each word, so "photosynthesis" and "photosynthetic" share most features.
+"""
+import json
+import os
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import chain
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+NGRAM_MIN = 3
+NGRAM_MAX = 5
+
+IDF_PATH          = os.getenv("SIMILARITY_IDF_PATH", "data/similarity_idf.json")
+IDF_MIN_DOCUMENTS = int(os.getenv("SIMILARITY_IDF_MIN_DOCUMENTS", "50"))
+
+
+@dataclass(frozen=True, eq=False)
+class Idf:
+    """n-gram -> idf; `unseen` for n-grams of no fitted document. Hashed by identity."""
+    weights: Dict[str, float]
+    unseen: float = 1.0
+    documents: int = 0
+
+    def __getitem__(self, gram: str) -> float:
+        return self.weights.get(gram, self.unseen)
+
+
+# Plain 1 + log(tf) weighting, used while no IDF has been fitted
+NO_IDF = Idf({})
+
+
+@lru_cache(maxsize=65536)
+def _word_ngrams(word: str) -> Tuple[str, ...]:
+    padded = f" {word} "
+    return tuple(
+        padded[i:i + n]
+        for n in range(NGRAM_MIN, NGRAM_MAX + 1)
+        for i in range(len(padded) - n + 1)
+    )
+
+
+def char_ngrams(tokens: Iterable[str]) -> Counter:
+    """Counts of the NGRAM_MIN..NGRAM_MAX character n-grams of " token "."""
+    # Answers to one question reuse a small vocabulary, so per-word n-grams are cached
+    return Counter(chain.from_iterable(map(_word_ngrams, tokens)))
+
+
+def fit_idf(documents: Iterable[Sequence[str]]) -> Idf:
+    """
+    Smoothed idf, log((1 + N) / (1 + df)) + 1, over token lists. Fitted on the
+    stored explanations (services.evaluate.refresh_similarity_idf), never on
+    the answers being scored, so one answer and a whole class score the same.
+    """
+    df: Counter = Counter()
+    n = 0
+    for tokens in documents:
+        df.update(set(chain.from_iterable(map(_word_ngrams, tokens))))
+        n += 1
+    return Idf(
+        weights={g: float(np.log((1 + n) / (1 + d)) + 1.0) for g, d in df.items()},
+        unseen=float(np.log(1 + n) + 1.0),
+        documents=n,
+    )
+
+
+def save_idf(idf: Idf, path: str = IDF_PATH) -> None:
+    """Write `idf` to `path`, replacing the previous table atomically."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"documents": idf.documents, "unseen": idf.unseen, "weights": idf.weights}, f)
+    os.replace(tmp, path)
+
+
+@lru_cache(maxsize=1)
+def corpus_idf(path: str = IDF_PATH) -> Idf:
+    """The fitted table at `path`, loaded once per process (NO_IDF if there is none)."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return NO_IDF
+    return Idf(data["weights"], data["unseen"], data["documents"])
+
+
+@lru_cache(maxsize=256)
+def reference_vector(tokens: Tuple[str, ...], idf: Idf = NO_IDF) -> Dict[str, float]:
+    """n-gram -> unit-vector weight of an explanation; cached per token tuple and table."""
+    counts = char_ngrams(tokens)
+    if not counts:
+        return {}
+    grams = sorted(counts)
+    weights = 1.0 + np.log(np.array([counts[g] for g in grams], dtype=np.float64))
+    weights *= np.array([idf[g] for g in grams], dtype=np.float64)
+    return dict(zip(grams, (weights / np.linalg.norm(weights)).tolist()))
+
+
+def cosine_scores(
+    reference_tokens: Sequence[str],
+    token_lists: List[Sequence[str]],
+    idf: Optional[Idf] = None,
+) -> np.ndarray:
+    """
+    Cosine similarity in [0, 1] of each token list to the reference (idf:
+    corpus_idf()), as one sparse answers × n-grams matrix times the
+    reference vector.
+    """
+    if idf is None:
+        idf = corpus_idf()
+    n = len(token_lists)
+    scores = np.zeros(n)
+    reference = reference_vector(tuple(reference_tokens), idf)
+    if not reference or not n:
+        return scores
+
+    # 1) (answer, word) occurrence counts over this call's vocabulary
+    flat_tokens = list(chain.from_iterable(token_lists))
+    if not flat_tokens:
+        return scores
+    vocab = {w: i for i, w in enumerate(dict.fromkeys(flat_tokens))}
+    word_ids = np.fromiter(map(vocab.__getitem__, flat_tokens), dtype=np.int64, count=len(flat_tokens))
+    rows = np.repeat(np.arange(n), [len(tokens) for tokens in token_lists])
+    pairs, word_counts = np.unique(rows * len(vocab) + word_ids, return_counts=True)
+    pair_rows, pair_words = np.divmod(pairs, len(vocab))
+
+    # 2) Each word's n-grams; ids follow the sorted n-grams, so a row's sums
+    #    run in the same order whatever else is in the batch
+    word_grams = [_word_ngrams(w) for w in vocab]
+    grams = sorted(set(chain.from_iterable(word_grams)))
+    gram_id = {g: i for i, g in enumerate(grams)}
+    flat = np.fromiter(map(gram_id.__getitem__, chain.from_iterable(word_grams)), dtype=np.int64)
+    lengths = np.array([len(g) for g in word_grams], dtype=np.int64)
+    starts = np.cumsum(lengths) - lengths
+
+    # 3) Non-zeros of the answers × n-grams matrix: (answer, word) counts
+    #    spread over the word's n-grams, then summed per (answer, n-gram)
+    per_pair = lengths[pair_words]
+    offsets = np.arange(per_pair.sum()) - np.repeat(np.cumsum(per_pair) - per_pair, per_pair)
+    entry_grams = flat[np.repeat(starts[pair_words], per_pair) + offsets]
+    entry_rows = np.repeat(pair_rows, per_pair)
+    cells, inverse = np.unique(entry_rows * len(grams) + entry_grams, return_inverse=True)
+    tf = np.bincount(inverse, weights=np.repeat(word_counts, per_pair))
+    cell_rows, cell_grams = np.divmod(cells, len(grams))
+
+    # 4) One sparse matrix-vector product against the explanation
+    gram_idf = np.array([idf[g] for g in grams], dtype=np.float64)
+    weights = (1.0 + np.log(tf)) * gram_idf[cell_grams]
+    ref = np.array([reference.get(g, 0.0) for g in grams], dtype=np.float64)
+    norms = np.sqrt(np.bincount(cell_rows, weights=weights * weights, minlength=n))
+    dots = np.bincount(cell_rows, weights=weights * ref[cell_grams], minlength=n)
+
+    np.divide(dots, norms, out=scores, where=norms > 0)
+    return np.clip(scores, 0.0, 1.0)
@@ -0,0 +1,45 @@
+# app/utils/warmup.py
+import os
+import time
+from typing import Any, Callable, Dict, List, Tuple
+from dotenv import load_dotenv
+
+from app.utils.logger import log_event
+
+load_dotenv()
+
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+
+
+def _steps() -> List[Tuple[str, Callable[[], Any]]]:
+    from app.utils import quiz_engine
+    from app.utils.tokenizer import get_encoder
+    from app.utils.prompt import prompt_token_report
+    from app.services.feedback import get_feedback_sheet
+
+    return [
+        ("tokenizer", get_encoder),
+        ("prompt_template", quiz_engine._prompt_template),
+        ("system_prompts", prompt_token_report),
+        ("groq_client", lambda: quiz_engine._get_llm(quiz_engine.scheduler.preference[0])),
+        ("feedback_sheet", get_feedback_sheet),
+    ]
+
+
+def warm_up() -> Dict[str, Any]:
+    """
+    Import the heavy modules and open the external clients the first
+    request would otherwise wait for. Blocking; run it in a thread. A step
+    that fails (no network, missing credentials) is logged and retried
+    lazily on first use.
+    """
+    timings: Dict[str, Any] = {}
+    for name, step in _steps():
+        started = time.perf_counter()
+        try:
+            step()
+            timings[f"{name}_s"] = round(time.perf_counter() - started, 3)
+        except Exception as e:
+            timings[f"{name}_error"] = str(getattr(e, "detail", e))[:200]
+    log_event("startup_warmup", request_id="startup", **timings)
+    return timings
@@ -0,0 +1,102 @@
+"""
+Subjective-evaluation benchmark: per-answer scoring vs /evaluate/batch scoring.
+
+Generates one essay question and --answers synthetic student answers, then
+times the two paths behind the endpoints, without HTTP:
+
+  per_answer  score_keywords + score_similarity once per answer (POST /evaluate)
+  batch       score_keywords_batch + score_similarity_batch (POST /evaluate/batch)
+
+and checks that both produce exactly the same scores. Structure and
+readability are scored the same way on both paths, so they are left out.
+
+Usage:
+    python benchmarks/bench_evaluate_batch.py
+    python benchmarks/bench_evaluate_batch.py --answers 50 200 1000 --words 250 --workers 1 -1
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.utils.evaluation_logic import (
+    score_keywords,
+    score_keywords_batch,
+    score_similarity,
+    score_similarity_batch,
+)
+
+QUESTION = {
+    "type": "essay",
+    "question": "Explain how photosynthesis stores energy.",
+    "explanation": (
+        "Photosynthesis converts light energy into chemical energy. The light-dependent reactions in the "
+        "thylakoid membranes make ATP and NADPH, which the Calvin cycle in the stroma uses to fix carbon "
+        "dioxide into glucose."
+    ),
+    "keywords": ["photosynthesis", "chlorophyll", "light energy", "thylakoid", "calvin cycle",
+                 "stroma", "atp", "nadph", "glucose", "carbon dioxide"],
+}
+
+VOCABULARY = (
+    "photosynthesis chlorophyll light energy chemical thylakoid membrane stroma calvin cycle atp nadph "
+    "glucose carbon dioxide oxygen water plant leaf cell chloroplast reaction enzyme rubisco sugar "
+    "sunlight absorbs produces converts stores because therefore which during process the a of in and"
+).split()
+
+
+def make_answers(n: int, words: int, seed: int) -> list:
+    rng = random.Random(seed)
+    answers = []
+    for _ in range(n):
+        length = max(1, int(rng.gauss(words, words / 4)))
+        text = " ".join(rng.choice(VOCABULARY) for _ in range(length))
+        answers.append(text.capitalize() + ".")
+    return answers
+
+
+def per_answer(answers: list) -> tuple:
+    return [score_keywords(QUESTION, a) for a in answers], [score_similarity(QUESTION, a) for a in answers]
+
+
+def batch(answers: list, workers: int) -> tuple:
+    return score_keywords_batch(QUESTION, answers, workers), score_similarity_batch(QUESTION, answers, workers)
+
+
+def _time(fn, repeat: int) -> tuple:
+    times, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--answers", type=int, nargs="+", default=[10, 50, 200, 1000])
+    parser.add_argument("--words", type=int, default=150, help="Mean words per answer")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, -1], help="cdist workers (-1 = all cores)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    for n in args.answers:
+        answers = make_answers(n, args.words, args.seed)
+        base_s, expected = _time(lambda: per_answer(answers), args.repeat)
+        row = {"answers": n, "per_answer_s": round(base_s, 4)}
+        for workers in args.workers:
+            batch_s, got = _time(lambda: batch(answers, workers), args.repeat)
+            row[f"batch_w{workers}_s"] = round(batch_s, 4)
+            row[f"speedup_w{workers}"] = round(base_s / batch_s, 1) if batch_s else None
+            row[f"identical_w{workers}"] = got == expected
+        print(json.dumps(row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Latency benchmark for POST /evaluate under concurrent load.
+
+--concurrency clients each send --requests essay evaluations back to back
+(closed loop), while a probe hits GET / every 50 ms to see whether the event
+loop stays responsive. Reported per mode: throughput and p50/p99 latency of
+/evaluate and of the probe.
+
+  --mode inline  scoring called directly in the async handler (the old path)
+  --mode thread  EVAL_WORKERS=0: scoring in asyncio.to_thread
+  --mode pool    scoring in the evaluation process pool (--workers processes)
+
+Usage:
+    python benchmarks/bench_evaluate_latency.py --mode inline
+    python benchmarks/bench_evaluate_latency.py --mode pool --workers 4 --concurrency 1 8 32
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import httpx
+from fastapi import FastAPI
+
+from app.routes import evaluate
+from app.services import evaluate as evaluate_service
+from app.utils.latency import percentile
+from app.utils.process_pool import BoundedProcessPool
+
+QUESTION = {
+    "type": "essay",
+    "question": "Explain how photosynthesis stores energy.",
+    "explanation": (
+        "Photosynthesis converts light energy into chemical energy. The light-dependent reactions in the "
+        "thylakoid membranes make ATP and NADPH, which the Calvin cycle in the stroma uses to fix carbon "
+        "dioxide into glucose."
+    ),
+    "keywords": ["photosynthesis", "chlorophyll", "light-dependent reactions", "calvin cycle", "stroma",
+                 "atp", "nadph", "glucose", "carbon dioxide", "thylakoid"],
+}
+
+SENTENCES = [
+    "Photosynthesis converts light energy into chemical energy stored in glucose.",
+    "The light-dependent reactions happen in the thylakoid membranes and produce ATP and NADPH.",
+    "Chlorophyll absorbs mostly red and blue light and reflects green light.",
+    "The Calvin cycle in the stroma fixes carbon dioxide into sugars using that ATP.",
+    "Oxygen is released as a by-product when water molecules are split.",
+    "Without enough light the rate of photosynthesis drops, even when carbon dioxide is plentiful.",
+]
+
+
+def make_answer(rng: random.Random, sentences: int) -> str:
+    paragraphs = [" ".join(rng.choice(SENTENCES) for _ in range(sentences // 2)) for _ in range(2)]
+    return "\n".join(paragraphs)
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/")
+    async def probe():
+        return {"ok": True}
+
+    app.include_router(evaluate.router)
+    return app
+
+
+def _summary(samples: list) -> dict:
+    return {
+        "p50_ms": round(percentile(samples, 50) * 1000, 1) if samples else None,
+        "p99_ms": round(percentile(samples, 99) * 1000, 1) if samples else None,
+    }
+
+
+async def run_level(client: httpx.AsyncClient, concurrency: int, requests: int, sentences: int) -> dict:
+    rng = random.Random(concurrency)
+    latencies, probes, statuses = [], [], []
+    done = asyncio.Event()
+
+    async def worker(w: int):
+        for i in range(requests):
+            t0 = time.perf_counter()
+            r = await client.post("/evaluate", json={
+                "requestId": f"bench-{concurrency}-{w}-{i}",
+                "question": QUESTION,
+                "user_answer": make_answer(rng, sentences),
+            })
+            latencies.append(time.perf_counter() - t0)
+            statuses.append(r.status_code)
+
+    async def probe():
+        while not done.is_set():
+            t0 = time.perf_counter()
+            await client.get("/")
+            probes.append(time.perf_counter() - t0)
+            await asyncio.sleep(0.05)
+
+    probe_task = asyncio.create_task(probe())
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(w) for w in range(concurrency)))
+    wall = time.perf_counter() - start
+    done.set()
+    await probe_task
+
+    return {
+        "concurrency": concurrency,
+        "ok": statuses.count(200),
+        "errors": len(statuses) - statuses.count(200),
+        "req_per_s": round(len(statuses) / wall, 1),
+        "evaluate": _summary(latencies),
+        "probe": _summary(probes),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", choices=["inline", "thread", "pool"], default="pool")
+    parser.add_argument("--workers", type=int, default=2, help="Pool processes (--mode pool)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=25, help="Requests per client")
+    parser.add_argument("--sentences", type=int, default=12, help="Sentences per answer")
+    args = parser.parse_args()
+
+    if args.mode == "inline":
+        async def inline(fn, *fn_args):
+            return fn(*fn_args)  # what the handler did before: score on the event loop
+        evaluate.run_evaluation = inline
+    elif args.mode == "thread":
+        evaluate_service.EVAL_WORKERS = 0
+    else:
+        evaluate_service.EVAL_WORKERS = args.workers
+        evaluate_service.eval_pool = BoundedProcessPool(
+            max_workers=args.workers, max_tasks_per_child=0, timeout_s=30,
+            max_concurrent=args.workers, max_waiting=0,
+        )
+
+    transport = httpx.ASGITransport(app=build_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        # First call imports the scoring libraries (and starts the workers); keep it out of the numbers
+        await client.post("/evaluate", json={"requestId": "warmup", "question": QUESTION, "user_answer": SENTENCES[0]})
+        print(f"mode={args.mode}" + (f" workers={args.workers}" if args.mode == "pool" else ""))
+        for level in args.concurrency:
+            print(json.dumps(await run_level(client, level, args.requests, args.sentences)))
+    evaluate_service.eval_pool.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,150 @@
+"""
+Extraction benchmark: fast per-type extractors vs Unstructured.
+
+For every document in the corpus it times `open_document` (fast extractor,
+falling back to Unstructured) and, when Unstructured is installed, the
+Unstructured path on its own, and reports output size in characters and
+tokens.
+
+Without --corpus a synthetic corpus (txt, md, docx, pptx) is generated in
+a temp dir; point --corpus at a folder of real PDFs/DOCX/PPTX for numbers
+that matter.
+
+Usage:
+    python benchmarks/bench_extractors.py
+    python benchmarks/bench_extractors.py --corpus ~/lecture-notes --repeat 5
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import zipfile
+from xml.sax.saxutils import escape
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.models.schema import SupportedFileType
+from app.utils.extractors import PAGE_SEPARATOR, FastExtractorFailed, extract_unstructured, open_document, open_fallback
+from app.utils.tokenizer import count_tokens
+
+PARAGRAPH = (
+    "Photosynthesis converts light energy into chemical energy stored in glucose. "
+    "The light-dependent reactions take place in the thylakoid membranes, while the "
+    "Calvin cycle fixes carbon dioxide in the stroma."
+)
+
+
+def _docx(path: str, paragraphs: int) -> None:
+    body = "".join(
+        f'<w:p><w:r><w:t>{escape(f"{i}. {PARAGRAPH}")}</w:t></w:r></w:p>' for i in range(paragraphs)
+    )
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr("[Content_Types].xml",
+                    '<?xml version="1.0"?><Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                    '<Default Extension="xml" ContentType="application/xml"/>'
+                    '<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+                    '</Types>')
+        zf.writestr("word/document.xml",
+                    '<?xml version="1.0"?><w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+                    f"<w:body>{body}</w:body></w:document>")
+
+
+def _pptx(path: str, slides: int) -> None:
+    ns = ('xmlns:p="http://schemas.openxmlformats.org/presentationml/2006/main" '
+          'xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main" '
+          'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"')
+    with zipfile.ZipFile(path, "w") as zf:
+        ids = "".join(f'<p:sldId id="{256 + i}" r:id="rId{i + 1}"/>' for i in range(slides))
+        zf.writestr("ppt/presentation.xml", f"<p:presentation {ns}><p:sldIdLst>{ids}</p:sldIdLst></p:presentation>")
+        rels = "".join(
+            f'<Relationship Id="rId{i + 1}" Target="slides/slide{i + 1}.xml"/>' for i in range(slides)
+        )
+        zf.writestr("ppt/_rels/presentation.xml.rels",
+                    f'<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">{rels}</Relationships>')
+        for i in range(slides):
+            zf.writestr(f"ppt/slides/slide{i + 1}.xml",
+                        f"<p:sld {ns}><p:cSld><p:spTree><p:sp><p:txBody>"
+                        f"<a:p><a:r><a:t>Slide {i + 1}</a:t></a:r></a:p>"
+                        f"<a:p><a:r><a:t>{escape(PARAGRAPH)}</a:t></a:r></a:p>"
+                        "</p:txBody></p:sp></p:spTree></p:cSld></p:sld>")
+
+
+def build_corpus(directory: str) -> None:
+    for n in (20, 200, 2000):
+        text = "\n\n".join(f"{i}. {PARAGRAPH}" for i in range(n))
+        with open(os.path.join(directory, f"notes_{n}.txt"), "w", encoding="utf-8") as f:
+            f.write(text)
+        with open(os.path.join(directory, f"notes_{n}.md"), "w", encoding="utf-8") as f:
+            f.write("# Notes\n\n" + text)
+        _docx(os.path.join(directory, f"notes_{n}.docx"), n)
+        _pptx(os.path.join(directory, f"slides_{max(1, n // 10)}.pptx"), max(1, n // 10))
+
+
+def _time(fn, repeat: int):
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+
+def bench_file(path: str, repeat: int, with_unstructured: bool) -> dict:
+    def fast():
+        name, pieces = open_document(path)
+        try:
+            return name, "".join(pieces)
+        except FastExtractorFailed:
+            name, pieces = open_fallback(path)
+            return name, "".join(pieces)
+
+    fast_s, (extractor, text) = _time(fast, repeat)
+    row = {
+        "file": os.path.basename(path),
+        "size_kb": round(os.path.getsize(path) / 1024, 1),
+        "extractor": extractor,
+        "fast_ms": round(fast_s * 1000, 2),
+        "chars": len(text),
+        "tokens": count_tokens(text),
+    }
+    if with_unstructured and extractor != extract_unstructured.__name__:
+        try:
+            slow_s, slow_text = _time(lambda: PAGE_SEPARATOR.join(extract_unstructured(path)), repeat)
+            row.update(
+                unstructured_ms=round(slow_s * 1000, 2),
+                unstructured_chars=len(slow_text),
+                speedup=round(slow_s / fast_s, 1) if fast_s else None,
+            )
+        except Exception as e:
+            row["unstructured_error"] = repr(e)[:120]
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", help="Folder of sample documents (default: generated)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per file; the best time is kept")
+    parser.add_argument("--skip-unstructured", action="store_true")
+    args = parser.parse_args()
+
+    try:
+        import unstructured  # noqa: F401
+        with_unstructured = not args.skip_unstructured
+    except ImportError:
+        print("unstructured is not installed; timing fast extractors only")
+        with_unstructured = False
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = args.corpus or tmp
+        if not args.corpus:
+            build_corpus(tmp)
+        supported = {f".{t.value}" for t in SupportedFileType}
+        for name in sorted(os.listdir(corpus)):
+            if os.path.splitext(name)[1].lower() in supported:
+                print(json.dumps(bench_file(os.path.join(corpus, name), args.repeat, with_unstructured)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Concurrency benchmark for POST /generate on a single worker.
+
+The Groq client is replaced by a fake LLM that "thinks" for --latency seconds,
+so the numbers only reflect how well one event loop overlaps LLM waits.
+
+  --mode blocking  emulates the old path (sync llm.invoke inside the coroutine)
+  --mode async     the current path (awaited ChatGroq.ainvoke)
+
+Besides throughput it probes GET / (health) while the load is running, which
+is what froze before the async change.
+
+Usage:
+    python benchmarks/bench_generate_concurrency.py --mode blocking --concurrency 1 2 4 8 16
+    python benchmarks/bench_generate_concurrency.py --mode async    --concurrency 1 2 4 8 16
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("GROQ_API_KEY", "bench-dummy-key")
+os.environ["MAX_REQUEST_PER_DAILY"] = "1000000/day"
+
+import httpx
+from fastapi import FastAPI
+
+from app.routes import generate, health
+from app.utils import quiz_engine
+from app.utils.model_scheduler import ModelLimits, ModelScheduler
+from app.utils.rate_limiter import limiter
+
+FAKE_PAYLOAD = json.dumps({
+    "quizzes": [
+        {"type": "tf", "question": f"Statement {i} is true.", "answer": True, "explanation": "Because."}
+        for i in range(5)
+    ]
+})
+
+
+class _FakeMessage:
+    def __init__(self, content: str):
+        self.content = content
+        self.token_usage = None
+        self.response_metadata = {
+            "token_usage": {"prompt_tokens": 2000, "completion_tokens": 400, "total_tokens": 2400}
+        }
+
+
+class FakeLLM:
+    def __init__(self, latency: float, blocking: bool):
+        self.latency = latency
+        self.blocking = blocking
+
+    async def ainvoke(self, messages, **kwargs):
+        if self.blocking:
+            time.sleep(self.latency)  # what a sync llm.invoke() does to the loop
+        else:
+            await asyncio.sleep(self.latency)
+        return _FakeMessage(FAKE_PAYLOAD)
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+    app.state.limiter = limiter
+    app.include_router(health.router)
+    app.include_router(generate.router)
+    return app
+
+
+async def run_level(client: httpx.AsyncClient, concurrency: int) -> dict:
+    async def one(i: int):
+        r = await client.post("/generate", data={
+            "request_id": f"bench-{concurrency}-{i}",
+            "user_additional_instructions": "Five true/false questions about benchmarks.",
+        })
+        return r.status_code
+
+    async def probe_health():
+        await asyncio.sleep(0.05)
+        t0 = time.perf_counter()
+        await client.get("/")
+        return time.perf_counter() - t0
+
+    start = time.perf_counter()
+    results = await asyncio.gather(probe_health(), *(one(i) for i in range(concurrency)))
+    wall = time.perf_counter() - start
+    statuses = results[1:]
+    return {
+        "concurrency": concurrency,
+        "ok": sum(1 for s in statuses if s == 200),
+        "wall_s": round(wall, 3),
+        "req_per_s": round(concurrency / wall, 2),
+        "health_latency_s": round(results[0], 3),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", choices=["blocking", "async"], default="async")
+    parser.add_argument("--latency", type=float, default=1.0, help="Fake LLM latency in seconds")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    args = parser.parse_args()
+
+    fake = FakeLLM(args.latency, blocking=args.mode == "blocking")
+    quiz_engine._get_llm = lambda *a, **kw: (fake, "fake-model")
+    # Unlimited quota, so only the event loop is being measured
+    quiz_engine.scheduler = ModelScheduler({"fake-model": ModelLimits(10**9, 10**12, None, 100)}, ["fake-model"])
+    quiz_engine.generation_cache.enabled = False
+
+    transport = httpx.ASGITransport(app=build_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        print(f"mode={args.mode} latency={args.latency}s")
+        for level in args.concurrency:
+            print(json.dumps(await run_level(client, level)))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
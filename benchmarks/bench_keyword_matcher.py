@@ -0,0 +1,96 @@
+"""
+Keyword-scoring micro-benchmark: the old per-pair loop vs KeywordMatcher.
+
+  legacy   lowercase the keywords on every call, then fuzz.partial_ratio for
+           every keyword × token pair (score_keywords before the matcher)
+  matcher  keyword_matcher(...) compiled once per question, then exact
+           set hits + extractOne with score_cutoff per answer
+
+Answers are synthetic essays of --lengths words drawn from a biology
+vocabulary, so some keywords are present, some misspelled, some absent.
+Tokenization is excluded from both timings (it is shared); the `agree`
+column is the share of answers whose single-word keyword score is the same.
+
+Usage:
+    python benchmarks/bench_keyword_matcher.py
+    python benchmarks/bench_keyword_matcher.py --lengths 100 300 1000 --answers 500
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from rapidfuzz import fuzz
+
+from app.utils.evaluation_logic import KeywordMatcher, keyword_matcher, tokenize_and_filter
+
+KEYWORDS = [
+    "Photosynthesis", "chlorophyll", "thylakoid", "stroma", "ATP", "NADPH", "glucose", "rubisco",
+    "light-dependent reactions", "Calvin cycle", "carbon dioxide",
+]
+
+VOCABULARY = (
+    "photosynthesis photosynthetic chlorophyl chlorophyll light energy chemical thylakoid membrane stroma "
+    "calvin cycle atp nadph glucose carbon dioxide oxygen water plant leaf cell chloroplast reaction reactions "
+    "dependent enzyme rubisco sugar sunlight absorbs produces converts stores because therefore during process "
+    "electrons transport chain pigment wavelength green fixation molecule"
+).split()
+
+
+def make_answers(n: int, words: int, seed: int) -> list:
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(VOCABULARY) for _ in range(words)) for _ in range(n)]
+
+
+def legacy_count(keywords: list, tokens: list) -> int:
+    keywords = [kw.lower() for kw in keywords]
+    return sum(any(fuzz.partial_ratio(kw, tok) > 80 for tok in tokens) for kw in keywords)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lengths", type=int, nargs="+", default=[50, 150, 400, 800], help="Words per answer")
+    parser.add_argument("--answers", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    single_words = [kw for kw in KEYWORDS if " " not in kw and "-" not in kw]
+    compile_started = time.perf_counter()
+    KeywordMatcher(KEYWORDS)
+    compile_us = (time.perf_counter() - compile_started) * 1e6
+
+    for length in args.lengths:
+        answers = make_answers(args.answers, length, args.seed)
+        token_lists = [tokenize_and_filter(a) for a in answers]
+
+        started = time.perf_counter()
+        for tokens in token_lists:
+            legacy_count(KEYWORDS, tokens)
+        legacy_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for answer, tokens in zip(answers, token_lists):
+            keyword_matcher(tuple(KEYWORDS)).score(answer, tokens)
+        matcher_s = time.perf_counter() - started
+
+        words_only = KeywordMatcher(single_words)
+        agree = sum(
+            legacy_count(single_words, tokens) == words_only.count_words(tokens) for tokens in token_lists
+        )
+        print(json.dumps({
+            "words": length,
+            "answers": args.answers,
+            "legacy_us_per_answer": round(legacy_s / args.answers * 1e6, 1),
+            "matcher_us_per_answer": round(matcher_s / args.answers * 1e6, 1),
+            "speedup": round(legacy_s / matcher_s, 1) if matcher_s else None,
+            "agree": round(agree / args.answers, 3),
+            "compile_us": round(compile_us, 1),
+        }))
+
+
+if __name__ == "__main__":
+    main()
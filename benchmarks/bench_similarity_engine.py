@@ -0,0 +1,136 @@
+"""
+Similarity-engine benchmark: SIMILARITY_ENGINE=fuzz vs SIMILARITY_ENGINE=vector,
+the latter with plain weights (no IDF fitted yet) and with an IDF fitted on
+the benchmark's sentences (engine "vector+idf").
+
+Builds one essay question and --answers synthetic answers, half on-topic
+(sentences about the explanation, reworded) and half off-topic, and reports
+for each engine:
+
+  per_answer_s  score_similarity once per answer (POST /evaluate)
+  batch_s       score_similarity_batch over all answers (POST /evaluate/batch)
+  identical     batch scores equal the per-answer scores
+  mean_on / mean_off / separation
+                mean score (0-10) of on-topic and off-topic answers, and the
+                share of (on, off) pairs where the on-topic answer scores higher
+
+The two engines are on different scales (token_set_ratio vs cosine), so
+compare separation rather than the means when choosing one.
+
+Usage:
+    python benchmarks/bench_similarity_engine.py
+    python benchmarks/bench_similarity_engine.py --answers 100 1000 5000 --sentences 8
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.utils import evaluation_logic, vector_similarity
+from app.utils.answer_text import tokenize_and_filter
+from app.utils.evaluation_logic import score_similarity, score_similarity_batch
+
+QUESTION = {
+    "type": "essay",
+    "question": "Explain how photosynthesis stores energy.",
+    "explanation": (
+        "Photosynthesis converts light energy into chemical energy. The light-dependent reactions in the "
+        "thylakoid membranes make ATP and NADPH, which the Calvin cycle in the stroma uses to fix carbon "
+        "dioxide into glucose."
+    ),
+    "keywords": [],
+}
+
+ON_TOPIC = [
+    "Photosynthetic organisms turn sunlight into chemical energy.",
+    "Light reactions take place on the thylakoid membrane and produce ATP and NADPH.",
+    "The energy ends up stored in glucose molecules.",
+    "In the stroma, the Calvin cycle fixes CO2 using ATP.",
+    "Chlorophyll absorbs light, which drives the light-dependent stage.",
+    "Carbon dioxide is fixed into sugars during the Calvin cycle.",
+]
+
+OFF_TOPIC = [
+    "Cellular respiration breaks glucose down in the mitochondria.",
+    "The French Revolution began in 1789 with the storming of the Bastille.",
+    "Mitosis produces two identical daughter cells.",
+    "Water boils at 100 degrees Celsius at sea level.",
+    "Supply and demand determine the market price of goods.",
+    "The heart pumps blood through arteries and veins.",
+]
+
+
+def make_answers(n: int, sentences: int, seed: int) -> tuple:
+    rng = random.Random(seed)
+    answers, on_topic = [], []
+    for i in range(n):
+        pool = ON_TOPIC if i % 2 == 0 else OFF_TOPIC
+        answers.append(" ".join(rng.choice(pool) for _ in range(max(1, rng.randint(sentences // 2, sentences)))))
+        on_topic.append(i % 2 == 0)
+    return answers, on_topic
+
+
+def separation(scores: list, on_topic: list) -> float:
+    on = [s for s, t in zip(scores, on_topic) if t]
+    off = [s for s, t in zip(scores, on_topic) if not t]
+    if not on or not off:
+        return 0.0
+    wins = sum((a > b) + 0.5 * (a == b) for a in on for b in off)
+    return wins / (len(on) * len(off))
+
+
+def _time(fn, repeat: int) -> tuple:
+    times, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--answers", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--sentences", type=int, default=6, help="Max sentences per answer")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    # Stand-in for the stored explanations the server fits its IDF on
+    fitted = vector_similarity.fit_idf(
+        tokenize_and_filter(s) for s in [QUESTION["explanation"], *ON_TOPIC, *OFF_TOPIC]
+    )
+    engines = {
+        "fuzz": vector_similarity.NO_IDF,
+        "vector": vector_similarity.NO_IDF,
+        "vector+idf": fitted,
+    }
+
+    for n in args.answers:
+        answers, on_topic = make_answers(n, args.sentences, args.seed)
+        for engine, idf in engines.items():
+            evaluation_logic.SIMILARITY_ENGINE = engine.split("+")[0]
+            vector_similarity.corpus_idf = lambda idf=idf: idf
+            single_s, expected = _time(lambda: [score_similarity(QUESTION, a) for a in answers], args.repeat)
+            batch_s, got = _time(lambda: score_similarity_batch(QUESTION, answers), args.repeat)
+            on = [s for s, t in zip(got, on_topic) if t]
+            off = [s for s, t in zip(got, on_topic) if not t]
+            print(json.dumps({
+                "answers": n,
+                "engine": engine,
+                "per_answer_s": round(single_s, 4),
+                "batch_s": round(batch_s, 4),
+                "identical": got == expected,
+                "mean_on": round(statistics.mean(on), 2) if on else None,
+                "mean_off": round(statistics.mean(off), 2) if off else None,
+                "separation": round(separation(got, on_topic), 3),
+            }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Cold-start benchmark.
+
+  import   time to `import app.main` in a fresh interpreter (median of --runs)
+  health   time from launching uvicorn to the first 200 from GET /
+  top      slowest modules by cumulative import time (python -X importtime)
+
+Every run is a new process, so nothing is cached between runs except the
+OS file cache. By default the environment is stripped of GROQ_API_KEY and
+Google credentials to check that the app starts offline and unconfigured.
+
+Usage:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --runs 10 --top 15 --keep-env
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+STRIPPED_VARS = ("GROQ_API_KEY", "GOOGLE_SERVICE_ACCOUNT_INFO", "FEEDBACK_SHEET_ID")
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+
+
+def _env(keep_env: bool) -> dict:
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    if not keep_env:
+        for var in STRIPPED_VARS:
+            env[var] = ""  # blank, so load_dotenv() does not fill them back in
+    return env
+
+
+def bench_import(runs: int, env: dict) -> dict:
+    times = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", IMPORT_SNIPPET], cwd=ROOT, env=env,
+            capture_output=True, text=True, check=True,
+        )
+        times.append(float(out.stdout.strip().splitlines()[-1]))
+    return {"runs": runs, "median_s": round(statistics.median(times), 3), "min_s": round(min(times), 3)}
+
+
+def top_imports(n: int, env: dict) -> list:
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"], cwd=ROOT, env=env,
+        capture_output=True, text=True,
+    )
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        if not cumulative_us.strip().isdigit():
+            continue  # header line
+        # Nesting is shown by indentation; one space = imported at the top level
+        if len(name) - len(name.lstrip()) == 1:
+            rows.append((int(cumulative_us), name.strip()))
+    top = sorted(rows, reverse=True)[:n]
+    return [{"module": name, "cumulative_ms": round(us / 1000, 1)} for us, name in top]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def bench_first_health(env: dict, timeout_s: float = 60.0) -> dict:
+    port = _free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < timeout_s:
+            if server.poll() is not None:
+                return {"error": f"server exited with code {server.returncode}"}
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1) as r:
+                    if r.status == 200:
+                        return {"first_health_s": round(time.perf_counter() - started, 3)}
+            except OSError:
+                time.sleep(0.02)
+        return {"error": f"no healthy response within {timeout_s}s"}
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="Slowest top-level imports to list")
+    parser.add_argument("--keep-env", action="store_true", help="Keep API keys/credentials from the environment")
+    args = parser.parse_args()
+
+    env = _env(args.keep_env)
+    print(json.dumps({"import": bench_import(args.runs, env)}))
+    print(json.dumps({"health": bench_first_health(env)}))
+    print(json.dumps({"top_imports": top_imports(args.top, env)}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
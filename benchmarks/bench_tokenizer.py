@@ -0,0 +1,89 @@
+"""
+Evaluation tokenizer check: regex tokenizer vs nltk.word_tokenize (punkt).
+
+For every answer in the reference corpus it tokenizes with both
+(EVAL_TOKENIZER=regex and =nltk, after the same clean_text + isalnum +
+stopword filtering) and reports:
+
+  identical       share of answers whose token lists are exactly equal
+  keyword_diff    max / mean absolute difference in keyword score (0-10)
+  throughput      answers per second for each tokenizer
+
+and exits with status 1 when the largest keyword-score difference is above
+--tolerance. Needs nltk and its punkt data (downloaded by nltk_setup).
+
+Without --corpus, the reference corpus in tests/tokenizer_corpus.py is used
+(essay-like answers with contractions, hyphenation, abbreviations, numbers
+and quotes); --corpus takes a text file with one answer per paragraph
+(blank-line separated).
+
+Usage:
+    python benchmarks/bench_tokenizer.py
+    python benchmarks/bench_tokenizer.py --corpus answers.txt --repeat 5 --tolerance 0.5
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.utils.evaluation_logic import _regex_tokenize, _word_tokenize, keyword_matcher
+from tests.tokenizer_corpus import KEYWORDS, filtered, reference_corpus
+
+
+def load_corpus(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [p.strip() for p in f.read().split("\n\n") if p.strip()]
+
+
+def _throughput(tokenize, answers: list, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for a in answers:
+            filtered(tokenize, a)
+        best = min(best, time.perf_counter() - started)
+    return len(answers) / best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", help="Text file, one answer per blank-line separated paragraph")
+    parser.add_argument("--answers", type=int, default=500, help="Size of the built-in corpus")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Max allowed keyword-score difference")
+    parser.add_argument("--seed", type=int, default=5)
+    args = parser.parse_args()
+
+    answers = load_corpus(args.corpus) if args.corpus else reference_corpus(args.answers, args.seed)
+    nltk_tokenize = _word_tokenize()
+    matcher = keyword_matcher(KEYWORDS)
+
+    identical, diffs, examples = 0, [], []
+    for a in answers:
+        expected, got = filtered(nltk_tokenize, a), filtered(_regex_tokenize, a)
+        identical += expected == got
+        diffs.append(abs(matcher.score(a, expected) - matcher.score(a, got)))
+        if expected != got and len(examples) < 3:
+            examples.append({"only_nltk": sorted(set(expected) - set(got)), "only_regex": sorted(set(got) - set(expected))})
+
+    nltk_rate = _throughput(nltk_tokenize, answers, args.repeat)
+    regex_rate = _throughput(_regex_tokenize, answers, args.repeat)
+    report = {
+        "answers": len(answers),
+        "identical": round(identical / len(answers), 3),
+        "keyword_diff_max": round(max(diffs), 2),
+        "keyword_diff_mean": round(sum(diffs) / len(diffs), 4),
+        "nltk_answers_per_s": round(nltk_rate),
+        "regex_answers_per_s": round(regex_rate),
+        "speedup": round(regex_rate / nltk_rate, 1),
+        "examples": examples,
+    }
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    sys.exit(0 if report["keyword_diff_max"] <= args.tolerance else 1)
+
+
+if __name__ == "__main__":
+    main()
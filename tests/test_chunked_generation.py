@@ -0,0 +1,61 @@
+import asyncio
+
+from app.models.schema import QuizGenerationResponse
+from app.utils import chunked_generation
+from app.utils.chunked_generation import generate_quiz_chunked, merge_responses
+from app.utils.request_context import RequestContext
+
+
+def _response(*questions, model="m"):
+    quizzes = [{"type": "tf", "question": q, "answer": True} for q in questions]
+    return QuizGenerationResponse(
+        model_used=model,
+        inference_time=0.1,
+        question_count=len(quizzes),
+        attempt_number=1,
+        quizzes=quizzes,
+    )
+
+
+def _questions(resp):
+    return [q.question for q in resp.quizzes]
+
+
+def test_merge_drops_near_duplicates_and_truncates_round_robin():
+    results = [
+        _response("What is 2 plus 2 in base ten?", "Name the largest planet."),
+        _response("What is 2 plus 2 in base ten ?", "Name the smallest planet.", "Who wrote Hamlet?"),
+    ]
+    merged = merge_responses(results, num_questions=2, elapsed=1.0)
+    assert _questions(merged) == ["What is 2 plus 2 in base ten?", "Name the smallest planet."]
+
+
+def test_merge_keeps_every_existing_quiz_item_in_order():
+    results = [
+        _response("What is 2+2?", "What is 2+3?"),
+        _response("What is 2+2?", "What is 2+4?", "What is 2+5?"),
+    ]
+    merged = merge_responses(results, num_questions=2, elapsed=1.0, existing_quiz=True)
+    assert _questions(merged) == ["What is 2+2?", "What is 2+3?", "What is 2+2?", "What is 2+4?", "What is 2+5?"]
+    assert merged.question_count == 5
+
+
+def test_chunked_existing_quiz_converts_every_chunk(monkeypatch):
+    calls = []
+
+    async def fake_generate_quiz(input_data, ctx, preferred_model=None):
+        calls.append(input_data["num_questions"])
+        return _response(*input_data["source_material"].splitlines())
+
+    # One chunk per paragraph, sized in words (no tokenizer download needed)
+    monkeypatch.setattr(chunked_generation, "split_into_chunks", lambda text, _: text.split("\n\n"))
+    monkeypatch.setattr(chunked_generation, "count_tokens", lambda text: len(text.split()))
+    monkeypatch.setattr(chunked_generation, "system_prompt_tokens", lambda _: 100)
+    monkeypatch.setattr(chunked_generation, "generate_quiz", fake_generate_quiz)
+    source = "\n\n".join(f"Question {i}: is {i} even?" for i in range(6))
+    input_data = {"source_material": source, "file_intent": "existing_quiz", "num_questions": 1}
+
+    resp = asyncio.run(generate_quiz_chunked(input_data, RequestContext(request_id="t")))
+
+    assert calls == [None] * 6
+    assert _questions(resp) == [f"Question {i}: is {i} even?" for i in range(6)]
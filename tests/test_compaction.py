@@ -0,0 +1,65 @@
+from app.utils.compaction import compact_text
+from app.utils.extractors import PAGE_SEPARATOR
+
+
+def _pages(*pages):
+    return PAGE_SEPARATOR.join(pages)
+
+
+def _page(n, header="Biology 101 - Unit 3"):
+    return (
+        f"{header}\n"
+        f"Definition: photosynthesis ({n})\nPlants turn light into sugar, lesson {n}.\n\n"
+        f"Definition: respiration ({n})\nCells release the energy again, lesson {n}.\n\n"
+        f"Page {n} of 5"
+    )
+
+
+def test_page_numbers_in_their_own_paragraph_are_removed():
+    text, stats = compact_text(_pages(*(_page(n) for n in range(1, 6))))
+    assert stats.page_numbers_removed == 5
+    assert "Page" not in text
+
+
+def test_repeated_header_is_kept_once_and_body_lines_are_untouched():
+    text, stats = compact_text(_pages(*(_page(n) for n in range(1, 6))))
+    assert stats.boilerplate_lines_removed == 4
+    assert text.count("Biology 101 - Unit 3") == 1
+    # Every paragraph starts with "Definition:", but only page edges are boilerplate
+    assert text.count("Definition:") == 10
+
+
+def test_paragraph_edges_are_not_page_edges():
+    # No page breaks: one page, so repeated first lines of paragraphs stay
+    paragraphs = [f"Definition:\nTerm number {n} means something else." for n in range(5)]
+    text, stats = compact_text("\n\n".join(paragraphs))
+    assert text.count("Definition:") == 5
+    assert stats.boilerplate_lines_removed == 0
+
+
+def test_near_duplicate_paragraphs_are_dropped():
+    note = "Remember: the Calvin cycle fixes carbon dioxide into glucose in the stroma"
+    text, stats = compact_text(_pages(
+        f"Intro\n\n{note}.\n\nEnd",
+        f"Intro 2\n\n{note}!\n\nEnd 2",
+        "Something different entirely about light reactions.",
+    ))
+    assert stats.duplicate_paragraphs_removed == 1
+    assert text.count("Calvin cycle") == 1
+
+
+def test_whitespace_only_keeps_every_line():
+    quiz = _pages(
+        "1.  What is   ATP?\r\n\r\nPage 1",
+        "2.\tWhat is NADPH?   \n\nPage 1",
+        "2.\tWhat is NADPH?",
+    )
+    text, stats = compact_text(quiz, whitespace_only=True)
+    assert text == "1. What is ATP?\n\nPage 1\n\n2. What is NADPH?\n\nPage 1\n\n2. What is NADPH?"
+    assert (stats.page_numbers_removed, stats.boilerplate_lines_removed, stats.duplicate_paragraphs_removed) == (0, 0, 0)
+
+
+def test_output_has_no_page_breaks():
+    text, _ = compact_text(_pages("First page\nbody\nend", "Second page\nbody two\nend two"))
+    assert "\f" not in text
+    assert text == "First page\nbody\nend\n\nSecond page\nbody two\nend two"
@@ -0,0 +1,82 @@
+import pytest
+from rapidfuzz import fuzz
+
+from app.services.evaluate import build_rubric
+from app.utils import evaluation_logic
+from app.utils.evaluation_logic import (
+    KeywordMatcher, keyword_matcher, score_keywords, score_keywords_batch, score_similarity, score_similarity_batch,
+)
+
+QUESTION = {
+    "type": "essay",
+    "question": "Explain photosynthesis.",
+    "explanation": "Photosynthesis converts light energy into chemical energy stored in glucose, via the Calvin cycle.",
+    "keywords": ["chlorophyll", "glucose", "Calvin cycle", "light-dependent reactions"],
+}
+
+ANSWERS = [
+    "Chlorophyll absorbs light; the light dependent reactions feed the Calvin-cycle, which makes glucose.",
+    "Plants make glucose using chlorophyl and sunlight.",   # misspelled keyword
+    "The cycle of Calvin happens somewhere in the leaf.",   # phrase words out of order
+    "The French Revolution began in 1789.",
+    "",
+]
+
+
+@pytest.mark.parametrize("engine", ["fuzz", "vector"])
+@pytest.mark.parametrize("question", [QUESTION, build_rubric(QUESTION)], ids=["inline", "rubric"])
+def test_batch_scores_equal_per_answer_scores(monkeypatch, engine, question):
+    monkeypatch.setattr(evaluation_logic, "SIMILARITY_ENGINE", engine)
+
+    assert score_keywords_batch(question, ANSWERS) == [score_keywords(question, a) for a in ANSWERS]
+    assert score_similarity_batch(question, ANSWERS) == [score_similarity(question, a) for a in ANSWERS]
+
+
+@pytest.fixture
+def fuzzy_lookups(monkeypatch):
+    """Words that went past the exact-match fast path to the fuzzy search."""
+    looked_up = []
+    word_found = KeywordMatcher._word_found
+
+    def recording(self, word, tokens):
+        looked_up.append(word)
+        return word_found(self, word, tokens)
+
+    monkeypatch.setattr(KeywordMatcher, "_word_found", recording)
+    return looked_up
+
+
+def test_exact_token_hits_skip_the_fuzzy_search(fuzzy_lookups):
+    matcher = KeywordMatcher(["glucose", "stroma"])
+    assert matcher.count_words(["glucose", "stroma", "glucose"]) == 2
+    assert fuzzy_lookups == []
+
+    assert matcher.count_words(["glucose", "strama"]) == 2
+    assert fuzzy_lookups == ["stroma"]
+
+
+def test_phrases_match_across_punctuation_but_not_out_of_order():
+    matcher = KeywordMatcher(["Calvin cycle"])
+    assert matcher.phrases == ["calvin cycle"] and matcher.words == []
+    assert matcher.count_phrases("Sugar is built in the Calvin-cycle.") == 1
+    assert matcher.count_phrases("calvin cycle") == 1
+    assert matcher.count_phrases("it is a cycle calvin described") == 0
+    # A response shorter than the phrase is compared whole, not aligned inside it
+    assert matcher.count_phrases("Calvin") == 0
+
+
+@pytest.mark.parametrize("threshold, found", [(85, 1), (86, 0)])
+def test_word_counts_only_above_the_threshold(fuzzy_lookups, threshold, found):
+    # partial_ratio("glucose", "glucoze") is 85.7
+    assert KeywordMatcher(["glucose"], threshold=threshold).count_words(["glucoze"]) == found
+
+
+def test_a_score_equal_to_the_threshold_does_not_count():
+    # score_cutoff lets 80 through; the keyword still needs to beat the threshold
+    assert fuzz.partial_ratio("abcde", "abxde") == 80
+    assert KeywordMatcher(["abcde"], threshold=80).count_words(["abxde"]) == 0
+
+
+def test_keyword_matcher_is_compiled_once_per_keyword_list():
+    assert keyword_matcher(("glucose", "Calvin cycle")) is keyword_matcher(("glucose", "Calvin cycle"))
+    assert keyword_matcher(("glucose",)).score("Glucose is a sugar") == 10.0
@@ -0,0 +1,45 @@
+import zipfile
+
+import pytest
+
+from app.utils import file_parser, tokenizer
+from app.utils.extractors import FastExtractorFailed, open_document
+
+_W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+
+
+def _docx(path, body_xml: str) -> str:
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr("word/document.xml", f'<w:document xmlns:w="{_W_NS}"><w:body>{body_xml}')
+    return str(path)
+
+
+def _paragraphs(*texts) -> str:
+    return "".join(f"<w:p><w:r><w:t>{t}</w:t></w:r></w:p>" for t in texts)
+
+
+def test_docx_is_read_by_the_fast_extractor(tmp_path):
+    path = _docx(tmp_path / "ok.docx", _paragraphs("First", "Second") + "</w:body></w:document>")
+    name, pieces = open_document(path)
+    assert name == "extract_docx"
+    assert "".join(pieces) == "First\n\nSecond"
+
+
+def test_failure_after_the_first_piece_raises_fast_extractor_failed(tmp_path):
+    # Valid paragraphs, then broken XML further into the document
+    path = _docx(tmp_path / "broken.docx", _paragraphs("First", "Second") + "<w:p><w:r><w:t>oops</w:p>")
+    name, pieces = open_document(path)
+    assert name == "extract_docx"
+    with pytest.raises(FastExtractorFailed):
+        list(pieces)
+
+
+def test_extraction_restarts_on_the_fallback(tmp_path, monkeypatch):
+    path = _docx(tmp_path / "broken.docx", _paragraphs("First", "Second") + "<w:p><w:r><w:t>oops</w:p>")
+    monkeypatch.setattr(file_parser, "open_fallback", lambda p: ("extract_unstructured", iter(["All ", "pages"])))
+    monkeypatch.setattr(tokenizer, "count_tokens", lambda text, encoding=None: len(text.split()))
+
+    text, budget, extractor = file_parser._extract_text(path, max_tokens=1_000)
+
+    assert (text, extractor) == ("All pages", "extract_unstructured")
+    assert budget.pieces == 2  # the fast extractor's partial pieces are not counted
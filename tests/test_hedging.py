@@ -0,0 +1,117 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.utils import quiz_engine
+from app.utils.latency import LatencyTracker
+from app.utils.model_scheduler import ModelLimits, ModelScheduler
+from app.utils.request_context import RequestContext
+
+ESTIMATE = 1_000
+HEDGE_DELAY_S = 0.05
+VALID = json.dumps({"quizzes": [{"type": "tf", "question": "Is water wet?", "answer": True}]})
+INVALID = json.dumps({"quizzes": [{"type": "tf", "question": "Is fire cold?", "answer": "perhaps"}]})
+
+
+class FakeLLM:
+    """ainvoke() answers `content` (or raises it) after `delay` seconds."""
+
+    def __init__(self, model, delay, content, log):
+        self.model = model
+        self.delay = delay
+        self.content = content
+        self.log = log
+
+    async def ainvoke(self, messages):
+        self.log.append(("start", self.model))
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.log.append(("cancelled", self.model))
+            raise
+        if isinstance(self.content, Exception):
+            raise self.content
+        return SimpleNamespace(content=self.content, response_metadata={"token_usage": {"total_tokens": ESTIMATE}})
+
+
+@pytest.fixture
+def hedge_env(monkeypatch):
+    """Two models, hedging on after HEDGE_DELAY_S; `hedge_env.replies[model] = (delay, content)`."""
+    limits = {m: ModelLimits(8_192, 10 * ESTIMATE, None, 30) for m in ("model-a", "model-b")}
+    env = SimpleNamespace(scheduler=ModelScheduler(limits, list(limits)), replies={}, log=[])
+
+    monkeypatch.setattr(quiz_engine, "scheduler", env.scheduler)
+    monkeypatch.setattr(quiz_engine, "latency_tracker", LatencyTracker())
+    monkeypatch.setattr(quiz_engine, "HEDGE_ENABLED", True)
+    monkeypatch.setattr(quiz_engine, "HEDGE_DEFAULT_DELAY_S", HEDGE_DELAY_S)
+    monkeypatch.setattr(quiz_engine, "_get_llm", lambda model: (FakeLLM(model, *env.replies[model], env.log), model))
+    return env
+
+
+def _hedged(env):
+    ctx = RequestContext(request_id="r")
+
+    async def scenario():
+        try:
+            return await quiz_engine._hedged_attempt([], ESTIMATE, ctx)
+        finally:
+            # Checked before the loop runs again: losers must already be released
+            env.reserved = dict(env.scheduler._reserved)
+
+    return asyncio.run(scenario()), ctx.logs
+
+
+def _assert_nothing_reserved(env):
+    assert env.reserved == {"model-a": 0, "model-b": 0}
+
+
+def test_hedge_wins_and_primary_is_cancelled(hedge_env):
+    hedge_env.replies = {"model-a": (5, VALID), "model-b": (0, VALID)}
+    result, logs = _hedged(hedge_env)
+
+    assert result.model == "model-b" and result.schema_valid
+    assert logs["hedged"] is True and logs["hedge_won"] is True
+    assert ("cancelled", "model-a") in hedge_env.log
+    assert quiz_engine.latency_tracker.snapshot()["model-b"]["hedge_wins"] == 1
+    _assert_nothing_reserved(hedge_env)
+
+
+def test_fast_primary_sends_no_hedge(hedge_env):
+    hedge_env.replies = {"model-a": (0, VALID), "model-b": (0, VALID)}
+    result, logs = _hedged(hedge_env)
+
+    assert result.model == "model-a"
+    assert "hedged" not in logs
+    assert hedge_env.log == [("start", "model-a")]
+    _assert_nothing_reserved(hedge_env)
+
+
+def test_both_invalid_returns_the_first_answer(hedge_env):
+    hedge_env.replies = {"model-a": (0.2, INVALID), "model-b": (0, INVALID)}
+    result, logs = _hedged(hedge_env)
+
+    assert result.model == "model-b" and not result.schema_valid
+    assert logs["hedge_won"] is True
+    # Nothing is cancelled: the primary had to finish to know neither is valid
+    assert ("cancelled", "model-a") not in hedge_env.log
+    _assert_nothing_reserved(hedge_env)
+
+
+def test_failed_hedge_falls_back_to_the_primary(hedge_env):
+    hedge_env.replies = {"model-a": (0.2, VALID), "model-b": (0, RuntimeError("connection reset"))}
+    result, logs = _hedged(hedge_env)
+
+    assert result.model == "model-a" and result.schema_valid
+    assert logs["hedge_won"] is False
+    _assert_nothing_reserved(hedge_env)
+
+
+def test_both_failing_raises_the_first_error(hedge_env):
+    hedge_env.replies = {"model-a": (0.2, RuntimeError("timeout")), "model-b": (0, RuntimeError("connection reset"))}
+    with pytest.raises(quiz_engine.HTTPException) as exc:
+        _hedged(hedge_env)
+
+    assert exc.value.status_code == 502 and "connection reset" in exc.value.detail
+    _assert_nothing_reserved(hedge_env)
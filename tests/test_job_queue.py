@@ -0,0 +1,76 @@
+import asyncio
+import threading
+
+from app.utils.job_queue import JOB_FAILED, JOB_QUEUED, JOB_SUCCEEDED, JobQueue, JobStore
+
+
+class RecordingStore(JobStore):
+    """JobStore that records which threads the queue calls it from, and can fail one job's read."""
+
+    def __init__(self, db_path):
+        super().__init__(db_path)
+        self.threads = set()
+        self.fail_get_for = None
+
+    def get(self, job_id):
+        self.threads.add(threading.get_ident())
+        if job_id == self.fail_get_for:
+            self.fail_get_for = None
+            raise RuntimeError("database is locked")
+        return super().get(job_id)
+
+    def requeue_unfinished(self):
+        self.threads.add(threading.get_ident())
+        return super().requeue_unfinished()
+
+
+async def _handler(job):
+    if job["params"].get("fail"):
+        raise ValueError("bad input")
+    return {"echo": job["params"]["n"]}
+
+
+def _run_queue(store):
+    """Start a one-worker queue on the jobs already in `store` and wait until it is idle."""
+    async def scenario():
+        queue = JobQueue(store, _handler, workers=1, max_depth=0)
+        await queue.start()
+        await asyncio.wait_for(queue._queue.join(), timeout=5)
+        await queue.stop()
+        return queue, threading.get_ident()
+
+    return asyncio.run(scenario())
+
+
+def _store(tmp_path, *job_params):
+    store = RecordingStore(str(tmp_path / "jobs.sqlite3"))
+    ids = [store.create("req", params)["id"] for params in job_params]
+    store.threads.clear()
+    return store, ids
+
+
+def test_jobs_finish_with_result_or_mapped_error(tmp_path):
+    store, (ok, bad) = _store(tmp_path, {"n": 1}, {"n": 2, "fail": True})
+    queue, _ = _run_queue(store)
+
+    assert store.get(ok)["status"] == JOB_SUCCEEDED
+    assert store.get(ok)["result"] == {"echo": 1}
+    assert store.get(bad)["status"] == JOB_FAILED
+    assert store.get(bad)["error"] == {"detail": "bad input"}
+    assert (queue.succeeded, queue.failed) == (1, 1)
+
+
+def test_store_calls_run_off_the_event_loop(tmp_path):
+    store, _ = _store(tmp_path, {"n": 1})
+    _, loop_thread = _run_queue(store)
+    assert store.threads and loop_thread not in store.threads
+
+
+def test_store_error_fails_the_job_but_not_the_worker(tmp_path):
+    store, (first, second) = _store(tmp_path, {"n": 1}, {"n": 2})
+    store.fail_get_for = first
+    queue, _ = _run_queue(store)
+
+    assert store.get(first)["status"] == JOB_QUEUED  # left as recorded; re-run after a restart
+    assert store.get(second)["status"] == JOB_SUCCEEDED
+    assert (queue.succeeded, queue.failed) == (1, 1)
@@ -0,0 +1,153 @@
+from app.utils.model_scheduler import DEFAULT_COOLDOWN_S, WINDOW_S, ModelLimits, ModelScheduler
+from app.utils.quiz_engine import MODEL_LIMITS, SUPPORTED_GROQ_MODELS
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000.0
+
+    def __call__(self):
+        return self.now
+
+
+LIMITS = {
+    "small":   ModelLimits(4_096,   6_000, 100_000, 15),
+    "big":     ModelLimits(16_384, 30_000, 500_000, 35),
+    "agentic": ModelLimits(4_096,  70_000, None,    25),
+}
+
+
+def _scheduler(preference=("big", "small", "agentic")):
+    clock = FakeClock()
+    return ModelScheduler(LIMITS, preference, clock=clock), clock
+
+
+def test_idle_scheduler_follows_preference_order():
+    sched = ModelScheduler(MODEL_LIMITS, SUPPORTED_GROQ_MODELS)
+    assert sched.pick(2_000) == SUPPORTED_GROQ_MODELS[0]
+
+
+def test_headroom_is_relative_to_each_models_limits():
+    sched, _ = _scheduler()
+    # "big" has 20k of 30k TPM left (67%); raw room is still far above "small"'s 6k
+    sched.release("big", 0, 10_000)
+    assert sched.pick(1_000) == "small"  # ties with "agentic" at 100%; preference decides
+    sched.release("small", 0, 3_000)
+    assert sched.pick(1_000) == "agentic"
+    # 35k of 70k used is 50% left, less than "big"'s 67% despite more raw room
+    sched.release("agentic", 0, 35_000)
+    assert sched.pick(1_000) == "big"
+
+
+def test_max_questions_filters_candidates():
+    sched, _ = _scheduler(preference=("small", "agentic", "big"))
+    assert sched.pick(1_000, num_questions=10) == "small"
+    assert sched.pick(1_000, num_questions=30) == "big"
+    # Nothing allows 50 questions: fall back to the model allowing the most
+    assert sched.pick(1_000, num_questions=50) == "big"
+    assert sched.pick(1_000, exclude={"big"}, num_questions=30) == "agentic"
+
+
+def test_context_window_too_small_is_last_resort():
+    sched, _ = _scheduler()
+    assert sched.pick(8_000) == "big"
+    # Neither window holds 8k; the largest one with quota left is used
+    assert sched.pick(8_000, exclude={"big"}) == "agentic"
+    assert sched.pick(8_000, exclude={"big", "agentic"}) is None  # "small" has only 6k TPM
+
+
+def test_reserve_and_release_book_usage():
+    sched, clock = _scheduler()
+    sched.reserve("small", 5_000)
+    assert not sched.has_headroom("small", 2_000)
+    assert sched.pick(2_000, exclude={"big", "agentic"}) is None
+
+    sched.release("small", 5_000, used_tokens=4_500)
+    models = sched.snapshot()["models"]
+    assert models["small"]["reserved_tokens"] == 0
+    assert models["small"]["minute_tokens_used"] == 4_500
+    assert models["small"]["day_tokens_used"] == 4_500
+    assert models["small"]["calls"] == 1
+    assert not sched.has_headroom("small", 2_000)
+
+    # Minute usage slides out of the window; daily usage stays
+    clock.now += WINDOW_S
+    assert sched.has_headroom("small", 2_000)
+    assert sched.snapshot()["models"]["small"]["day_tokens_used"] == 4_500
+
+
+def test_release_without_usage_only_drops_the_reservation():
+    sched, _ = _scheduler()
+    sched.reserve("big", 20_000)
+    sched.release("big", 20_000)
+    models = sched.snapshot()["models"]
+    assert models["big"]["reserved_tokens"] == 0
+    assert models["big"]["minute_tokens_used"] == 0
+
+
+def test_rate_limited_model_sits_out_its_cooldown():
+    sched, clock = _scheduler()
+    sched.mark_rate_limited("big", 30)
+    assert sched.pick(1_000) != "big"
+    assert not sched.has_headroom("big", 1_000)
+    assert sched.seconds_until_available() == 1  # other models are still available
+
+    clock.now += 30
+    assert sched.has_headroom("big", 1_000)
+    assert sched.snapshot()["models"]["big"]["rate_limited"] == 1
+
+
+def test_rate_limit_without_retry_after_uses_default_cooldown():
+    sched, clock = _scheduler()
+    for model in LIMITS:
+        sched.mark_rate_limited(model)
+    assert sched.pick(1_000) is None
+    assert sched.seconds_until_available() == int(DEFAULT_COOLDOWN_S) + 1
+    clock.now += DEFAULT_COOLDOWN_S
+    assert sched.pick(1_000) == "big"
+
+
+def test_unavailable_model_is_never_picked():
+    sched, _ = _scheduler()
+    sched.mark_unavailable("big")
+    assert sched.pick(1_000, exclude={"small", "agentic"}) is None
+    assert not sched.has_headroom("big", 1)
+
+
+def test_wait_for_minute_quota_follows_the_oldest_usage():
+    clock = FakeClock()
+    sched = ModelScheduler({"small": LIMITS["small"]}, ["small"], clock=clock)
+    sched.release("small", 0, 2_000)
+    clock.now += 10
+    sched.release("small", 0, 3_000)
+    clock.now += 10
+    assert sched.pick(2_000) is None  # 1k of 6k TPM left
+
+    # The first 2k leave the window 40 s from now, which is enough
+    assert sched.seconds_until_available(2_000) == 41
+    # 5k more only fits once both entries are gone
+    assert sched.seconds_until_available(5_500) == 51
+    clock.now += 40
+    assert sched.pick(2_000) == "small"
+
+
+def test_wait_for_day_quota_is_the_utc_rollover():
+    day = 86_400.0
+    clock = FakeClock()
+    clock.now = 20 * day - 3_600  # one hour before midnight UTC
+    sched = ModelScheduler({"m": ModelLimits(8_192, 6_000, 10_000, 30)}, ["m"], clock=clock)
+    sched.release("m", 0, 5_000)
+    clock.now += WINDOW_S
+    sched.release("m", 0, 4_500)
+    clock.now += WINDOW_S
+    assert sched.pick(1_000) is None  # minute window is clear, day budget is not
+
+    assert sched.seconds_until_available(1_000) == 3_600 - 2 * int(WINDOW_S) + 1
+    clock.now = 20 * day + 1
+    assert sched.pick(1_000) == "m"
+    assert sched.snapshot()["models"]["m"]["day_tokens_used"] == 0
+
+
+def test_no_wait_when_the_call_can_never_fit():
+    sched, _ = _scheduler()
+    assert sched.seconds_until_available(80_000) is None  # above every TPM limit
@@ -0,0 +1,72 @@
+import asyncio
+import time
+
+import pytest
+
+from app.utils.process_pool import BoundedProcessPool, PoolTimeout
+from app.utils.tokenizer import TokenBudgetExceeded
+
+
+# Module-level so spawned workers can unpickle them
+def _sleep_and_return(seconds: float, value):
+    time.sleep(seconds)
+    return value
+
+
+def _over_budget():
+    raise TokenBudgetExceeded(11, 10)
+
+
+def _crash():
+    raise RuntimeError("parser bug")
+
+
+def _pool(**kwargs):
+    kwargs = {"max_workers": 2, "max_tasks_per_child": 0, "timeout_s": 4, **kwargs}
+    return BoundedProcessPool(**kwargs)
+
+
+def test_timeout_does_not_fail_jobs_running_alongside():
+    pool = _pool(max_concurrent=5)
+
+    async def scenario():
+        # Spawn both workers first so startup time doesn't count against the timeout
+        await asyncio.gather(*(pool.run(_sleep_and_return, 0.5, "warm") for _ in range(2)))
+        stuck = asyncio.ensure_future(pool.run(_sleep_and_return, 60, "stuck"))
+        await asyncio.sleep(2.5)
+        # Still running / still queued when the stuck job's executor is torn down
+        running = asyncio.ensure_future(pool.run(_sleep_and_return, 2, "running"))
+        queued = [asyncio.ensure_future(pool.run(_sleep_and_return, 0.1, f"queued{i}")) for i in range(3)]
+        return await asyncio.gather(stuck, running, *queued, return_exceptions=True)
+
+    try:
+        stuck, running, *queued = asyncio.run(scenario())
+    finally:
+        pool.shutdown()
+
+    assert isinstance(stuck, PoolTimeout)
+    assert running == "running"
+    assert queued == ["queued0", "queued1", "queued2"]
+    stats = pool.stats()
+    assert stats["timeouts"] == 1
+    assert stats["failed"] == 0
+    assert stats["resubmitted"] >= 1
+
+
+def test_expected_errors_are_not_counted_as_failures():
+    pool = _pool(expected_errors=(TokenBudgetExceeded,))
+
+    async def scenario():
+        with pytest.raises(TokenBudgetExceeded):
+            await pool.run(_over_budget)
+        with pytest.raises(RuntimeError):
+            await pool.run(_crash)
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        pool.shutdown()
+
+    stats = pool.stats()
+    assert stats["expected_errors"] == 1
+    assert stats["failed"] == 1
@@ -0,0 +1,86 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.utils import quiz_engine
+from app.utils.quiz_repair import extract_repaired_items
+from app.utils.request_context import RequestContext
+
+
+def _tf(question, answer=True):
+    return {"type": "tf", "question": question, "answer": answer}
+
+
+ITEMS = [_tf("Is water wet?"), _tf("Is fire cold?", answer="perhaps"), _tf("Is ice solid?")]
+
+
+@pytest.fixture
+def repair_calls(monkeypatch):
+    """Stub _invoke: answers every repair prompt with `repair_calls.reply`; prompts are recorded."""
+    calls = SimpleNamespace(reply={"items": []}, prompts=[])
+
+    async def invoke(messages, estimate, ctx, preferred_model=None):
+        calls.prompts.append(messages[-1].content)
+        return SimpleNamespace(content=json.dumps(calls.reply)), "model-a", 0.1, {}
+
+    monkeypatch.setattr(quiz_engine, "_invoke", invoke)
+    monkeypatch.setattr(quiz_engine, "count_tokens", lambda text, encoding=None: len(text.split()))
+    return calls
+
+
+def _repair(items, **input_data):
+    ctx = RequestContext(request_id="r")
+    result = asyncio.run(quiz_engine._validate_and_repair(items, input_data, ctx))
+    return result, ctx.logs
+
+
+def test_repaired_item_is_merged_back_at_its_index(repair_calls):
+    repair_calls.reply = {"items": [{"index": 1, "item": _tf("Is fire cold?", answer=False)}]}
+    result, logs = _repair(ITEMS, num_questions=3)
+
+    assert [q.question for q in result] == ["Is water wet?", "Is fire cold?", "Is ice solid?"]
+    assert result[1].answer is False
+    assert (logs["items_invalid"], logs["items_repaired"]) == (1, 1)
+    # Only the broken item is sent back
+    assert len(repair_calls.prompts) == 1
+    assert "Is fire cold?" in repair_calls.prompts[0] and "Is water wet?" not in repair_calls.prompts[0]
+
+
+def test_unrepaired_item_is_dropped_when_enough_remain(repair_calls):
+    result, logs = _repair(ITEMS, num_questions=2)
+    assert [q.question for q in result] == ["Is water wet?", "Is ice solid?"]
+    assert logs["items_dropped"] == 1
+
+
+def test_too_few_items_left_needs_a_full_regeneration(repair_calls):
+    result, _ = _repair(ITEMS, num_questions=3)
+    assert result is None
+
+
+def test_existing_quiz_is_never_shortened(repair_calls):
+    result, logs = _repair(ITEMS, num_questions=1, file_intent="existing_quiz")
+    assert result is None
+    assert logs["items_unrepaired"] == 1
+
+
+def test_nothing_valid_skips_the_repair_call(repair_calls):
+    result, _ = _repair([_tf("Is fire cold?", answer="perhaps")], num_questions=1)
+    assert result is None
+    assert repair_calls.prompts == []
+
+
+def test_extract_repaired_items_ignores_malformed_entries():
+    payload = {"items": [
+        {"index": 0, "item": _tf("ok")},
+        {"index": "1", "item": _tf("string index")},
+        {"index": True, "item": _tf("bool index")},
+        {"index": 2},
+        "not an entry",
+        {"index": 3, "item": None},
+    ]}
+    assert extract_repaired_items(payload) == [(0, _tf("ok")), (3, None)]
+    assert extract_repaired_items([{"index": 4, "item": {}}]) == [(4, {})]
+    assert extract_repaired_items({"items": "nope"}) == []
+    assert extract_repaired_items(None) == []
@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from pydantic import ValidationError
+
+from app.models.schema import SubjectiveEvaluationRequest
+from app.routes import evaluate as evaluate_route
+from app.services.evaluate import build_rubric
+from app.services.generate import _rubrics
+from app.utils.quiz_store import QuizStore
+
+QUIZZES = [
+    {"type": "mcq", "question": "Where does the Calvin cycle run?", "choices": ["Stroma", "Nucleus"], "answer": "Stroma"},
+    {"type": "fitb", "question": "Carbon is fixed in the ___.", "explanation": "  The Calvin cycle   runs in the stroma. ",
+     "keywords": ["Calvin cycle", "Stroma", "stroma"]},
+    {"type": "essay", "question": "Explain photosynthesis.", "explanation": "Light is turned into sugar.", "keywords": None},
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return QuizStore(str(tmp_path / "quizzes.sqlite3"), ttl_s=3600)
+
+
+def test_save_and_get_round_trip(store):
+    rubrics = _rubrics(QUIZZES)
+    quiz_id = store.save("req-1", QUIZZES, rubrics)
+
+    stored = store.get(quiz_id)
+    assert stored["request_id"] == "req-1"
+    assert stored["quizzes"] == QUIZZES
+    assert stored["rubrics"] == rubrics  # int keys survive the JSON round trip
+    assert store.get("missing") is None
+    assert (store.saved, store.hits, store.misses) == (1, 1, 1)
+
+
+def test_disabled_store_saves_nothing(tmp_path):
+    store = QuizStore(str(tmp_path / "quizzes.sqlite3"), ttl_s=3600, enabled=False)
+    assert store.save("req-1", QUIZZES, {}) is None
+    assert store.stats()["stored"] == 0
+
+
+def test_purge_removes_only_expired_quizzes(store):
+    old = store.save("old", QUIZZES, {})
+    new = store.save("new", QUIZZES, {})
+    store._get_db().execute("UPDATE quizzes SET created_at = created_at - 7200 WHERE id = ?", (old,))
+
+    assert store.purge_expired() == 1
+    assert store.get(old) is None
+    assert store.get(new) is not None
+
+
+def test_build_rubric_precomputes_what_scoring_needs():
+    rubric = build_rubric(QUIZZES[1])
+    assert rubric["explanation"] == "the calvin cycle runs in the stroma."
+    assert rubric["keywords"] == ["calvin cycle", "stroma"]
+    assert rubric["explanation_tokens"] == ["calvin", "cycle", "runs", "stroma"]
+    assert (rubric["keyword_words"], rubric["keyword_phrases"]) == (["stroma"], ["calvin cycle"])
+
+
+def test_build_rubric_rejects_items_that_cannot_be_scored():
+    with pytest.raises(ValueError):
+        build_rubric({"type": "fitb", "question": "A ___ question", "keywords": []})
+    with pytest.raises(ValueError):
+        build_rubric(QUIZZES[0])
+    assert sorted(_rubrics(QUIZZES)) == [1, 2]
+
+
+@pytest.mark.parametrize("fields, message", [
+    ({}, "Provide `question`, or `quiz_id` with `question_index`"),
+    ({"quiz_id": "q", "question_index": 0, "question": {"type": "essay", "question": "Why?", "keywords": None}},
+     "not both"),
+    ({"quiz_id": "q"}, "go together"),
+])
+def test_request_needs_exactly_one_question_source(fields, message):
+    with pytest.raises(ValidationError, match=message):
+        SubjectiveEvaluationRequest(requestId="r", user_answer="a", **fields)
+
+
+@pytest.fixture
+def stored_quiz(store, monkeypatch):
+    async def run_inline(fn, *args):
+        return fn(*args)
+
+    monkeypatch.setattr(evaluate_route, "quiz_store", store)
+    monkeypatch.setattr(evaluate_route, "run_evaluation", run_inline)
+    return store.save("req-1", QUIZZES, _rubrics(QUIZZES))
+
+
+def _evaluate(quiz_id, question_index, answer="The Calvin cycle runs in the stroma"):
+    payload = SubjectiveEvaluationRequest(requestId="r", user_answer=answer, quiz_id=quiz_id, question_index=question_index)
+    return asyncio.run(evaluate_route.evaluate_subjective_answer(payload))
+
+
+def test_evaluate_by_quiz_id_matches_the_inline_question(stored_quiz):
+    by_id = _evaluate(stored_quiz, 1)
+    inline = SubjectiveEvaluationRequest(requestId="r", user_answer="The Calvin cycle runs in the stroma", question=QUIZZES[1])
+    expected = asyncio.run(evaluate_route.evaluate_subjective_answer(inline))
+
+    assert by_id["keyword"] == 10.0
+    assert {k: v for k, v in by_id.items() if k != "time_taken"} == {k: v for k, v in expected.items() if k != "time_taken"}
+
+
+@pytest.mark.parametrize("question_index, detail", [(0, "Only essay and fill-in-the-blank"), (3, "out of range")])
+def test_evaluate_by_quiz_id_rejects_unscorable_indexes(stored_quiz, question_index, detail):
+    with pytest.raises(HTTPException) as exc:
+        _evaluate(stored_quiz, question_index)
+    assert exc.value.status_code == 422
+    assert detail in exc.value.detail
+
+
+def test_evaluate_unknown_quiz_id_is_not_found(stored_quiz):
+    with pytest.raises(HTTPException) as exc:
+        _evaluate("expired", 0)
+    assert exc.value.status_code == 404
@@ -0,0 +1,98 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.utils import quiz_engine
+from app.utils.model_scheduler import ModelLimits, ModelScheduler
+from app.utils.request_context import RequestContext
+
+ESTIMATE = 4_000
+PAYLOAD = json.dumps({"quizzes": [
+    {"type": "tf", "question": "Is water wet?", "answer": True},
+    {"type": "tf", "question": "Is fire cold?", "answer": False},
+]})
+
+
+class FakeLLM:
+    """astream() yields PAYLOAD in small chunks once `release` is set."""
+
+    def __init__(self, model, release: asyncio.Event, log: list):
+        self.model = model
+        self.release = release
+        self.log = log
+
+    async def astream(self, messages):
+        self.log.append(("open", self.model))
+        try:
+            await self.release.wait()
+            for i in range(0, len(PAYLOAD), 20):
+                yield SimpleNamespace(content=PAYLOAD[i:i + 20], usage_metadata=None)
+                await asyncio.sleep(0)
+        finally:
+            self.log.append(("closed", self.model))
+
+
+@pytest.fixture
+def stream_env(monkeypatch):
+    # Each model has room for exactly one call of ESTIMATE tokens
+    limits = {m: ModelLimits(8_192, ESTIMATE, None, 30) for m in ("model-a", "model-b")}
+    scheduler = ModelScheduler(limits, list(limits))
+    release = asyncio.Event()
+    log: list = []
+
+    def build_messages(input_data, ctx=None):
+        ctx.set_log(system_prompt_tokens=100, user_prompt_tokens=100)
+        return [SimpleNamespace(type="human", content=input_data["user_additional_instructions"])]
+
+    async def no_cache(cache_key, ctx):
+        return None
+
+    monkeypatch.setattr(quiz_engine, "scheduler", scheduler)
+    monkeypatch.setattr(quiz_engine, "_build_messages", build_messages)
+    monkeypatch.setattr(quiz_engine, "_get_cached_response", no_cache)
+    monkeypatch.setattr(quiz_engine, "estimate_call_tokens", lambda *a, **k: ESTIMATE)
+    monkeypatch.setattr(quiz_engine, "_get_llm", lambda model: (FakeLLM(model, release, log), model))
+    monkeypatch.setattr(quiz_engine.generation_cache, "set", lambda *a, **k: None)
+    return SimpleNamespace(scheduler=scheduler, release=release, log=log)
+
+
+def _open(request_id):
+    ctx = RequestContext(request_id=request_id)
+    return quiz_engine.open_quiz_stream({"user_additional_instructions": request_id}, ctx)
+
+
+def test_concurrent_streams_reserve_before_the_first_chunk(stream_env):
+    async def scenario():
+        opening = [asyncio.ensure_future(_open(f"r{i}")) for i in range(2)]
+        await asyncio.sleep(0.05)  # both are waiting for their first chunk
+        stream_env.release.set()
+        streams = await asyncio.gather(*opening)
+        return [[e async for e in events] for events in streams]
+
+    results = asyncio.run(scenario())
+
+    opened = [model for kind, model in stream_env.log if kind == "open"]
+    assert sorted(opened) == ["model-a", "model-b"]
+    for events in results:
+        assert [e["event"] for e in events] == ["quiz", "quiz", "done"]
+    models = stream_env.scheduler.snapshot()["models"]
+    assert all(m["reserved_tokens"] == 0 for m in models.values())
+
+
+def test_consumer_leaving_early_closes_upstream_and_releases_quota(stream_env):
+    async def scenario():
+        stream_env.release.set()
+        events = await _open("r1")
+        first = await events.__anext__()
+        reserved = stream_env.scheduler.snapshot()["models"]["model-a"]["reserved_tokens"]
+        await events.aclose()  # what ClosingStreamingResponse does on disconnect
+        return first, reserved
+
+    first, reserved_while_streaming = asyncio.run(scenario())
+
+    assert first["event"] == "quiz"
+    assert reserved_while_streaming == ESTIMATE
+    assert ("closed", "model-a") in stream_env.log
+    assert stream_env.scheduler.snapshot()["models"]["model-a"]["reserved_tokens"] == 0
@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+from app.utils.single_flight import SingleFlight
+
+
+class Work:
+    """fn for SingleFlight.do: counts runs, blocks until `release`, records cancellation."""
+
+    def __init__(self, result="quiz", error=None):
+        self.result = result
+        self.error = error
+        self.release = asyncio.Event()
+        self.runs = 0
+        self.cancelled = False
+
+    async def __call__(self):
+        self.runs += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def test_concurrent_callers_share_one_execution():
+    async def scenario():
+        flights, work = SingleFlight(), Work()
+        calls = [asyncio.ensure_future(flights.do("k", work, owner=f"r{i}")) for i in range(3)]
+        await asyncio.sleep(0)
+        work.release.set()
+        return flights, work, await asyncio.gather(*calls)
+
+    flights, work, results = asyncio.run(scenario())
+
+    assert work.runs == 1
+    assert results == [("quiz", False, "r0"), ("quiz", True, "r0"), ("quiz", True, "r0")]
+    stats = flights.stats()
+    assert (stats["executions"], stats["coalesced"], stats["max_waiters"], stats["in_flight"]) == (1, 2, 3, 0)
+
+
+def test_exception_reaches_every_waiter_and_the_key_is_freed():
+    async def scenario():
+        flights, work = SingleFlight(), Work(error=RuntimeError("llm down"))
+        calls = [asyncio.ensure_future(flights.do("k", work)) for _ in range(2)]
+        await asyncio.sleep(0)
+        work.release.set()
+        outcomes = await asyncio.gather(*calls, return_exceptions=True)
+
+        retry = Work(result="second try")
+        retry.release.set()
+        return outcomes, await flights.do("k", retry)
+
+    outcomes, retried = asyncio.run(scenario())
+
+    assert all(isinstance(o, RuntimeError) and str(o) == "llm down" for o in outcomes)
+    assert retried == ("second try", False, None)
+
+
+def test_work_is_cancelled_when_the_last_waiter_leaves():
+    async def scenario():
+        flights, work = SingleFlight(), Work()
+        calls = [asyncio.ensure_future(flights.do("k", work)) for _ in range(2)]
+        await asyncio.sleep(0)
+
+        calls[0].cancel()
+        await asyncio.sleep(0)
+        still_running = not work.cancelled
+
+        calls[1].cancel()
+        await asyncio.gather(*calls, return_exceptions=True)
+        await asyncio.sleep(0)
+        # Checked before asyncio.run() cancels whatever is left over
+        return still_running, work.cancelled, flights.stats()["in_flight"]
+
+    still_running_with_one_waiter, cancelled, in_flight = asyncio.run(scenario())
+
+    assert still_running_with_one_waiter
+    assert cancelled
+    assert in_flight == 0
+
+
+def test_owner_disconnect_does_not_cancel_a_shared_waiter():
+    async def scenario():
+        flights, work = SingleFlight(), Work()
+        owner = asyncio.ensure_future(flights.do("k", work, owner="r0"))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flights.do("k", work, owner="r1"))
+        await asyncio.sleep(0)
+
+        owner.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await owner
+        work.release.set()
+        return work, await follower
+
+    work, result = asyncio.run(scenario())
+
+    assert work.runs == 1
+    assert not work.cancelled
+    assert result == ("quiz", True, "r0")
@@ -0,0 +1,82 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.services import generate
+from app.utils import source_budget
+from app.utils.request_context import RequestContext
+from app.utils.source_budget import combine_sources, fair_shares
+
+
+def _words(text, encoding=None):
+    return len(text.split())
+
+
+@pytest.fixture
+def word_tokens(monkeypatch):
+    """One token per word, so budgets are easy to reason about (and nothing downloads)."""
+    monkeypatch.setattr(source_budget, "count_tokens", _words)
+    monkeypatch.setattr(source_budget, "truncate_to_tokens", lambda text, n, encoding=None: " ".join(text.split()[:n]))
+    monkeypatch.setattr(generate, "count_tokens", _words)
+
+
+@pytest.mark.parametrize("sizes, budget, shares", [
+    ([10, 20], 100, [10, 20]),        # everything fits
+    ([10, 50, 50], 70, [10, 30, 30]),  # the small file keeps all; the rest split the remainder
+    ([40, 40], 50, [25, 25]),
+    ([5, 100, 7], 0, [0, 0, 0]),
+    ([30, 30, 30], 10, [3, 3, 4]),     # rounding leftovers go to the largest
+])
+def test_fair_shares(sizes, budget, shares):
+    assert fair_shares(sizes, budget) == shares
+    assert sum(shares) <= max(0, budget)
+
+
+def test_combine_sources_keeps_small_files_whole(word_tokens):
+    small = "one two three"
+    large = " ".join(f"w{i}" for i in range(40))
+    combined, kept = combine_sources([("a.txt", small), ("b.txt", large)], max_tokens=20)
+
+    # Headings take 2 tokens each: 16 left, 3 for a.txt, 13 for b.txt
+    assert kept == [3, 13]
+    assert combined == "### a.txt\n\none two three\n\n### b.txt\n\n" + " ".join(f"w{i}" for i in range(13))
+
+
+def test_combine_sources_drops_empty_documents(word_tokens):
+    combined, kept = combine_sources([("a.txt", ""), ("b.txt", "text")], max_tokens=10)
+    assert combined == "### b.txt\n\ntext"
+    assert kept == [0, 1]
+
+
+def _read_sources(monkeypatch, file_intent, texts, max_tokens):
+    async def read_source(file, ctx, limit):
+        ctx.set_log(tokens_extracted=_words(file.text), source_tokens_after=_words(file.text))
+        return file.text
+
+    monkeypatch.setattr(generate, "_read_source", read_source)
+    files = [SimpleNamespace(filename=f"quiz{i}.txt", text=t) for i, t in enumerate(texts)]
+    ctx = RequestContext(request_id="r", inputs={"file_intent": file_intent})
+    return asyncio.run(generate._read_sources(files, ctx, max_tokens)), ctx
+
+
+def test_study_material_is_truncated_to_fair_shares(word_tokens, monkeypatch):
+    texts = [" ".join(["q"] * 30)] * 2
+    combined, ctx = _read_sources(monkeypatch, "study_material", texts, max_tokens=40)
+    assert ctx.logs["files_truncated"] == 2
+    assert _words(combined) <= 40
+
+
+def test_existing_quizzes_that_do_not_fit_together_are_rejected(word_tokens, monkeypatch):
+    texts = [" ".join(["q"] * 30)] * 2  # each fits alone, not both
+    with pytest.raises(HTTPException) as exc:
+        _read_sources(monkeypatch, "existing_quiz", texts, max_tokens=40)
+    assert exc.value.status_code == 413
+
+
+def test_existing_quizzes_that_fit_are_kept_whole(word_tokens, monkeypatch):
+    texts = [" ".join(["q"] * 10)] * 2
+    combined, ctx = _read_sources(monkeypatch, "existing_quiz", texts, max_tokens=40)
+    assert ctx.logs["files_truncated"] == 0
+    assert combined.split().count("q") == 20
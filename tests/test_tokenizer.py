@@ -0,0 +1,69 @@
+# tests/test_tokenizer.py
+import os
+
+import pytest
+
+from app.services.evaluate import evaluate_subjective
+from app.utils import answer_text, evaluation_logic, vector_similarity
+from app.utils.answer_text import _regex_tokenize, tokenize_and_filter
+from app.utils.evaluation_logic import keyword_matcher
+from tests.tokenizer_corpus import KEYWORDS, QUESTION, filtered, reference_corpus
+
+# Same default as benchmarks/bench_tokenizer.py --tolerance
+TOLERANCE = 0.5
+
+PUNKT_MISSING = (
+    "NLTK punkt data is not installed; fetch it with "
+    "`python -m nltk.downloader -d app/nltk_data punkt_tab`"
+)
+
+
+@pytest.fixture(scope="module")
+def nltk_word_tokenize():
+    """nltk.word_tokenize, or skip when NLTK or its punkt data is not installed (never downloads)."""
+    nltk = pytest.importorskip(
+        "nltk", reason="nltk is not installed; `pip install -r requirements-dev.txt` to compare against it"
+    )
+    local_data = os.environ.get("NLTK_DATA", os.path.join(os.getcwd(), "app", "nltk_data"))
+    if os.path.isdir(local_data) and local_data not in nltk.data.path:
+        nltk.data.path.insert(0, local_data)
+    try:
+        nltk.word_tokenize("Punkt is installed.")
+    except LookupError:
+        pytest.skip(PUNKT_MISSING)
+    return nltk.word_tokenize
+
+
+def test_regex_tokenizer_keyword_scores_match_nltk(nltk_word_tokenize):
+    matcher = keyword_matcher(KEYWORDS)
+    for answer in reference_corpus(300, seed=5):
+        expected = filtered(nltk_word_tokenize, answer)
+        got = filtered(_regex_tokenize, answer)
+        diff = abs(matcher.score(answer, expected) - matcher.score(answer, got))
+        assert diff <= TOLERANCE, (answer, sorted(set(expected) ^ set(got)))
+
+
+@pytest.mark.parametrize("engine", ["fuzz", "vector"])
+def test_evaluation_scores_match_between_tokenizers(nltk_word_tokenize, monkeypatch, engine):
+    monkeypatch.setattr(answer_text, "_word_tokenize", lambda: nltk_word_tokenize)
+    monkeypatch.setattr(evaluation_logic, "SIMILARITY_ENGINE", engine)
+    monkeypatch.setattr(vector_similarity, "corpus_idf", lambda: vector_similarity.NO_IDF)
+
+    def scores(mode, answer):
+        monkeypatch.setattr(answer_text, "EVAL_TOKENIZER", mode)
+        result = evaluate_subjective("test", QUESTION, answer)
+        return {k: result[k] for k in ("keyword", "similarity", "final_score")}
+
+    for answer in reference_corpus(60, seed=7):
+        expected, got = scores("nltk", answer), scores("regex", answer)
+        assert all(abs(expected[k] - got[k]) <= TOLERANCE for k in expected), (answer, expected, got)
+
+
+@pytest.mark.parametrize("text, tokens", [
+    ("The light-dependent reactions don't stop.", ["reactions", "stop"]),
+    ("It's the Calvin cycle (CO2)...", ["calvin", "cycle", "co2"]),
+    ("ATP, NADPH and glucose; then oxygen!", ["atp", "nadph", "glucose", "oxygen"]),
+])
+def test_regex_tokenizer_known_splits(monkeypatch, text, tokens):
+    monkeypatch.setattr(answer_text, "EVAL_TOKENIZER", "regex")
+    assert tokenize_and_filter(text) == tokens
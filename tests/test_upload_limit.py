@@ -0,0 +1,75 @@
+import asyncio
+
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+from app.utils.upload_limit import UploadSizeLimitMiddleware
+
+LIMIT = 64 * 1024
+
+
+def _app():
+    app = FastAPI()
+    app.add_middleware(UploadSizeLimitMiddleware, max_body_bytes=LIMIT)
+    handled = []
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        handled.append(file.filename)
+        return {"size": len(await file.read())}
+
+    @app.post("/json")
+    async def json_body(payload: dict):
+        return {"keys": len(payload)}
+
+    return app, handled
+
+
+def test_small_upload_passes():
+    app, handled = _app()
+    resp = TestClient(app).post("/upload", files={"file": ("a.txt", b"x" * 1000)})
+    assert resp.status_code == 200 and resp.json() == {"size": 1000}
+    assert handled == ["a.txt"]
+
+
+def test_declared_oversized_upload_is_rejected_before_parsing():
+    app, handled = _app()
+    resp = TestClient(app).post("/upload", files={"file": ("a.txt", b"x" * (LIMIT + 1))})
+    assert resp.status_code == 413
+    assert handled == []
+
+
+def test_non_multipart_bodies_are_not_limited():
+    app, _ = _app()
+    resp = TestClient(app).post("/json", json={str(i): "x" * 100 for i in range(1000)})
+    assert resp.status_code == 200
+
+
+def test_streamed_upload_without_content_length_is_cut_off():
+    app, handled = _app()
+    boundary = "b0undary"
+    head = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"a.txt\"\r\n"
+            "Content-Type: text/plain\r\n\r\n").encode()
+    chunks = [head] + [b"x" * 8192] * 64  # 512 KiB, never announced up front
+    reads = 0
+    sent = []
+
+    async def receive():
+        nonlocal reads
+        reads += 1
+        body = chunks[reads - 1] if reads <= len(chunks) else b""
+        return {"type": "http.request", "body": body, "more_body": reads < len(chunks)}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http", "http_version": "1.1", "method": "POST", "path": "/upload", "raw_path": b"/upload",
+        "root_path": "", "scheme": "http", "query_string": b"", "server": ("test", 80), "client": ("test", 1),
+        "headers": [(b"content-type", f"multipart/form-data; boundary={boundary}".encode())],
+    }
+    asyncio.run(app(scope, receive, send))
+
+    assert sent[0]["status"] == 413
+    assert handled == []
+    assert reads < len(chunks)  # stopped reading once past the limit
@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+from app.utils.vector_similarity import NO_IDF, corpus_idf, cosine_scores, fit_idf, save_idf
+
+EXPLANATION = ["photosynthesis", "converts", "light", "energy", "chemical", "energy", "stored", "glucose"]
+
+ANSWERS = [
+    ["photosynthetic", "cells", "convert", "light", "chemical", "energy"],  # on topic, word variants
+    ["cellular", "respiration", "releases", "energy", "glucose"],           # shares only common words
+    ["french", "revolution", "began", "1789"],                              # unrelated
+    [],                                                                     # blank answer
+]
+
+# Stand-in for the stored explanations the IDF is fitted on
+CORPUS = [
+    EXPLANATION,
+    ["cellular", "respiration", "releases", "energy", "stored", "glucose"],
+    ["kinetic", "energy", "energy", "motion"],
+    ["mitosis", "produces", "two", "identical", "daughter", "cells"],
+    ["light", "travels", "faster", "sound"],
+    ["supply", "demand", "set", "market", "price"],
+]
+
+
+def _scores(idf):
+    return [round(s, 4) for s in cosine_scores(EXPLANATION, ANSWERS, idf).tolist()]
+
+
+def test_scores_without_idf():
+    assert _scores(NO_IDF) == [0.714, 0.3244, 0.0, 0.0]
+
+
+def test_fitted_idf_discounts_ngrams_common_to_the_corpus():
+    assert _scores(fit_idf(CORPUS)) == [0.6904, 0.2285, 0.0, 0.0]
+
+
+def test_each_score_is_independent_of_the_rest_of_the_batch():
+    idf = fit_idf(CORPUS)
+    batch = cosine_scores(EXPLANATION, ANSWERS, idf).tolist()
+    assert [cosine_scores(EXPLANATION, [a], idf)[0] for a in ANSWERS] == batch
+
+
+def test_fit_idf_is_smoothed():
+    idf = fit_idf(CORPUS)
+    assert idf.documents == 6
+    assert idf[" en"] == pytest.approx(1 + 0.5596, abs=1e-4)  # log(7 / 4) + 1, "energy" in 3 of 6
+    assert idf[" zz"] == idf.unseen == pytest.approx(1 + 1.9459, abs=1e-4)  # log(7) + 1
+
+
+def test_saved_table_is_loaded_by_corpus_idf(tmp_path):
+    path = str(tmp_path / "idf.json")
+    save_idf(fit_idf(CORPUS), path)
+    loaded = corpus_idf(path)
+    corpus_idf.cache_clear()
+
+    assert json.load(open(path))["documents"] == 6
+    assert _scores(loaded) == _scores(fit_idf(CORPUS))
+    assert corpus_idf(str(tmp_path / "missing.json")) is NO_IDF
+    corpus_idf.cache_clear()
@@ -0,0 +1,46 @@
+# tests/tokenizer_corpus.py
+# Reference corpus for the regex-vs-NLTK tokenizer check, shared by
+# tests/test_tokenizer.py and benchmarks/bench_tokenizer.py: essay-like
+# answers with contractions, hyphenation, abbreviations, numbers and quotes.
+import random
+
+from app.utils.answer_text import _STOPWORDS, clean_text
+
+KEYWORDS = ("photosynthesis", "chlorophyll", "light-dependent reactions", "calvin cycle", "stroma", "atp",
+            "glucose", "carbon dioxide", "thylakoid", "oxygen")
+
+QUESTION = {
+    "type": "essay",
+    "question": "Explain how photosynthesis stores energy.",
+    "explanation": (
+        "Photosynthesis converts light energy into chemical energy. The light-dependent reactions in the "
+        "thylakoid membranes make ATP and NADPH, which the Calvin cycle in the stroma uses to fix carbon "
+        "dioxide into glucose, releasing oxygen."
+    ),
+    "keywords": list(KEYWORDS),
+}
+
+SENTENCES = [
+    "Photosynthesis converts light energy into chemical energy stored in glucose.",
+    "The light-dependent reactions don't happen in the stroma; they're in the thylakoid membranes.",
+    "Chlorophyll absorbs red and blue light, e.g. wavelengths around 430 nm and 680 nm.",
+    "It's the Calvin cycle that fixes carbon dioxide (CO2) into sugars.",
+    "ATP and NADPH, made earlier, power the cycle... without them it stops.",
+    "Plants release oxygen as a by-product: roughly 1,000 kg per tree each year.",
+    "In the U.S. most crops are C3 plants, but maize isn't one of them.",
+    "\"Rubisco\" is the enzyme that binds CO2 -- arguably the most abundant protein on Earth.",
+    "The students' results showed a 25% increase in rate at 30°C vs. 20°C.",
+    "Stomata open at dawn; water enters through the roots & travels up the xylem.",
+    "Overall: 6CO2 + 6H2O → C6H12O6 + 6O2, which we'd memorise for the exam.",
+    "I think the thylakoid's role is to hold the pigments, isn't it?",
+]
+
+
+def reference_corpus(n: int, seed: int) -> list:
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(SENTENCES) for _ in range(rng.randint(2, 12))) for _ in range(n)]
+
+
+def filtered(tokenize, text: str) -> list:
+    """Tokens as tokenize_and_filter keeps them, with `tokenize` as the tokenizer."""
+    return [t for t in tokenize(clean_text(text)) if t.isalnum() and t not in _STOPWORDS]